@@ -0,0 +1,68 @@
+"""
+Benchmark for adaptive early-exit chunk scoring.
+
+Runs RoBERTa over every stored Article.text twice — scoring all chunks,
+then in adaptive mode — and reports the time saved, how many chunks were
+skipped, and whether any article's label changed.
+
+Usage:
+python bench_early_exit.py            # all stored articles
+python bench_early_exit.py 50         # first 50 articles
+"""
+import sys
+import time
+
+from ml_sentiment import get_ml_sentiment_reports, override_engine, warmup
+from news_demo import app, Article
+
+
+def load_texts(limit: int = None) -> list:
+    with app.app_context():
+        query = Article.query.filter(Article.text.isnot(None)).order_by(Article.id)
+        if limit:
+            query = query.limit(limit)
+        return [(a.url, a.text) for a in query]
+
+
+def _timed(texts: list, adaptive: bool):
+    start   = time.perf_counter()
+    reports = get_ml_sentiment_reports(texts, adaptive=adaptive)
+    return reports, time.perf_counter() - start
+
+
+def run_benchmark(limit: int = None):
+    articles = load_texts(limit)
+    texts    = [text for _, text in articles]
+    if not texts:
+        print("No stored articles — analyse some URLs first.")
+        return
+
+    warmup()
+    # Cached chunk scores would make the second run look free
+    with override_engine("inference_cache", None):
+        full, full_secs = _timed(texts, adaptive=False)
+        fast, fast_secs = _timed(texts, adaptive=True)
+
+    total   = sum(r["chunks_total"] for r in fast)
+    skipped = sum(r["chunks_skipped"] for r in fast)
+    changed = [
+        (url, f["label"], a["label"])
+        for (url, _), f, a in zip(articles, full, fast)
+        if f["label"] != a["label"]
+    ]
+
+    print("=" * 60)
+    print(f"Adaptive early exit — {len(texts)} stored articles")
+    print("=" * 60)
+    print(f"{'Chunks (total)':<28} {total:>10}")
+    print(f"{'Chunks skipped':<28} {skipped:>10}  ({skipped / total * 100 if total else 0:.1f}%)")
+    print(f"{'All chunks (s)':<28} {full_secs:>10.2f}")
+    print(f"{'Adaptive (s)':<28} {fast_secs:>10.2f}")
+    print(f"{'Latency saved':<28} {(1 - fast_secs / full_secs) * 100 if full_secs else 0:>9.1f}%")
+    print(f"{'Labels changed':<28} {len(changed):>10}")
+    for url, before, after in changed:
+        print(f"  {before} -> {after}  {url}")
+
+
+if __name__ == "__main__":
+    run_benchmark(int(sys.argv[1]) if len(sys.argv) > 1 else None)
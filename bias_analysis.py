@@ -1,110 +1,249 @@
 import re
+from collections import Counter, namedtuple
+from itertools import repeat
 
-# Words used to evoke strong emotion in headlines
-EMOTIVE_WORDS = {
-    # Strong negative emotion
-    "shocking", "outrage", "outraged", "crisis", "disaster",
-    "chaos", "fury", "furious", "devastating", "explosive",
-    "alarming", "dangerous", "threat", "threatening", "horrific",
-    "terrible", "awful", "dreadful", "appalling", "horrifying",
-    "terrifying", "nightmarish", "catastrophic", "tragic", "heartbreaking",
-    "disturbing", "frightening", "dire", "grim", "harrowing",
-
-    # Conflict and aggression language
-    "slam", "slammed", "attack", "attacked", "blow", "clash", "clashes",
-    "battle", "fight", "war", "accuse", "accused", "blasted", "hammered",
-    "condemned", "denounced", "lashed", "slammed", "ripped", "tore",
-    "crushed", "destroyed", "obliterated", "annihilated", "decimated",
-    "ambush", "assault", "confrontation", "escalation", "standoff",
-    "crackdown", "siege", "hostage", "violence", "brutal", "vicious",
-
-    # Dramatic intensifiers
-    "dramatic", "massive", "huge", "extreme", "radical",
-    "critical", "severe", "urgent", "unprecedented", "extraordinary",
-    "stunning", "bombshell", "explosive", "sensational", "staggering",
-    "jaw-dropping", "mind-blowing", "unbelievable", "incredible", "astounding",
-    "earth-shattering", "game-changing", "groundbreaking", "landmark",
-
-    # Fear & panic language
-    "panic", "fear", "scared", "frightened", "terror", "dread",
-    "anxiety", "hysteria", "paranoia", "peril", "danger", "risk",
-    "vulnerability", "exposed", "defenceless", "helpless", "desperate",
-
-    # Outrage & moral language
-    "shameful", "disgraceful", "scandalous", "corrupt", "betrayal",
-    "betrayed", "lied", "deceived", "manipulated", "exploited",
-    "abused", "victimised", "persecuted", "oppressed", "silenced",
-    "suppressed", "censored", "banned", "blocked", "forbidden",
-
-    # Loaded political language
-    "regime", "puppet", "propaganda", "brainwashing", "indoctrination",
-    "extremist", "radical", "fanatic", "militant", "insurgent",
-    "coup", "tyranny", "tyrannical", "authoritarian", "dictator",
-
-    # Positive hype language 
-    "triumphant", "glorious", "heroic", "magnificent", "spectacular",
-    "phenomenal", "extraordinary", "outstanding", "brilliant", "genius",
-    "revolutionary", "visionary", "historic", "legendary", "iconic"
-}
-
-# Certainty / absolutist language 
-CERTAINTY_WORDS = {
-    # Classic absolutist words
-    "always", "never", "everyone", "nobody", "no one",
-    "nothing", "everything", "completely", "entirely",
-    "totally", "absolutely", "utterly", "perfectly",
-    "all", "none", "every", "any", "anywhere", "everywhere",
-    "nowhere", "forever", "impossible", "inevitable", "certain",
-    "definitely", "undoubtedly", "unquestionably", "obviously",
-    "clearly", "plainly", "simply", "merely", "just",
-
-    # Exaggerated frequency
-    "constantly", "continuously", "endlessly", "repeatedly",
-    "invariably", "without exception", "in every case",
-
-    # False certainty in reporting
-    "proves", "confirms", "demonstrates", "shows conclusively",
-    "undeniable", "irrefutable", "incontrovertible", "beyond doubt"
-}
-
-
-def analyse_bias_language(text: str):
+import lexicon_store
+
+# Emotive and certainty lexicons live in lexicons/*.txt and are
+# compiled and hot-reloaded by lexicon_store.
+
+
+# -------------------------------------------------------
+# Lexicon matcher: every entry is split into word tokens
+# ("jaw-dropping" -> jaw, dropping; "no one" -> no, one) and
+# stored in a token trie. One pass over the article walks the
+# trie from each token, so single words and phrases are found
+# together and the scan cost does not grow with lexicon size.
+# -------------------------------------------------------
+_TOKEN = re.compile(r"\b\w+\b")
+
+Match = namedtuple("Match", "start end lexicon term")
+
+
+class LexiconMatcher:
+    def __init__(self, lexicons: dict):
+        """lexicons: {name: iterable of words / phrases}"""
+        self._root  = {}
+        self._depth = 0
+        # Column of every (lexicon, term), for document-term matrices
+        self.vocabulary = {}
+        for name, terms in lexicons.items():
+            for term in sorted(terms):
+                tokens = _TOKEN.findall(term.lower())
+                if not tokens:
+                    continue
+                node = self._root
+                for token in tokens:
+                    node = node.setdefault(token, {})
+                # None holds the lexicons this path completes: {name: term}
+                node.setdefault(None, {})[name] = term
+                self._depth = max(self._depth, len(tokens))
+                self.vocabulary.setdefault((name, term), len(self.vocabulary))
+
+    def find(self, text: str) -> tuple:
+        """
+        (matches, total_words) for `text`. Matches are leftmost-longest and
+        non-overlapping within each lexicon, with character offsets into
+        `text`. total_words counts the same word tokens the lexicons use.
+        """
+        spans  = [(m.start(), m.end(), m.group().lower()) for m in _TOKEN.finditer(text)]
+        found  = []
+        free   = {}   # lexicon -> first token index it may match again
+
+        for i in range(len(spans)):
+            node    = self._root
+            longest = {}   # lexicon -> (end token index, term)
+            for j in range(i, min(i + self._depth, len(spans))):
+                node = node.get(spans[j][2])
+                if node is None:
+                    break
+                for name, term in node.get(None, {}).items():
+                    longest[name] = (j, term)
+
+            for name, (j, term) in longest.items():
+                if free.get(name, 0) <= i:
+                    found.append(Match(spans[i][0], spans[j][1], name, term))
+                    free[name] = j + 1
+
+        return found, len(spans)
+
+    def count_matrix(self, texts: list) -> tuple:
+        """
+        (counts, total_words) for many texts: a CSR matrix of match counts,
+        one row per text and one column per self.vocabulary entry, with the
+        same leftmost-longest matches as find(). Every text is tokenized into
+        one array and the trie is walked for all start positions at once,
+        one array step per token depth.
+        """
+        import numpy as np
+        from scipy.sparse import csr_matrix
+
+        # Number the trie: token ids from 1 (0 = no lexicon token), node ids
+        # in breadth-first order, transitions keyed node * width + token.
+        token_ids = {}
+        edges     = []   # (node id, token id, child id)
+        ends      = [{}] # node id -> {lexicon: column} of the terms it completes
+        nodes     = [self._root]
+        for node_id, node in enumerate(nodes):
+            for token, child in node.items():
+                if token is None:
+                    ends[node_id] = {name: self.vocabulary[(name, term)]
+                                     for name, term in child.items()}
+                    continue
+                token_id = token_ids.setdefault(token, len(token_ids) + 1)
+                edges.append((node_id, token_id, len(nodes)))
+                nodes.append(child)
+                ends.append({})
+        width = len(token_ids) + 1
+        keys  = np.array([n * width + t for n, t, _ in edges], dtype=np.int64)
+        order = np.argsort(keys)
+        keys  = keys[order]
+        child = np.array([c for _, _, c in edges], dtype=np.int64)[order]
+        names = sorted({name for name, _ in self.vocabulary})
+        end_col = {name: np.array([e.get(name, -1) for e in ends], dtype=np.int64) for name in names}
+
+        # All texts as one token array, "" (id 0) after each text so no
+        # match runs from one text into the next.
+        docs   = [_TOKEN.findall(text or "") for text in texts]
+        totals = [len(doc) for doc in docs]
+        words  = "\0".join("\0".join(doc + [""]) for doc in docs).lower().split("\0")
+        ids    = np.fromiter(map(token_ids.get, words, repeat(0)), dtype=np.int64, count=len(words))
+        doc_of = np.repeat(np.arange(len(docs)), np.array(totals, dtype=np.int64) + 1)
+
+        # Trie walk from every position in step: after k steps `node` is
+        # where the k-token sequence starting at `start` leads.
+        longest = {name: np.zeros(len(ids), dtype=np.int64) for name in names}
+        column  = {name: np.zeros(len(ids), dtype=np.int64) for name in names}
+        start   = np.flatnonzero(ids)
+        node    = np.zeros(len(start), dtype=np.int64)
+        for depth in range(1, self._depth + 1):
+            pos   = start + depth - 1
+            keep  = pos < len(ids)
+            start, node, pos = start[keep], node[keep], pos[keep]
+            if not len(start) or not len(keys):
+                break
+            want  = node * width + ids[pos]
+            at    = np.minimum(np.searchsorted(keys, want), len(keys) - 1)
+            hit   = keys[at] == want
+            start, node = start[hit], child[at[hit]]
+            for name in names:
+                cols = end_col[name][node]
+                done = cols >= 0
+                longest[name][start[done]] = depth
+                column[name][start[done]]  = cols[done]
+
+        rows, cols = [], []
+        for name in names:
+            first = np.flatnonzero(longest[name])
+            last  = first + longest[name][first]
+            if len(first) > 1 and np.any(first[1:] < last[:-1]):
+                # Overlapping phrase matches: keep leftmost, as find() does
+                kept, free = [], 0
+                for n, (a, b) in enumerate(zip(first.tolist(), last.tolist())):
+                    if a >= free:
+                        kept.append(n)
+                        free = b
+                first = first[kept]
+            rows.append(doc_of[first])
+            cols.append(column[name][first])
+
+        rows   = np.concatenate(rows) if rows else np.zeros(0, dtype=np.int64)
+        cols   = np.concatenate(cols) if cols else np.zeros(0, dtype=np.int64)
+        counts = csr_matrix(
+            (np.ones(len(rows), dtype=np.int64), (rows, cols)),
+            shape=(len(texts), len(self.vocabulary)),
+        )
+        counts.sum_duplicates()
+        return counts, totals
+
+
+class AhoCorasick:
+    """
+    Character-level Aho-Corasick automaton with plain substring semantics
+    (`keyword in text`), for the category keywords: one pass over the text
+    finds every keyword that occurs anywhere in it.
+    """
+
+    def __init__(self, keywords):
+        self._goto = [{}]
+        self._fail = [0]
+        self._out  = [set()]
+        for keyword in keywords:
+            state = 0
+            for ch in keyword:
+                nxt = self._goto[state].get(ch)
+                if nxt is None:
+                    nxt = len(self._goto)
+                    self._goto[state][ch] = nxt
+                    self._goto.append({})
+                    self._fail.append(0)
+                    self._out.append(set())
+                state = nxt
+            self._out[state].add(keyword)
+
+        # Breadth-first failure links; outputs inherit along them
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for ch, nxt in self._goto[state].items():
+                queue.append(nxt)
+                fail = self._fail[state]
+                while fail and ch not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(ch, 0)
+                self._out[nxt] |= self._out[self._fail[nxt]]
+
+    def find_all(self, text: str) -> set:
+        """Every keyword that occurs in `text`."""
+        found = set()
+        state = 0
+        goto, fail, out = self._goto, self._fail, self._out
+        for ch in text:
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            if out[state]:
+                found |= out[state]
+        return found
+
+
+def find_bias_terms(text: str) -> list:
+    """Every emotive / certainty word or phrase in `text`, with offsets."""
+    return lexicon_store.current().matcher.find(text or "")[0]
+
+
+def _empty_bias(lexicon_version: str) -> dict:
+    return {
+        "emotive_ratio": 0.0,
+        "certainty_per_1000": 0.0,
+        "certainty_ratio": 0.0,
+        "bias_intensity_score": 0,
+        "bias_level": "low",
+        "total_words": 0,
+        "lexicon_version": lexicon_version,
+    }
+
+
+def analyse_bias_language(text: str, lexicons=None):
     """
     Lightweight, explainable bias indicators based on language.
     Returns normalised metrics per 1000 words for a  fair comparison across articles.
+    `lexicons` is the bundle to score with (default: lexicon_store.current()).
     """
+    return _score_text(lexicons or lexicon_store.current(), text)
 
+
+def _score_text(lexicons, text: str) -> dict:
     if not text:
-        return {
-            "emotive_ratio": 0.0,
-            "certainty_per_1000": 0.0,
-            "certainty_ratio": 0.0,
-            "bias_intensity_score": 0,
-            "bias_level": "low",
-            "total_words": 0,
-        }
+        return _empty_bias(lexicons.version)
 
-    words = re.findall(r"\b\w+\b", text.lower())
-    total_words = len(words)
+    matches, total_words = lexicons.matcher.find(text)
 
     if total_words == 0:
-        return {
-            "emotive_ratio": 0.0,
-            "certainty_per_1000": 0.0,
-            "certainty_ratio": 0.0,
-            "bias_intensity_score": 0,
-            "bias_level": "low",
-            "total_words": 0,
-        }
-
-    emotive_count = 0
-    emotive_word_freq = {}
-    for w in words:
-        if w in EMOTIVE_WORDS:
-            emotive_count += 1
-            emotive_word_freq[w] = emotive_word_freq.get(w, 0) + 1
+        return _empty_bias(lexicons.version)
 
-    certainty_count = sum(1 for w in words if w in CERTAINTY_WORDS)
+    emotive_word_freq = dict(Counter(m.term for m in matches if m.lexicon == "emotive"))
+    emotive_count     = sum(emotive_word_freq.values())
+    certainty_count   = len(matches) - emotive_count
 
     emotive_ratio = emotive_count / total_words
     certainty_ratio = certainty_count / total_words
@@ -135,6 +274,7 @@ def analyse_bias_language(text: str):
         "bias_level": bias_level,
         "total_words": total_words,
         "emotive_words": emotive_word_freq,
+        "lexicon_version": lexicons.version,
     }
 
 def compute_bias_intensity(emotive_ratio, certainty_per_1000):
@@ -161,4 +301,63 @@ def compute_bias_intensity(emotive_ratio, certainty_per_1000):
     else:
         level = "High"
 
-    return bias_score, level
\ No newline at end of file
+    return bias_score, level
+
+
+# -------------------------------------------------------
+# Corpus-scale scoring: LexiconMatcher.count_matrix matches
+# every text in one pass into a sparse document-term matrix,
+# and the counts, ratios and scores are array maths over it.
+# Final rounding stays in Python so every number is identical
+# to analyse_bias_language.
+# -------------------------------------------------------
+def analyse_bias_batch(texts: list, lexicons=None) -> list:
+    """analyse_bias_language for many texts at once, same dicts in the same order."""
+    import numpy as np
+
+    lexicons = lexicons or lexicon_store.current()
+    vocab    = lexicons.matcher.vocabulary
+    terms    = [None] * len(vocab)
+    for key, col in vocab.items():
+        terms[col] = key
+
+    counts, totals = lexicons.matcher.count_matrix(texts)
+
+    emotive_mask    = np.array([lexicon == "emotive" for lexicon, _ in terms], dtype=np.int64)
+    certainty_mask  = np.array([lexicon == "certainty" for lexicon, _ in terms], dtype=np.int64)
+    emotive_count   = counts @ emotive_mask
+    certainty_count = counts @ certainty_mask
+
+    total    = np.array(totals, dtype=np.float64)
+    safe     = np.where(total > 0, total, 1.0)
+    emotive_ratio   = emotive_count / safe
+    certainty_ratio = certainty_count / safe
+    per_1000 = (certainty_count / safe) * 1000
+    combined = (np.minimum(emotive_ratio * 1000, 50) +
+                np.minimum(certainty_ratio * 2500, 50))
+    score    = np.minimum(100, np.round(combined)).astype(np.int64)
+    level    = np.where(score <= 25, "low", np.where(score <= 50, "moderate", "high"))
+
+    results = []
+    for row in range(len(texts)):
+        if not texts[row] or totals[row] == 0:
+            results.append(_empty_bias(lexicons.version))
+            continue
+
+        start, end = counts.indptr[row], counts.indptr[row + 1]
+        emotive_words = {
+            terms[col][1]: int(n)
+            for col, n in zip(counts.indices[start:end], counts.data[start:end])
+            if terms[col][0] == "emotive"
+        }
+        results.append({
+            "emotive_ratio": round(float(emotive_ratio[row]), 4),
+            "certainty_per_1000": round(float(per_1000[row]), 1),
+            "certainty_ratio": round(float(certainty_ratio[row]), 4),
+            "bias_intensity_score": int(score[row]),
+            "bias_level": str(level[row]),
+            "total_words": totals[row],
+            "emotive_words": emotive_words,
+            "lexicon_version": lexicons.version,
+        })
+    return results
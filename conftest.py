@@ -0,0 +1,10 @@
+import os
+
+# Flask-SQLAlchemy binds the engine when news_demo is imported, so the test
+# database has to be chosen before any test module imports it. The on-disk
+# caches under instance/ are switched off for the same reason.
+os.environ.setdefault("DATABASE_URL", "sqlite:///:memory:")
+os.environ.setdefault("FETCH_CACHE_DIR", "")
+os.environ.setdefault("INFERENCE_CACHE_PATH", "")
+os.environ.setdefault("GEMINI_CACHE_PATH", "")
+os.environ.setdefault("LEXICON_CACHE_PATH", "")
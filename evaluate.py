@@ -1,6 +1,6 @@
 """
 Quantitative Evaluation Script
-Runs VADER, TextBlob, and Bias Analysis against a manually-labelled dataset
+Runs RoBERTa, VADER, TextBlob, and Bias Analysis against a manually-labelled dataset
 and reports Precision, Recall, F1-score per class and macro average.
 
 Usage:
@@ -16,7 +16,7 @@ import os
 from sklearn.metrics import classification_report, confusion_matrix
 
 # import your own modules 
-from ml_sentiment import get_vader_sentiment, get_textblob_sentiment
+from ml_sentiment import get_vader_sentiment, get_textblob_sentiment, get_ml_sentiment_batch
 from bias_analysis import analyse_bias_language
 
 
@@ -41,6 +41,7 @@ def run_evaluation():
     dataset = load_dataset(DATASET_PATH)
 
     y_true_sentiment = []
+    y_roberta        = []
     y_vader          = []
     y_textblob       = []
 
@@ -49,7 +50,10 @@ def run_evaluation():
 
     print(f"\nRunning evaluation on {len(dataset)} labelled samples...\n")
 
-    for row in dataset:
+    # RoBERTa runs over the whole dataset in batches rather than row by row
+    roberta_results = get_ml_sentiment_batch([row["text"] for row in dataset])
+
+    for row, (roberta_label, _) in zip(dataset, roberta_results):
         text     = row["text"]
         gt_sent  = row["ground_truth_sentiment"].strip().lower()
         gt_bias  = row["ground_truth_bias"].strip().lower()
@@ -59,6 +63,7 @@ def run_evaluation():
         textblob_label, _ = get_textblob_sentiment(text)
 
         y_true_sentiment.append(gt_sent)
+        y_roberta.append(roberta_label.lower())
         y_vader.append(vader_label.lower())
         y_textblob.append(textblob_label.lower())
 
@@ -71,6 +76,15 @@ def run_evaluation():
     sentiment_labels = ["positive", "negative", "neutral"]
     bias_labels      = ["low", "moderate", "high"]
 
+    print("=" * 60)
+    print("RoBERTa — Sentiment Classification")
+    print("=" * 60)
+    print(classification_report(
+        y_true_sentiment, y_roberta,
+        labels=sentiment_labels,
+        zero_division=0
+    ))
+
     print("=" * 60)
     print("VADER — Sentiment Classification")
     print("=" * 60)
@@ -100,7 +114,11 @@ def run_evaluation():
 
     # Confusion matrices 
     print("=" * 60)
-    print("VADER Confusion Matrix  (rows=actual, cols=predicted)")
+    print("RoBERTa Confusion Matrix  (rows=actual, cols=predicted)")
+    print("Labels:", sentiment_labels)
+    print(confusion_matrix(y_true_sentiment, y_roberta, labels=sentiment_labels))
+
+    print("\nVADER Confusion Matrix")
     print("Labels:", sentiment_labels)
     print(confusion_matrix(y_true_sentiment, y_vader, labels=sentiment_labels))
 
@@ -121,6 +139,7 @@ def run_evaluation():
         f = f1_score       (y_true, y_pred, labels=labels, average="macro", zero_division=0)
         return round(p,3), round(r,3), round(f,3)
 
+    rp, rr, rf = macro(y_true_sentiment, y_roberta,  sentiment_labels)
     vp, vr, vf = macro(y_true_sentiment, y_vader,    sentiment_labels)
     tp, tr, tf = macro(y_true_sentiment, y_textblob, sentiment_labels)
     bp, br, bf = macro(y_true_bias,      y_bias_pred, bias_labels)
@@ -130,6 +149,7 @@ def run_evaluation():
     print("=" * 60)
     print(f"{'Engine':<30} {'Precision':>10} {'Recall':>10} {'F1':>10}")
     print("-" * 60)
+    print(f"{'RoBERTa (sentiment)':<30} {rp:>10.3f} {rr:>10.3f} {rf:>10.3f}")
     print(f"{'VADER (sentiment)':<30} {vp:>10.3f} {vr:>10.3f} {vf:>10.3f}")
     print(f"{'TextBlob (sentiment)':<30} {tp:>10.3f} {tr:>10.3f} {tf:>10.3f}")
     print(f"{'Bias Language Detector':<30} {bp:>10.3f} {br:>10.3f} {bf:>10.3f}")
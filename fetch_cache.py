@@ -0,0 +1,226 @@
+"""
+Persistent on-disk cache for article downloads.
+
+Entries are keyed by the normalised URL and hold the raw response bytes,
+the Content-Type header (decoding is left to the caller, see
+fetcher.decode_html) and the ETag and Last-Modified validators. A fresh
+entry (younger than the TTL) is served without touching the network; a
+stale one is revalidated with a conditional GET, and a 304 just refreshes
+its timestamp. When the directory grows past its size budget the least
+recently used entries are evicted.
+
+Set FETCH_CACHE_OFFLINE=1 to serve only from the cache directory, which lets
+tests run against a pre-populated cache with no network at all.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+
+CACHE_DIR       = os.getenv("FETCH_CACHE_DIR", os.path.join("instance", "fetch_cache"))
+CACHE_TTL       = int(os.getenv("FETCH_CACHE_TTL", "3600"))                  # seconds
+CACHE_MAX_BYTES = int(os.getenv("FETCH_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+CACHE_OFFLINE   = os.getenv("FETCH_CACHE_OFFLINE", "") == "1"
+
+_TRACKING_PREFIXES = ("utm_",)
+_TRACKING_PARAMS   = {"fbclid", "gclid", "mc_cid", "mc_eid"}
+
+
+class CacheMiss(Exception):
+    """Raised in offline mode when a URL is not in the cache."""
+
+
+def normalize_url(url: str) -> str:
+    """
+    Canonical form used as the cache key: lower-case scheme and host, no
+    default port, no fragment, tracking params removed, query params sorted.
+    """
+    parts  = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host   = (parts.hostname or "").lower()
+    port   = parts.port
+    if port and not ((scheme == "http" and port == 80) or (scheme == "https" and port == 443)):
+        host = f"{host}:{port}"
+
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k not in _TRACKING_PARAMS and not k.startswith(_TRACKING_PREFIXES)
+    ]
+    query.sort()
+
+    return urlunsplit((scheme, host, parts.path or "/", urlencode(query), ""))
+
+
+class FetchCache:
+    def __init__(self, directory: str, ttl: int = CACHE_TTL,
+                 max_bytes: int = CACHE_MAX_BYTES, offline: bool = False):
+        self.directory = directory
+        self.ttl       = ttl
+        self.max_bytes = max_bytes
+        self.offline   = offline
+        self._lock     = threading.Lock()
+        self._size     = None    # bytes on disk, scanned once then kept by put()
+
+    # ----------------------------------------
+    # Storage
+    # ----------------------------------------
+    def _paths(self, url: str):
+        key  = hashlib.sha256(normalize_url(url).encode("utf-8")).hexdigest()
+        base = os.path.join(self.directory, key[:2], key)
+        return base + ".body", base + ".json"
+
+    @staticmethod
+    def _write_atomic(path: str, data: bytes):
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+        os.replace(tmp, path)
+
+    def get(self, url: str):
+        """Return the stored entry dict or None."""
+        body_path, meta_path = self._paths(url)
+        try:
+            with open(meta_path, encoding="utf-8") as f:
+                meta = json.load(f)
+            with open(body_path, "rb") as f:
+                meta["body"] = f.read()
+        except (OSError, ValueError):
+            return None
+        # Entries written before content_type was kept hold UTF-8 encoded text
+        meta.setdefault("content_type", "text/html; charset=utf-8")
+
+        # Bump mtime so eviction treats this entry as recently used
+        try:
+            os.utime(meta_path)
+        except OSError:
+            pass
+        return meta
+
+    def put(self, url: str, body: bytes, content_type: str = None,
+            etag: str = None, last_modified: str = None):
+        body_path, meta_path = self._paths(url)
+        os.makedirs(os.path.dirname(body_path), exist_ok=True)
+        meta = {
+            "url":           normalize_url(url),
+            "content_type":  content_type or "",
+            "etag":          etag,
+            "last_modified": last_modified,
+            "fetched_at":    time.time(),
+        }
+        replaced = self._entry_size(meta_path, body_path)
+        self._write_atomic(body_path, body)
+        self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+        with self._lock:
+            if self._size is None:
+                self._size = self._scan()[1]
+            else:
+                self._size += self._entry_size(meta_path, body_path) - replaced
+            over = self._size > self.max_bytes
+        if over:
+            self.evict()
+
+    @staticmethod
+    def _entry_size(meta_path: str, body_path: str) -> int:
+        try:
+            return os.path.getsize(meta_path) + os.path.getsize(body_path)
+        except OSError:
+            return 0
+
+    def _touch(self, url: str, entry: dict):
+        _, meta_path = self._paths(url)
+        meta = {k: v for k, v in entry.items() if k != "body"}
+        meta["fetched_at"] = time.time()
+        self._write_atomic(meta_path, json.dumps(meta).encode("utf-8"))
+
+    def is_fresh(self, entry: dict) -> bool:
+        return time.time() - entry.get("fetched_at", 0) < self.ttl
+
+    def _scan(self):
+        """([(mtime, size, meta_path, body_path)], total bytes) for the whole directory."""
+        entries = []
+        total   = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                if not name.endswith(".json"):
+                    continue
+                meta_path = os.path.join(root, name)
+                body_path = meta_path[:-len(".json")] + ".body"
+                try:
+                    size  = os.path.getsize(meta_path) + os.path.getsize(body_path)
+                    mtime = os.path.getmtime(meta_path)
+                except OSError:
+                    continue
+                entries.append((mtime, size, meta_path, body_path))
+                total += size
+        return entries, total
+
+    def evict(self):
+        """
+        Drop least recently used entries until the cache fits max_bytes.
+        put() only calls this once its running size total crosses the cap,
+        so the directory walk is not paid on every write.
+        """
+        with self._lock:
+            entries, total = self._scan()
+            if total > self.max_bytes:
+                entries.sort()
+                for _, size, meta_path, body_path in entries:
+                    for path in (meta_path, body_path):
+                        try:
+                            os.remove(path)
+                        except OSError:
+                            pass
+                    total -= size
+                    if total <= self.max_bytes:
+                        break
+            # Resync: other processes may have written to the same directory
+            self._size = total
+
+    # ----------------------------------------
+    # Fetch through the cache
+    # ----------------------------------------
+    def fetch(self, url: str, http_get) -> tuple:
+        """
+        Return (body bytes, Content-Type), using the network only when needed.
+        http_get(url, headers) must return a requests-style response.
+        """
+        entry = self.get(url)
+
+        if entry and (self.offline or self.is_fresh(entry)):
+            return entry["body"], entry["content_type"]
+        if self.offline:
+            raise CacheMiss(url)
+
+        headers = {}
+        if entry:
+            if entry.get("etag"):
+                headers["If-None-Match"] = entry["etag"]
+            if entry.get("last_modified"):
+                headers["If-Modified-Since"] = entry["last_modified"]
+
+        resp = http_get(url, headers)
+        if resp.status_code == 304 and entry:
+            self._touch(url, entry)
+            return entry["body"], entry["content_type"]
+
+        resp.raise_for_status()
+        content_type = resp.headers.get("Content-Type", "")
+        self.put(
+            url,
+            resp.content,
+            content_type=content_type,
+            etag=resp.headers.get("ETag"),
+            last_modified=resp.headers.get("Last-Modified"),
+        )
+        return resp.content, content_type
+
+
+def default_cache():
+    """Cache configured from the environment, or None when FETCH_CACHE_DIR is empty."""
+    if not CACHE_DIR:
+        return None
+    return FetchCache(CACHE_DIR, CACHE_TTL, CACHE_MAX_BYTES, CACHE_OFFLINE)
@@ -0,0 +1,89 @@
+"""
+SQLite memo of Gemini sentiment results.
+
+Keyed by sha256(prompt version + prompt template + model + article text),
+so re-analysing an unchanged article costs no Gemini request, while a new
+prompt or model never sees an old answer, and an answer from the batched
+prompt is never served for the single-article one (or the reverse). Entries older than GEMINI_CACHE_TTL
+seconds count as misses and are pruned on write. Lives in the same file as
+the RoBERTa chunk cache (a separate table).
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+
+
+CACHE_PATH = os.getenv("GEMINI_CACHE_PATH", os.path.join("instance", "model_cache.db"))
+CACHE_TTL  = float(os.getenv("GEMINI_CACHE_TTL", str(7 * 24 * 3600)))
+
+
+def gemini_key(prompt_version: int, model: str, text: str, template: str = "single") -> str:
+    """`template` names the prompt that produced the answer: "single" or "batch"."""
+    key = f"{prompt_version}\0{template}\0{model}\0{text}"
+    return hashlib.sha256(key.encode("utf-8")).hexdigest()
+
+
+class GeminiCache:
+    def __init__(self, path: str, ttl: float = CACHE_TTL, clock=time.time):
+        self.path      = path
+        self.ttl       = ttl
+        self._clock    = clock
+        self._lock     = threading.Lock()
+        self._counters = {"hits": 0, "misses": 0, "expired": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS gemini_responses ("
+            " key TEXT PRIMARY KEY, label TEXT NOT NULL, score REAL NOT NULL,"
+            " lean TEXT NOT NULL, created_at REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_gemini_responses_created_at"
+            " ON gemini_responses (created_at)"
+        )
+        self._conn.commit()
+
+    def get(self, key: str):
+        """(label, score, lean) if cached and fresh, else None."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT label, score, lean, created_at FROM gemini_responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                self._counters["misses"] += 1
+                return None
+            if self._clock() - row[3] > self.ttl:
+                self._counters["expired"] += 1
+                return None
+            self._counters["hits"] += 1
+            return row[0], row[1], row[2]
+
+    def put(self, key: str, result: tuple):
+        label, score, lean = result
+        now = self._clock()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO gemini_responses (key, label, score, lean, created_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, label, score, lean, now),
+            )
+            self._conn.execute(
+                "DELETE FROM gemini_responses WHERE created_at < ?", (now - self.ttl,),
+            )
+            self._conn.commit()
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            counters["entries"] = self._conn.execute(
+                "SELECT COUNT(*) FROM gemini_responses"
+            ).fetchone()[0]
+        lookups = counters["hits"] + counters["misses"] + counters["expired"]
+        counters["hit_rate"] = round(counters["hits"] / lookups, 3) if lookups else 0.0
+        return counters
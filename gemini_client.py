@@ -0,0 +1,137 @@
+"""
+REST client for the Gemini generateContent endpoint.
+
+Used by ml_sentiment when GEMINI_BACKEND=rest (opt-in; the default is the
+google-generativeai SDK). A 429 or 503 reply is retried with exponential
+backoff, honouring the server's Retry-After header when it sends one.
+GEMINI_RPM > 0 also spaces request starts with a client-side rate limiter;
+it is off by default.
+
+The caller's request_options timeout bounds the whole call: the limiter
+wait, every attempt and every backoff sleep come out of the same budget,
+and the call raises GeminiTimeout instead of sleeping past it.
+
+GEMINI_BASE_URL points the client somewhere else, e.g. at gemini_stub.py:
+GEMINI_BACKEND=rest GEMINI_BASE_URL=http://127.0.0.1:8765 GEMINI_API_KEY=x python news_demo.py
+"""
+import os
+import random
+import threading
+import time
+
+import requests
+
+
+BASE_URL     = os.getenv("GEMINI_BASE_URL", "https://generativelanguage.googleapis.com")
+RPM          = float(os.getenv("GEMINI_RPM", "0"))           # 0 = no client-side limit
+MAX_RETRIES  = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+BACKOFF_BASE = float(os.getenv("GEMINI_BACKOFF_BASE", "1.0"))
+BACKOFF_MAX  = 60.0
+
+_RETRY_STATUS = (429, 503)
+
+
+class GeminiHTTPError(Exception):
+    pass
+
+
+class GeminiTimeout(GeminiHTTPError):
+    """The call's time budget ran out before Gemini answered."""
+
+
+class RateLimiter:
+    """Spaces request starts at least 60 / rpm seconds apart, across threads."""
+
+    def __init__(self, rpm: float, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 60.0 / rpm if rpm > 0 else 0.0
+        self._clock   = clock
+        self._sleep   = sleep
+        self._next    = 0.0
+        self._lock    = threading.Lock()
+
+    def acquire(self, end: float = None):
+        """
+        Wait for the next slot. With `end` (on the limiter's clock), raises
+        GeminiTimeout without taking a slot if it would start after `end`.
+        """
+        if not self.interval:
+            return
+        with self._lock:
+            now   = self._clock()
+            start = max(now, self._next)
+            if end is not None and start > end:
+                raise GeminiTimeout("no rate limit slot before the deadline")
+            self._next = start + self.interval
+        if start > now:
+            self._sleep(start - now)
+
+
+class GeminiReply:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class GeminiRestClient:
+    """Implements the generate_content() call ml_sentiment makes."""
+
+    def __init__(self, api_key: str, model: str, base_url: str = BASE_URL,
+                 rpm: float = RPM, max_retries: int = MAX_RETRIES,
+                 sleep=time.sleep, clock=time.monotonic):
+        self.url         = f"{base_url.rstrip('/')}/v1beta/models/{model}:generateContent"
+        self.api_key     = api_key
+        self.max_retries = max_retries
+        self.limiter     = RateLimiter(rpm, clock=clock, sleep=sleep)
+        self.retries     = 0
+        self._sleep      = sleep
+        self._clock      = clock
+        self._session    = requests.Session()
+
+    def _backoff(self, response, attempt: int) -> float:
+        retry_after = response.headers.get("Retry-After", "")
+        try:
+            return min(float(retry_after), BACKOFF_MAX)
+        except ValueError:
+            delay = min(BACKOFF_BASE * 2 ** attempt, BACKOFF_MAX)
+            return delay * (0.5 + random.random() / 2)   # jitter
+
+    def _remaining(self, end) -> float:
+        """Seconds left before `end` (None = no limit); GeminiTimeout if none."""
+        if end is None:
+            return None
+        remaining = end - self._clock()
+        if remaining <= 0:
+            raise GeminiTimeout("Gemini call ran out of time")
+        return remaining
+
+    def generate_content(self, prompt: str, request_options: dict = None) -> GeminiReply:
+        timeout = (request_options or {}).get("timeout")
+        end     = None if timeout is None else self._clock() + timeout
+        body    = {
+            "contents": [{"role": "user", "parts": [{"text": prompt}]}],
+            "generationConfig": {"responseMimeType": "application/json"},
+        }
+
+        for attempt in range(self.max_retries + 1):
+            self.limiter.acquire(end)
+            response = self._session.post(
+                self.url, json=body, timeout=self._remaining(end),
+                headers={"x-goog-api-key": self.api_key},
+            )
+            if response.status_code in _RETRY_STATUS and attempt < self.max_retries:
+                delay     = self._backoff(response, attempt)
+                remaining = self._remaining(end)
+                if remaining is not None and delay >= remaining:
+                    raise GeminiTimeout(
+                        f"Gemini returned HTTP {response.status_code}; "
+                        f"retry in {delay:.1f}s is past the deadline"
+                    )
+                self.retries += 1
+                self._sleep(delay)
+                continue
+            if response.status_code != 200:
+                raise GeminiHTTPError(f"Gemini returned HTTP {response.status_code}")
+            break
+
+        data  = response.json()
+        parts = data["candidates"][0]["content"]["parts"]
+        return GeminiReply("".join(part.get("text", "") for part in parts))
@@ -0,0 +1,135 @@
+"""
+Offline stand-ins for the Gemini API.
+
+StubGeminiModel — GEMINI_BACKEND=stub makes get_gemini_model() return one,
+so the Gemini path (prompt, JSON parsing, cache) runs without an API key
+or network. Every call returns the same canned JSON reply and is counted.
+
+StubGeminiServer — a local HTTP server speaking the generateContent REST
+API, for exercising gemini_client.py end to end. It answers batched
+prompts with one entry per "### ARTICLE n" and enforces a requests-per-
+window quota with 429 + Retry-After, like the real endpoint.
+
+Usage:
+python gemini_stub.py [port] [rpm]
+GEMINI_BACKEND=rest GEMINI_BASE_URL=http://127.0.0.1:8765 GEMINI_API_KEY=x python news_demo.py
+"""
+import json
+import math
+import os
+import re
+import sys
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+DEFAULT_REPLY = os.getenv("GEMINI_STUB_REPLY", '{"score": 0.0, "lean": "none"}')
+
+
+class StubResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class StubGeminiModel:
+    """Implements the generate_content() call ml_sentiment makes."""
+
+    def __init__(self, reply: str = DEFAULT_REPLY):
+        self.reply   = reply
+        self.prompts = []
+        self._lock   = threading.Lock()
+
+    @property
+    def calls(self) -> int:
+        return len(self.prompts)
+
+    def generate_content(self, prompt: str, **kwargs) -> StubResponse:
+        with self._lock:
+            self.prompts.append(prompt)
+        return StubResponse(self.reply)
+
+
+# ----------------------------------------
+# HTTP server
+# ----------------------------------------
+_ARTICLE_MARKER = re.compile(r"^### ARTICLE (\d+)$", re.MULTILINE)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_POST(self):
+        server = self.server
+        body   = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+
+        retry_after = server.admit()
+        if retry_after is not None:
+            self._reply(429, {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}},
+                        {"Retry-After": str(retry_after)})
+            return
+
+        prompt = json.loads(body)["contents"][0]["parts"][0]["text"]
+        ids    = [int(n) for n in _ARTICLE_MARKER.findall(prompt)]
+        answer = {"score": server.score, "lean": server.lean}
+        text   = json.dumps([dict(answer, id=i) for i in ids] if ids else answer)
+        self._reply(200, {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]})
+
+    def _reply(self, status: int, payload: dict, headers: dict = None):
+        data = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubGeminiServer(ThreadingHTTPServer):
+    """Fake generateContent endpoint allowing `rpm` requests per `window` seconds."""
+    daemon_threads = True
+
+    def __init__(self, port: int = 0, rpm: int = 0, window: float = 60.0,
+                 score: float = 0.0, lean: str = "none"):
+        super().__init__(("127.0.0.1", port), _Handler)
+        self.rpm      = rpm
+        self.window   = window
+        self.score    = score
+        self.lean     = lean
+        self.served   = 0
+        self.rejected = 0
+        self._recent  = deque()
+        self._lock    = threading.Lock()
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+    def admit(self):
+        """None if the request may proceed, else seconds until a slot frees up."""
+        with self._lock:
+            now = time.monotonic()
+            while self._recent and now - self._recent[0] >= self.window:
+                self._recent.popleft()
+            if self.rpm and len(self._recent) >= self.rpm:
+                self.rejected += 1
+                return max(1, math.ceil(self.window - (now - self._recent[0])))
+            self._recent.append(now)
+            self.served += 1
+            return None
+
+
+if __name__ == "__main__":
+    port   = int(sys.argv[1]) if len(sys.argv) > 1 else 8765
+    rpm    = int(sys.argv[2]) if len(sys.argv) > 2 else 10
+    server = StubGeminiServer(port, rpm=rpm)
+    print(f"Stub Gemini on {server.url} ({rpm} requests/min). Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
@@ -0,0 +1,152 @@
+"""
+Two-tier cache for RoBERTa chunk scores.
+
+Keyed by sha256(model id + chunk text), so a chunk of syndicated wire copy
+that appears on many outlets is scored once. Lookups go to an in-process
+LRU first, then to a SQLite file shared by every process on the machine.
+The SQLite tier is trimmed back under its size budget by least-recent use.
+"""
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+CACHE_PATH      = os.getenv("INFERENCE_CACHE_PATH", os.path.join("instance", "model_cache.db"))
+CACHE_MAX_BYTES = int(os.getenv("INFERENCE_CACHE_MAX_BYTES", str(64 * 1024 * 1024)))
+LRU_SIZE        = int(os.getenv("INFERENCE_CACHE_LRU_SIZE", "4096"))
+
+
+def chunk_key(model_id: str, chunk: str) -> str:
+    return hashlib.sha256(f"{model_id}\0{chunk}".encode("utf-8")).hexdigest()
+
+
+class InferenceCache:
+    def __init__(self, path: str, max_bytes: int = CACHE_MAX_BYTES, lru_size: int = LRU_SIZE):
+        self.path      = path
+        self.max_bytes = max_bytes
+        self.lru_size  = lru_size
+        self._lru      = OrderedDict()
+        self._lock     = threading.Lock()
+        self._counters = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "evictions": 0}
+
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, timeout=10)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS chunk_scores ("
+            " key TEXT PRIMARY KEY, label TEXT NOT NULL, score REAL NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_chunk_scores_last_used ON chunk_scores (last_used)"
+        )
+        self._conn.commit()
+
+    # ----------------------------------------
+    # In-process LRU
+    # ----------------------------------------
+    def _remember(self, key: str, result: dict):
+        self._lru[key] = result
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.lru_size:
+            self._lru.popitem(last=False)
+
+    # ----------------------------------------
+    # Public API
+    # ----------------------------------------
+    def get_many(self, keys: list) -> dict:
+        """{key: {"label", "score"}} for every key found in either tier."""
+        found = {}
+        with self._lock:
+            remaining = []
+            for key in keys:
+                if key in self._lru:
+                    self._lru.move_to_end(key)
+                    found[key] = self._lru[key]
+                    self._counters["memory_hits"] += 1
+                else:
+                    remaining.append(key)
+
+            if remaining:
+                unique = list(dict.fromkeys(remaining))
+                rows   = []
+                for start in range(0, len(unique), 500):   # SQLite variable limit
+                    part = unique[start:start + 500]
+                    rows += self._conn.execute(
+                        f"SELECT key, label, score FROM chunk_scores "
+                        f"WHERE key IN ({','.join('?' * len(part))})",
+                        part,
+                    ).fetchall()
+                disk = {key: {"label": label, "score": score} for key, label, score in rows}
+
+                for key in remaining:
+                    if key in disk:
+                        found[key] = disk[key]
+                        self._remember(key, disk[key])
+                        self._counters["disk_hits"] += 1
+                    else:
+                        self._counters["misses"] += 1
+
+                if disk:
+                    now = time.time()
+                    self._conn.executemany(
+                        "UPDATE chunk_scores SET last_used = ? WHERE key = ?",
+                        [(now, key) for key in disk],
+                    )
+                    self._conn.commit()
+        return found
+
+    def put_many(self, results: dict):
+        """Store {key: {"label", "score"}} in both tiers."""
+        if not results:
+            return
+        now = time.time()
+        with self._lock:
+            for key, result in results.items():
+                self._remember(key, result)
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunk_scores (key, label, score, last_used) "
+                "VALUES (?, ?, ?, ?)",
+                [(key, r["label"], r["score"], now) for key, r in results.items()],
+            )
+            self._conn.commit()
+            self._evict()
+
+    def _evict(self):
+        """Drop the least recently used tenth of rows while over max_bytes."""
+        while True:
+            page_size  = self._conn.execute("PRAGMA page_size").fetchone()[0]
+            page_count = self._conn.execute("PRAGMA page_count").fetchone()[0]
+            free_pages = self._conn.execute("PRAGMA freelist_count").fetchone()[0]
+            if (page_count - free_pages) * page_size <= self.max_bytes:
+                return
+
+            rows = self._conn.execute("SELECT COUNT(*) FROM chunk_scores").fetchone()[0]
+            if rows == 0:
+                return
+            drop = max(1, rows // 10)
+            self._conn.execute(
+                "DELETE FROM chunk_scores WHERE key IN ("
+                " SELECT key FROM chunk_scores ORDER BY last_used LIMIT ?)",
+                (drop,),
+            )
+            self._conn.commit()
+            self._counters["evictions"] += drop
+
+    def stats(self) -> dict:
+        with self._lock:
+            counters = dict(self._counters)
+            counters["memory_entries"] = len(self._lru)
+            counters["disk_entries"]   = self._conn.execute(
+                "SELECT COUNT(*) FROM chunk_scores"
+            ).fetchone()[0]
+        lookups = counters["memory_hits"] + counters["disk_hits"] + counters["misses"]
+        counters["hit_rate"] = (
+            round((counters["memory_hits"] + counters["disk_hits"]) / lookups, 3)
+            if lookups else 0.0
+        )
+        return counters
@@ -0,0 +1,157 @@
+"""
+Concurrent ingestion for the sources.txt batch.
+
+Downloads and text extraction run on a bounded thread pool with a per-host
+limit. URLs wait in a queue per host and are only handed to the pool when
+their host has a free slot, so pool threads never sit waiting on a host:
+one slow outlet cannot take every worker and no site gets hammered.
+The CPU-bound NLP stage runs on NLP_WORKERS threads of its own, so it
+overlaps with the downloads. Each NLP thread takes every article that
+finished downloading since its last round, so the models see batches
+instead of one article at a time.
+"""
+import os
+import queue
+import threading
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from urllib.parse import urlparse
+
+
+FETCH_WORKERS  = int(os.getenv("FETCH_WORKERS",  "8"))
+PER_HOST_LIMIT = int(os.getenv("PER_HOST_LIMIT", "2"))
+NLP_WORKERS    = int(os.getenv("NLP_WORKERS",    "1"))
+NLP_BATCH_SIZE = int(os.getenv("NLP_BATCH_SIZE", "8"))
+
+
+def _host(url: str) -> str:
+    return urlparse(url).netloc.lower()
+
+
+class _HostQueues:
+    """URL indices queued per host, released at most `limit` per host at a time."""
+
+    def __init__(self, urls: list, limit: int):
+        self.limit    = max(1, limit)
+        self._waiting = {}   # host -> deque of indices into urls
+        for i, url in enumerate(urls):
+            self._waiting.setdefault(_host(url), deque()).append(i)
+
+    def start(self) -> list:
+        """The first indices to fetch: up to `limit` per host, hosts interleaved."""
+        ready = []
+        for _ in range(self.limit):
+            for waiting in self._waiting.values():
+                if waiting:
+                    ready.append(waiting.popleft())
+        return ready
+
+    def finished(self, url: str):
+        """A fetch of `url` ended; the next index for its host, or None."""
+        waiting = self._waiting[_host(url)]
+        return waiting.popleft() if waiting else None
+
+
+_DONE = object()
+
+
+def _per_item(analyse):
+    """Adapt analyse(url, fetched) to the batch interface."""
+    def analyse_batch(items):
+        outputs = []
+        for url, fetched in items:
+            try:
+                outputs.append(analyse(url, fetched))
+            except Exception as exc:
+                outputs.append(exc)
+        return outputs
+    return analyse_batch
+
+
+def run_concurrent(
+    urls: list,
+    fetch,
+    analyse=None,
+    analyse_batch=None,
+    fetch_workers: int = None,
+    per_host: int = None,
+    nlp_workers: int = None,
+    batch_size: int = None,
+) -> list:
+    """
+    Fetch every URL concurrently and hand finished downloads to the NLP stage.
+
+    fetch(url) -> fetched                  runs on the fetch pool
+    analyse(url, fetched) -> result        one article at a time, or
+    analyse_batch([(url, fetched)]) -> [result | Exception]
+                                           whatever has arrived, up to
+                                           batch_size articles per call
+
+    Returns the results in the same order as `urls`. A URL whose fetch or
+    analysis fails is skipped without holding up the others.
+    """
+    if not urls:
+        return []
+
+    analyse_batch = analyse_batch or _per_item(analyse)
+    batch_size    = batch_size or NLP_BATCH_SIZE
+    hosts         = _HostQueues(urls, per_host or PER_HOST_LIMIT)
+    pending       = queue.Queue()
+    results       = [None] * len(urls)
+
+    def _nlp_loop():
+        while True:
+            first = pending.get()
+            if first is _DONE:
+                pending.put(_DONE)
+                return
+
+            # Take whatever else is already waiting, up to batch_size
+            batch = [first]
+            while len(batch) < batch_size:
+                try:
+                    item = pending.get_nowait()
+                except queue.Empty:
+                    break
+                if item is _DONE:
+                    pending.put(_DONE)
+                    break
+                batch.append(item)
+
+            try:
+                outputs = analyse_batch([(urls[i], fetched) for i, fetched in batch])
+            except Exception:
+                continue
+            for (i, _), output in zip(batch, outputs):
+                if not isinstance(output, Exception):
+                    results[i] = output
+
+    nlp_threads = [
+        threading.Thread(target=_nlp_loop, daemon=True)
+        for _ in range(nlp_workers or NLP_WORKERS)
+    ]
+    for t in nlp_threads:
+        t.start()
+
+    try:
+        with ThreadPoolExecutor(max_workers=fetch_workers or FETCH_WORKERS) as fetch_pool:
+            running = {}   # future -> index into urls
+            for i in hosts.start():
+                running[fetch_pool.submit(fetch, urls[i])] = i
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    i   = running.pop(future)
+                    nxt = hosts.finished(urls[i])
+                    if nxt is not None:
+                        running[fetch_pool.submit(fetch, urls[nxt])] = nxt
+                    try:
+                        pending.put((i, future.result()))
+                    except Exception:
+                        continue
+    finally:
+        pending.put(_DONE)
+        for t in nlp_threads:
+            t.join()
+
+    return [r for r in results if r is not None]
@@ -0,0 +1,158 @@
+"""
+Lexicons for bias and category scoring, loaded from data files.
+
+  lexicons/emotive.txt      one word or phrase per line, # comments
+  lexicons/certainty.txt
+  lexicons/categories.json  {"Category": [keywords, ...]}, in tie-break order
+
+The lexicon version is a hash of the three files. They are compiled into
+matchers once and the compiled form is pickled to LEXICON_CACHE_PATH under
+that version, so a restart with unchanged files skips the compile.
+
+current() re-checks the files at most every LEXICON_CHECK_INTERVAL seconds
+and, when they changed, swaps in a freshly compiled bundle. Callers take
+one bundle per analysis, so a swap never mixes two versions in one result.
+If the changed files do not load (bad JSON, a file mid-rename), the error
+is logged and the previous bundle stays active until the files change again.
+"""
+import hashlib
+import json
+import logging
+import os
+import pickle
+import threading
+import time
+
+
+LEXICON_DIR    = os.getenv("LEXICON_DIR", "lexicons")
+CACHE_PATH     = os.getenv("LEXICON_CACHE_PATH", os.path.join("instance", "lexicon_cache.pkl"))
+CHECK_INTERVAL = float(os.getenv("LEXICON_CHECK_INTERVAL", "5"))
+
+FILES = ("emotive.txt", "certainty.txt", "categories.json")
+
+log = logging.getLogger(__name__)
+
+# Bump when CompiledLexicons or the matchers change shape; old pickles are ignored
+_FORMAT = 2
+
+
+class CompiledLexicons:
+    def __init__(self, version: str, emotive: set, certainty: set, categories: dict):
+        from bias_analysis import LexiconMatcher, AhoCorasick
+
+        self.version    = version
+        self.emotive    = emotive
+        self.certainty  = certainty
+        self.categories = categories
+        self.matcher    = LexiconMatcher({"emotive": emotive, "certainty": certainty})
+        self.category_matcher = AhoCorasick(
+            keyword for keywords in categories.values() for keyword in keywords
+        )
+
+
+def _read_terms(path: str) -> set:
+    with open(path, encoding="utf-8") as f:
+        return {
+            line.strip().lower() for line in f
+            if line.strip() and not line.lstrip().startswith("#")
+        }
+
+
+def _signature(directory: str) -> tuple:
+    """Cheap change check: (name, mtime, size) of every lexicon file."""
+    sig = []
+    for name in FILES:
+        st = os.stat(os.path.join(directory, name))
+        sig.append((name, st.st_mtime_ns, st.st_size))
+    return tuple(sig)
+
+
+def _version(directory: str) -> str:
+    digest = hashlib.sha256()
+    for name in FILES:
+        with open(os.path.join(directory, name), "rb") as f:
+            digest.update(name.encode("utf-8") + b"\0" + f.read())
+    return digest.hexdigest()[:12]
+
+
+def _compile(directory: str, version: str) -> CompiledLexicons:
+    with open(os.path.join(directory, "categories.json"), encoding="utf-8") as f:
+        categories = {cat: [kw.lower() for kw in kws] for cat, kws in json.load(f).items()}
+    return CompiledLexicons(
+        version,
+        _read_terms(os.path.join(directory, "emotive.txt")),
+        _read_terms(os.path.join(directory, "certainty.txt")),
+        categories,
+    )
+
+
+def load(directory: str = None, cache_path: str = None) -> CompiledLexicons:
+    """Compiled lexicons for `directory`, from the pickle cache when it is current."""
+    directory  = directory or LEXICON_DIR
+    cache_path = CACHE_PATH if cache_path is None else cache_path
+    version    = _version(directory)
+
+    if cache_path:
+        try:
+            with open(cache_path, "rb") as f:
+                fmt, cached = pickle.load(f)
+            if fmt == _FORMAT and cached.version == version:
+                return cached
+        except Exception:
+            pass   # missing, stale or unreadable: rebuild below
+
+    compiled = _compile(directory, version)
+    if cache_path:
+        os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+        tmp = f"{cache_path}.{os.getpid()}.tmp"
+        with open(tmp, "wb") as f:
+            pickle.dump((_FORMAT, compiled), f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path)   # other processes never see a half-written file
+    return compiled
+
+
+# ----------------------------------------
+# Hot reload
+# ----------------------------------------
+_state = {"lexicons": None, "signature": None, "checked": 0.0}
+_lock  = threading.Lock()
+
+
+def current() -> CompiledLexicons:
+    """The active lexicons, reloaded if the files changed since the last check."""
+    now = time.monotonic()
+    if _state["lexicons"] is not None and now - _state["checked"] < CHECK_INTERVAL:
+        return _state["lexicons"]
+
+    with _lock:
+        if _state["lexicons"] is not None and now - _state["checked"] < CHECK_INTERVAL:
+            return _state["lexicons"]
+        try:
+            signature = _signature(LEXICON_DIR)
+        except OSError:
+            signature = None   # a file is missing, e.g. mid-rename
+        if _state["lexicons"] is None or signature != _state["signature"]:
+            try:
+                lexicons = load()
+            except Exception:
+                if _state["lexicons"] is None:
+                    raise   # nothing loaded yet to fall back on
+                log.exception("Lexicon reload from %s failed; keeping version %s",
+                              LEXICON_DIR, _state["lexicons"].version)
+            else:
+                # Built fully, published with one assignment
+                _state["lexicons"] = lexicons
+            # A broken set of files is not retried until they change again
+            _state["signature"] = signature
+        _state["checked"] = time.monotonic()
+        return _state["lexicons"]
+
+
+def current_version() -> str:
+    return current().version
+
+
+def reset():
+    """Forget the loaded lexicons (tests, or after changing LEXICON_DIR)."""
+    with _lock:
+        _state.update(lexicons=None, signature=None, checked=0.0)
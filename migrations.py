@@ -0,0 +1,288 @@
+"""
+Versioned schema migrations for news.db.
+
+Each migration has a number and runs once, in order; the highest applied
+number is kept in the schema_version table. Steps check the live schema
+before changing it, so a database that already has a column or index
+(e.g. one created by db.create_all) is simply stamped. When the database
+is at LATEST, migrate() reads schema_version and issues no DDL at all.
+
+Usage:
+python migrations.py check       # schema version, pending steps, missing indexes
+python migrations.py upgrade     # apply pending migrations
+"""
+import hashlib
+import sys
+from datetime import datetime
+
+from sqlalchemy import inspect, text
+from sqlalchemy.exc import IntegrityError
+
+
+# ----------------------------------------
+# Steps
+# ----------------------------------------
+def _add_columns(conn, table: str, columns: list):
+    existing = {col["name"] for col in inspect(conn).get_columns(table)}
+    for name, col_type in columns:
+        if name not in existing:
+            conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {name} {col_type}"))
+
+
+def _legacy_engine_columns(conn):
+    # Formerly the ALTER loop in news_demo.run_migrations
+    _add_columns(conn, "analysis_result", [
+        ("narrative_score",    "INTEGER  DEFAULT 0"),
+        ("narrative_label",    "VARCHAR(50) DEFAULT 'Balanced'"),
+        ("vader_label",        "VARCHAR(20) DEFAULT 'neutral'"),
+        ("vader_percent",      "FLOAT    DEFAULT 50.0"),
+        ("textblob_label",     "VARCHAR(20) DEFAULT 'neutral'"),
+        ("textblob_percent",   "FLOAT    DEFAULT 50.0"),
+        ("gemini_label",       "VARCHAR(20) DEFAULT 'neutral'"),
+        ("gemini_percent",     "FLOAT    DEFAULT 50.0"),
+        ("gemini_lean",        "VARCHAR(20) DEFAULT 'none'"),
+        ("bias_level",         "VARCHAR(20) DEFAULT 'low'"),
+        ("bias_score",         "INTEGER  DEFAULT 0"),
+        ("emotive_ratio",      "FLOAT    DEFAULT 0.0"),
+        ("certainty_per_1000", "FLOAT    DEFAULT 0.0"),
+        ("total_words",        "INTEGER  DEFAULT 0"),
+        ("model_agreement",    "BOOLEAN  DEFAULT 0"),
+        ("divergence_level",   "VARCHAR(20) DEFAULT 'Low'"),
+        ("divergence_pct",     "FLOAT    DEFAULT 0.0"),
+        ("category",           "VARCHAR(50) DEFAULT 'General'"),
+    ])
+
+
+def _reuse_columns(conn):
+    _add_columns(conn, "analysis_result", [("engine_version", "VARCHAR(64)")])
+    _add_columns(conn, "article", [("text_hash", "VARCHAR(64)")])
+
+
+def _engines_used(conn):
+    _add_columns(conn, "analysis_result", [("engines_used", "VARCHAR(64)")])
+
+
+def _lexicon_version(conn):
+    _add_columns(conn, "analysis_result", [("lexicon_version", "VARCHAR(32)")])
+
+
+# name -> (table, columns); also what `check` looks for
+INDEXES = {
+    # latest analysis per article (reuse check, CSV export)
+    "ix_analysis_result_article_created": ("analysis_result", "article_id, created_at"),
+    # /history newest-first and its pagination
+    "ix_analysis_result_created_id":      ("analysis_result", "created_at, id"),
+    # /stats category breakdown
+    "ix_analysis_result_category":        ("analysis_result", "category"),
+    # /stats top sources
+    "ix_article_source":                  ("article", "source"),
+    # /stats feedback counts
+    "ix_user_feedback_rating":            ("user_feedback", "rating"),
+    "ix_user_feedback_user_lean":         ("user_feedback", "user_lean"),
+    # job pages and the worker's queue poll
+    "ix_analysis_job_item_job_id":        ("analysis_job_item", "job_id"),
+    "ix_analysis_job_status":             ("analysis_job", "status"),
+}
+
+
+def _access_path_indexes(conn):
+    tables = set(inspect(conn).get_table_names())
+    for name, (table, columns) in INDEXES.items():
+        if table in tables:
+            conn.execute(text(f"CREATE INDEX IF NOT EXISTS {name} ON {table} ({columns})"))
+
+
+# Full-text index over article title and body. External content: the text
+# lives only in `article`, and the triggers keep the index in step with it.
+FTS_DDL = [
+    "CREATE VIRTUAL TABLE IF NOT EXISTS article_fts USING fts5("
+    "title, text, content='article', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    "CREATE TRIGGER IF NOT EXISTS article_fts_insert AFTER INSERT ON article BEGIN"
+    " INSERT INTO article_fts (rowid, title, text) VALUES (new.id, new.title, new.text); END",
+    "CREATE TRIGGER IF NOT EXISTS article_fts_delete AFTER DELETE ON article BEGIN"
+    " INSERT INTO article_fts (article_fts, rowid, title, text)"
+    " VALUES ('delete', old.id, old.title, old.text); END",
+    "CREATE TRIGGER IF NOT EXISTS article_fts_update AFTER UPDATE OF title, text ON article BEGIN"
+    " INSERT INTO article_fts (article_fts, rowid, title, text)"
+    " VALUES ('delete', old.id, old.title, old.text);"
+    " INSERT INTO article_fts (rowid, title, text) VALUES (new.id, new.title, new.text); END",
+]
+
+
+def _article_fts(conn):
+    exists = inspect(conn).has_table("article_fts")
+    for statement in FTS_DDL:
+        conn.execute(text(statement))
+    if not exists:
+        conn.execute(text("INSERT INTO article_fts (article_fts) VALUES ('rebuild')"))
+
+
+# stats_rollup holds the running totals behind /stats (news_demo.StatsRollup).
+# These statements recompute it from scratch: migration 7 and rebuild_stats.py.
+ROLLUP_REBUILD = [
+    "DELETE FROM stats_rollup",
+    "INSERT INTO stats_rollup (metric, key, count, total)"
+    " SELECT 'analyses', '', COUNT(*), 0 FROM analysis_result",
+    "INSERT INTO stats_rollup (metric, key, count, total)"
+    " SELECT 'source', COALESCE(article.source, ''), COUNT(*), 0"
+    " FROM analysis_result JOIN article ON article.id = analysis_result.article_id"
+    " GROUP BY COALESCE(article.source, '')",
+    "INSERT INTO stats_rollup (metric, key, count, total)"
+    " SELECT 'category', category, COUNT(*), 0 FROM analysis_result"
+    " WHERE category IS NOT NULL GROUP BY category",
+    "INSERT INTO stats_rollup (metric, key, count, total)"
+    " SELECT 'divergence', '', COUNT(divergence_pct), COALESCE(SUM(divergence_pct), 0)"
+    " FROM analysis_result",
+    "INSERT INTO stats_rollup (metric, key, count, total)"
+    " SELECT 'feedback', '', COUNT(*), 0 FROM user_feedback",
+    "INSERT INTO stats_rollup (metric, key, count, total)"
+    " SELECT 'rating', CAST(rating AS TEXT), COUNT(*), 0 FROM user_feedback"
+    " WHERE rating IS NOT NULL GROUP BY rating",
+    "INSERT INTO stats_rollup (metric, key, count, total)"
+    " SELECT 'user_lean', user_lean, COUNT(*), 0 FROM user_feedback"
+    " WHERE user_lean IS NOT NULL GROUP BY user_lean",
+]
+
+
+def _stats_rollup(conn):
+    conn.execute(text(
+        "CREATE TABLE IF NOT EXISTS stats_rollup ("
+        " metric VARCHAR(30) NOT NULL, key VARCHAR(200) NOT NULL,"
+        " count INTEGER NOT NULL, total FLOAT NOT NULL,"
+        " PRIMARY KEY (metric, key))"
+    ))
+    conn.execute(text(
+        "CREATE INDEX IF NOT EXISTS ix_stats_rollup_metric_count ON stats_rollup (metric, count)"
+    ))
+    for statement in ROLLUP_REBUILD:
+        conn.execute(text(statement))
+
+
+def _job_lease(conn):
+    if inspect(conn).has_table("analysis_job"):
+        _add_columns(conn, "analysis_job", [
+            ("worker_id",     "VARCHAR(64)"),
+            ("lease_expires", "DATETIME"),
+        ])
+
+
+def _analysis_text_hash(conn):
+    """text_hash on analysis_result, backfilled for each article's latest row."""
+    _add_columns(conn, "analysis_result", [("text_hash", "VARCHAR(64)")])
+    # Articles stored before text_hash existed
+    missing = conn.execute(text("SELECT id, text FROM article WHERE text_hash IS NULL")).all()
+    for article_id, body in missing:
+        conn.execute(
+            text("UPDATE article SET text_hash = :h WHERE id = :id"),
+            {"h": hashlib.sha256((body or "").encode("utf-8")).hexdigest(), "id": article_id},
+        )
+    # Reuse already treats the latest analysis as the one for the current
+    # text; older rows stay NULL, since their text is not known.
+    conn.execute(text(
+        "UPDATE analysis_result SET text_hash ="
+        " (SELECT text_hash FROM article WHERE article.id = analysis_result.article_id)"
+        " WHERE text_hash IS NULL AND id IN ("
+        "  SELECT (SELECT latest.id FROM analysis_result AS latest"
+        "          WHERE latest.article_id = article.id"
+        "          ORDER BY latest.created_at DESC, latest.id DESC LIMIT 1)"
+        "  FROM article)"
+    ))
+
+
+MIGRATIONS = [
+    (1, "legacy engine, bias and category columns", _legacy_engine_columns),
+    (2, "engine fingerprint and article text hash",  _reuse_columns),
+    (3, "engines_used on analysis_result",           _engines_used),
+    (4, "lexicon_version on analysis_result",        _lexicon_version),
+    (5, "indexes for history, stats and export",     _access_path_indexes),
+    (6, "article_fts full-text index and triggers",   _article_fts),
+    (7, "stats_rollup totals for /stats",             _stats_rollup),
+    (8, "worker lease on analysis_job",               _job_lease),
+    (9, "text_hash on analysis_result",               _analysis_text_hash),
+]
+LATEST = MIGRATIONS[-1][0]
+
+
+# ----------------------------------------
+# Runner
+# ----------------------------------------
+def current_version(conn) -> int:
+    if not inspect(conn).has_table("schema_version"):
+        return 0
+    return conn.execute(text("SELECT MAX(version) FROM schema_version")).scalar() or 0
+
+
+def migrate(engine) -> list:
+    """Apply pending migrations, one transaction each. Returns the versions applied."""
+    with engine.connect() as conn:
+        if current_version(conn) >= LATEST:
+            return []
+
+    applied = []
+    for version, description, step in MIGRATIONS:
+        with engine.begin() as conn:
+            conn.execute(text(
+                "CREATE TABLE IF NOT EXISTS schema_version ("
+                " version INTEGER PRIMARY KEY, description VARCHAR(200),"
+                " applied_at DATETIME)"
+            ))
+            if version <= current_version(conn):
+                continue
+            step(conn)
+            try:
+                with conn.begin_nested():
+                    conn.execute(
+                        text("INSERT INTO schema_version (version, description, applied_at) "
+                             "VALUES (:v, :d, :t)"),
+                        {"v": version, "d": description, "t": datetime.utcnow()},
+                    )
+            except IntegrityError:
+                continue   # another process applied it first; the step was a no-op
+        applied.append(version)
+    return applied
+
+
+def check(engine) -> dict:
+    """Schema state without changing anything."""
+    with engine.connect() as conn:
+        version   = current_version(conn)
+        inspector = inspect(conn)
+        tables    = set(inspector.get_table_names())
+        present   = {
+            index["name"]
+            for table in tables
+            for index in inspector.get_indexes(table)
+        }
+    return {
+        "version":         version,
+        "latest":          LATEST,
+        "pending":         [(v, d) for v, d, _ in MIGRATIONS if v > version],
+        "missing_indexes": sorted(
+            name for name, (table, _) in INDEXES.items()
+            if table in tables and name not in present
+        ),
+    }
+
+
+def _print_check(state: dict):
+    print(f"Schema version {state['version']} of {state['latest']}")
+    for version, description in state["pending"]:
+        print(f"  pending {version}: {description}")
+    for name in state["missing_indexes"]:
+        print(f"  missing index {name}")
+    if not state["pending"] and not state["missing_indexes"]:
+        print("  up to date")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command not in ("check", "upgrade"):
+        print(__doc__)
+        sys.exit(1)
+
+    from news_demo import app, db
+    with app.app_context():
+        if command == "upgrade":
+            db.create_all()
+            print("Applied:", migrate(db.engine) or "nothing")
+        _print_check(check(db.engine))
@@ -1,49 +1,222 @@
 import re
 import json
-from transformers import pipeline
-from textblob import TextBlob
-from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
-import google.generativeai as genai
+import hashlib
+import logging
+import threading
+import time
 import os
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeout
+from contextlib import contextmanager
 from dotenv import load_dotenv
 
 load_dotenv()
 
+log = logging.getLogger(__name__)
 
-# Load Transformer model one time at startup
+
+# -------------------------------------------------------
+# Engines are created lazily on first use, so importing this
+# module (and routes such as /history or /stats that never
+# run a model) no longer pays for loading roberta-large.
+# Call warmup() at server start to load everything up front.
+# -------------------------------------------------------
 # Upgraded from twitter-roberta-base tweet-trainedtoo neutral on news
 # to siebert/sentiment-roberta-large-english rained on 15 datasets
-sentiment_pipeline = pipeline(
-    "sentiment-analysis",
-    model="siebert/sentiment-roberta-large-english"
-)
+ROBERTA_MODEL   = "siebert/sentiment-roberta-large-english"
+ROBERTA_BACKEND = os.getenv("ROBERTA_BACKEND", "torch")    # torch | int8 | onnx
+GEMINI_MODEL    = "gemini-2.5-flash"
+GEMINI_BACKEND  = os.getenv("GEMINI_BACKEND", "sdk")          # sdk | rest | stub
+
+_engines       = {}
+_engine_locks  = {}
+_registry_lock = threading.Lock()
+
+
+def _get_engine(name: str, factory):
+    """Thread-safe, build-once registry lookup. Engines load independently."""
+    try:
+        return _engines[name]
+    except KeyError:
+        pass
+    with _registry_lock:
+        lock = _engine_locks.setdefault(name, threading.Lock())
+    with lock:
+        if name not in _engines:
+            _engines[name] = factory()
+        return _engines[name]
+
+
+def _load_roberta():
+    from roberta_backends import build_pipeline
+    return build_pipeline(ROBERTA_MODEL, ROBERTA_BACKEND)
+
+
+def _load_vader():
+    from vaderSentiment.vaderSentiment import SentimentIntensityAnalyzer
+    return SentimentIntensityAnalyzer()
+
+
+def _load_gemini():
+    if GEMINI_BACKEND == "stub":
+        from gemini_stub import StubGeminiModel
+        return StubGeminiModel()
+    # Gemini — configured from .env; None when no key is set
+    key = os.getenv("GEMINI_API_KEY", "")
+    if not key:
+        return None
+    if GEMINI_BACKEND == "rest":
+        from gemini_client import GeminiRestClient
+        return GeminiRestClient(key, GEMINI_MODEL)
+    import google.generativeai as genai
+    genai.configure(api_key=key)
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+
+@contextmanager
+def override_engine(name: str, engine):
+    """Temporarily swap a registry entry (backend checks, tests)."""
+    with _registry_lock:
+        missing  = name not in _engines
+        previous = _engines.get(name)
+        _engines[name] = engine
+    try:
+        yield engine
+    finally:
+        with _registry_lock:
+            if missing:
+                _engines.pop(name, None)
+            else:
+                _engines[name] = previous
+
+
+def get_sentiment_pipeline():
+    return _get_engine("roberta", _load_roberta)
+
+
+def _load_tokenizer():
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(ROBERTA_MODEL)
+
+
+def get_tokenizer():
+    """
+    Tokenizer for chunking. Reuses the pipeline's when the model is loaded
+    in this process, otherwise loads just the tokenizer (web workers that
+    send chunks to the model server never load the model itself).
+    """
+    pipe = _engines.get("roberta")
+    if pipe is not None:
+        return pipe.tokenizer
+    return _get_engine("tokenizer", _load_tokenizer)
+
+
+def get_vader():
+    return _get_engine("vader", _load_vader)
+
+
+def get_gemini_model():
+    return _get_engine("gemini", _load_gemini)
 
-vader = SentimentIntensityAnalyzer()
 
-# Gemini — configured once at startup from .env
-_gemini_key = os.getenv("GEMINI_API_KEY", "")
-if _gemini_key:
-    genai.configure(api_key=_gemini_key)
-    _gemini_model = genai.GenerativeModel("gemini-2.5-flash")
-else:
-    _gemini_model = None
+def _gemini_model_id() -> str:
+    # Transport (rest / sdk) does not change answers; the stub does
+    return "stub" if GEMINI_BACKEND == "stub" else GEMINI_MODEL
+
+
+def gemini_enabled() -> bool:
+    return GEMINI_BACKEND == "stub" or bool(os.getenv("GEMINI_API_KEY", ""))
+
+
+def warmup():
+    """Load every engine now and run one tiny inference through RoBERTa."""
+    if os.getenv("MODEL_SERVER_SOCKET", ""):
+        get_tokenizer()   # the model itself lives in model_server.py
+    else:
+        get_sentiment_pipeline()("Warm-up sentence.", truncation=True, max_length=512)
+    get_vader()
+    get_gemini_model()
+    from textblob import TextBlob
+    TextBlob("Warm-up sentence.").sentiment
 
 
 # -------------------------------------------------------
-# Fix: chunk text instead of hard-truncating to
-# 512 chars. RoBERTa is run on up to MAX_CHUNKS chunks,
-# then results are combined via majority vote.
+# Chunking: the article is cut into windows of the model's
+# token limit using the tokenizer's offsets. Each window is
+# sliced back out as text and re-tokenized by the pipeline,
+# which can give a few more tokens than the offsets did (a
+# window starting mid-word encodes differently), so windows
+# are CHUNK_MARGIN tokens short of the limit and any that
+# still re-tokenize over it are trimmed. Long articles are
+# handled by CHUNK_POLICY:
+#   sample — _MAX_CHUNKS windows spread evenly over the article
+#            (default: same RoBERTa cost as the old 3 chunks)
+#   all    — every window, whole article covered
+#   budget — every window while the article fits TOKEN_BUDGET,
+#            otherwise evenly spread windows up to that budget;
+#            up to TOKEN_BUDGET / 512 = 8 model calls per article
 # -------------------------------------------------------
-_CHUNK_CHARS = 2000 
+CHUNK_POLICY = os.getenv("CHUNK_POLICY", "sample")
+CHUNK_STRIDE = int(os.getenv("CHUNK_STRIDE", "64"))           # tokens shared by neighbouring windows
+CHUNK_MARGIN = int(os.getenv("CHUNK_MARGIN", "16"))           # headroom for re-tokenization
+TOKEN_BUDGET = int(os.getenv("CHUNK_TOKEN_BUDGET", "4096"))
 _MAX_CHUNKS  = 3
 
+# Character fallback for tokenizers without offset mapping
+_CHUNK_CHARS = 2000
 
-def _split_chunks(text: str) -> list:
-    """Split text into overlapping chunks for RoBERTa."""
+# Content tokens per window of ROBERTA_MODEL: 512 less <s> and </s>
+_ROBERTA_WINDOW = 510
+
+
+def _clamp_stride(stride: int, window: int) -> int:
+    """
+    CHUNK_STRIDE capped at half a window. A stride near the window size
+    would move each window on by a token or so, giving one near-identical
+    window per token of the article.
+    """
+    return max(0, min(stride, window // 2))
+
+
+if CHUNK_STRIDE != _clamp_stride(CHUNK_STRIDE, _ROBERTA_WINDOW - CHUNK_MARGIN):
+    log.warning("CHUNK_STRIDE=%d does not fit a %d-token window; using %d",
+                CHUNK_STRIDE, _ROBERTA_WINDOW - CHUNK_MARGIN,
+                _clamp_stride(CHUNK_STRIDE, _ROBERTA_WINDOW - CHUNK_MARGIN))
+
+
+def _window_tokens() -> int:
+    """Content tokens per window: model limit minus <s> / </s>."""
+    tokenizer = get_tokenizer()
+    limit = getattr(tokenizer, "model_max_length", 512)
+    if not limit or limit > 4096:   # some tokenizers report a huge sentinel
+        limit = 512
+    return limit - tokenizer.num_special_tokens_to_add()
+
+
+def _spread(items: list, n: int) -> list:
+    """n items evenly spaced over the list, always keeping first and last."""
+    if n >= len(items):
+        return items
+    if n <= 1:
+        return items[:1]
+    step = (len(items) - 1) / (n - 1)
+    return [items[round(i * step)] for i in range(n)]
+
+
+def _apply_policy(windows: list, window: int) -> list:
+    if CHUNK_POLICY == "all":
+        return windows
+    if CHUNK_POLICY == "sample":
+        return _spread(windows, _MAX_CHUNKS)
+    # budget
+    return _spread(windows, max(1, TOKEN_BUDGET // window))
+
+
+def _split_chunks_by_chars(text: str) -> list:
+    """Split text into overlapping character chunks (fallback only)."""
     chunks = []
     step = _CHUNK_CHARS - 200   # 200-char overlap
     pos  = 0
-    while pos < len(text) and len(chunks) < _MAX_CHUNKS:
+    while pos < len(text):
         chunk = text[pos: pos + _CHUNK_CHARS].strip()
         if len(chunk) >= 10:
             chunks.append(chunk)
@@ -51,42 +224,127 @@ def _split_chunks(text: str) -> list:
     return chunks or [text[:_CHUNK_CHARS]]
 
 
+def _split_chunks(text: str) -> list:
+    """Split text into token-limit windows for RoBERTa, per CHUNK_POLICY."""
+    tokenizer = get_tokenizer()
+    if not getattr(tokenizer, "is_fast", False):
+        return _apply_policy(_split_chunks_by_chars(text), _CHUNK_CHARS // 4)
+
+    offsets = tokenizer(
+        text, add_special_tokens=False, return_offsets_mapping=True,
+    )["offset_mapping"]
+    if not offsets:
+        return [text]
+
+    limit  = _window_tokens()
+    window = max(1, limit - CHUNK_MARGIN)
+    stride = _clamp_stride(CHUNK_STRIDE, window)
+
+    windows = []
+    start   = 0
+    while True:
+        chunk, end = _fit_window(tokenizer, text, offsets, start, min(start + window, len(offsets)), limit)
+        windows.append(chunk)
+        if end == len(offsets):
+            break
+        # Next window overlaps this one by the stride, measured from where it really ended
+        start = max(start + 1, end - stride)
+
+    return _apply_policy(windows, window)
+
+
+def _token_count(tokenizer, text: str) -> int:
+    return len(tokenizer(text, add_special_tokens=False, return_offsets_mapping=True)["offset_mapping"])
+
+
+def _fit_window(tokenizer, text: str, offsets: list, start: int, end: int, limit: int) -> tuple:
+    """(text, end) for tokens [start, end), end pulled in until the text re-tokenizes within limit."""
+    while True:
+        chunk = text[offsets[start][0]: offsets[end - 1][1]].strip()
+        over  = _token_count(tokenizer, chunk) - limit
+        if over <= 0 or end - start <= 1:
+            return chunk, end
+        end = max(start + 1, end - over)
+
+
 # ----------------------------------------
 # RoBERTa Transformer  (main ML engine)
 # ----------------------------------------
-def get_ml_sentiment(text: str):
+ROBERTA_BATCH_SIZE = int(os.getenv("ROBERTA_BATCH_SIZE", "8"))
+
+
+def _score_chunks(chunks: list, batch_size: int) -> list:
     """
-    Analyse sentiment using RoBERTa large across multiple chunks.
-    siebert/sentiment-roberta-large-english returns POSITIVE/NEGATIVE only.
-    Neutral is inferred when confidence is below 0.65 (model is uncertain).
-    Returns: (label, avg_confidence 0-1)
+    Score chunks on the shared model server when MODEL_SERVER_SOCKET is set,
+    falling back to the in-process pipeline if it cannot be reached.
     """
-    if not text or len(text.strip()) < 3:
-        return "neutral", 0.0
+    if not chunks:
+        return []
+    socket_path = os.getenv("MODEL_SERVER_SOCKET", "")
+    if socket_path:
+        from model_server import score_chunks_remote
+        try:
+            return score_chunks_remote(chunks, socket_path)
+        except Exception:
+            pass
+    return _score_chunks_local(chunks, batch_size)
 
-    chunks = _split_chunks(text.strip())
-    label_counts  = {"positive": 0, "negative": 0, "neutral": 0}
-    confidences   = []
 
+def _score_chunks_local(chunks: list, batch_size: int) -> list:
+    """
+    Raw pipeline outputs for every chunk, run in padded batches.
+    A chunk that fails scores as None instead of sinking the whole batch.
+    """
+    if not chunks:
+        return []
+    sentiment_pipeline = get_sentiment_pipeline()
+    try:
+        return sentiment_pipeline(
+            chunks, batch_size=batch_size, truncation=True, max_length=512,
+        )
+    except Exception:
+        pass
+
+    # Batch failed — retry one by one so a single bad chunk is skipped
+    outputs = []
     for chunk in chunks:
         try:
-            result     = sentiment_pipeline(chunk, truncation=True, max_length=512)[0]
-            raw_label  = result.get("label", "").lower()
-            confidence = round(result.get("score", 0.0), 3)
-
-            if "positive" in raw_label:
-                # Low confidence positive = treat as neutral
-                label = "positive" if confidence >= 0.65 else "neutral"
-            elif "negative" in raw_label:
-                # Low confidence negative = treat as neutral
-                label = "negative" if confidence >= 0.65 else "neutral"
-            else:
-                label = "neutral"
-
-            label_counts[label] += 1
-            confidences.append(confidence)
+            outputs.append(sentiment_pipeline(chunk, truncation=True, max_length=512)[0])
         except Exception:
+            outputs.append(None)
+    return outputs
+
+
+def _chunk_label(result: dict):
+    """Map one raw pipeline output to (label, confidence)."""
+    raw_label  = result.get("label", "").lower()
+    confidence = round(result.get("score", 0.0), 3)
+
+    if "positive" in raw_label:
+        # Low confidence positive = treat as neutral
+        label = "positive" if confidence >= 0.65 else "neutral"
+    elif "negative" in raw_label:
+        # Low confidence negative = treat as neutral
+        label = "negative" if confidence >= 0.65 else "neutral"
+    else:
+        label = "neutral"
+    return label, confidence
+
+
+# Label order doubles as the tie-break: max() keeps the first of equals
+_LABEL_ORDER = ("positive", "negative", "neutral")
+
+
+def _majority_vote(results: list):
+    label_counts  = {label: 0 for label in _LABEL_ORDER}
+    confidences   = []
+
+    for result in results:
+        if result is None:
             continue
+        label, confidence = _chunk_label(result)
+        label_counts[label] += 1
+        confidences.append(confidence)
 
     if not confidences:
         return "neutral", 0.0
@@ -96,6 +354,175 @@ def get_ml_sentiment(text: str):
     return majority_label, avg_confidence
 
 
+def _load_inference_cache():
+    from inference_cache import InferenceCache, CACHE_PATH
+    return InferenceCache(CACHE_PATH) if CACHE_PATH else None
+
+
+def get_inference_cache():
+    return _get_engine("inference_cache", _load_inference_cache)
+
+
+def inference_cache_stats() -> dict:
+    cache = get_inference_cache()
+    return cache.stats() if cache else {}
+
+
+def _score_chunks_cached(chunks: list, batch_size: int) -> list:
+    """
+    _score_chunks behind the chunk-score cache. Only chunks that are not
+    cached — each distinct text once — reach the model.
+    """
+    cache = get_inference_cache()
+    if cache is None or not chunks:
+        return _score_chunks(chunks, batch_size)
+
+    from inference_cache import chunk_key
+
+    model_id = f"{ROBERTA_MODEL}:{ROBERTA_BACKEND}"
+    keys     = [chunk_key(model_id, chunk) for chunk in chunks]
+    found    = cache.get_many(keys)
+
+    missing = {}
+    for key, chunk in zip(keys, chunks):
+        if key not in found:
+            missing.setdefault(key, chunk)
+
+    if missing:
+        scored = _score_chunks(list(missing.values()), batch_size)
+        fresh  = {
+            key: {"label": result["label"], "score": result["score"]}
+            for key, result in zip(missing, scored) if result is not None
+        }
+        cache.put_many(fresh)
+        found.update(fresh)
+
+    return [found.get(key) for key in keys]
+
+
+# -------------------------------------------------------
+# Adaptive early exit: score chunks in rounds and stop once
+# the remaining chunks can no longer change the majority, or
+# every chunk so far agrees above ADAPTIVE_CONFIDENCE.
+# Confidence is then averaged over the scored chunks only.
+# -------------------------------------------------------
+ROBERTA_ADAPTIVE    = os.getenv("ROBERTA_ADAPTIVE", "0") == "1"
+ADAPTIVE_MIN_CHUNKS = int(os.getenv("ADAPTIVE_MIN_CHUNKS", "2"))
+ADAPTIVE_CONFIDENCE = float(os.getenv("ADAPTIVE_CONFIDENCE", "0.98"))
+
+
+def _vote_decided(results: list, remaining: int) -> bool:
+    if remaining <= 0:
+        return True
+
+    counts = {label: 0 for label in _LABEL_ORDER}
+    confidences = []
+    for result in results:
+        if result is None:
+            continue
+        label, confidence = _chunk_label(result)
+        counts[label] += 1
+        confidences.append(confidence)
+
+    leader = max(counts, key=counts.get)
+    rank   = _LABEL_ORDER.index
+
+    # Even if every remaining chunk went to X, X could not overtake the leader
+    locked = all(
+        counts[x] + remaining < counts[leader]
+        or (counts[x] + remaining == counts[leader] and rank(leader) < rank(x))
+        for x in _LABEL_ORDER if x != leader
+    )
+    if locked:
+        return True
+
+    return (
+        len(confidences) >= ADAPTIVE_MIN_CHUNKS
+        and counts[leader] == len(confidences)
+        and sum(confidences) / len(confidences) >= ADAPTIVE_CONFIDENCE
+    )
+
+
+def get_ml_sentiment_reports(texts: list, batch_size: int = None, adaptive: bool = None) -> list:
+    """
+    RoBERTa sentiment for many texts at once. Chunks of every text go
+    through the pipeline in padded batches of `batch_size`, then the chunk
+    results are folded back into one majority vote per text.
+
+    With `adaptive` (default ROBERTA_ADAPTIVE) chunks are scored in rounds
+    and a text drops out as soon as its vote is settled.
+
+    Returns one dict per text:
+    {"label", "confidence", "chunks_total", "chunks_scored", "chunks_skipped"}
+    """
+    adaptive   = ROBERTA_ADAPTIVE if adaptive is None else adaptive
+    batch_size = batch_size or ROBERTA_BATCH_SIZE
+
+    chunk_lists = [
+        _split_chunks(text.strip()) if text and len(text.strip()) >= 3 else []
+        for text in texts
+    ]
+    scored = [[] for _ in texts]
+
+    active = [i for i, chunks in enumerate(chunk_lists) if chunks]
+    step   = max(1, ADAPTIVE_MIN_CHUNKS) if adaptive else None
+    while active:
+        owners = []   # text index for each flattened chunk
+        batch  = []
+        for i in active:
+            pos  = len(scored[i])
+            take = chunk_lists[i][pos: pos + step] if step else chunk_lists[i]
+            owners += [i] * len(take)
+            batch  += take
+
+        for i, result in zip(owners, _score_chunks_cached(batch, batch_size)):
+            scored[i].append(result)
+
+        active = [
+            i for i in active
+            if not _vote_decided(scored[i], len(chunk_lists[i]) - len(scored[i]))
+        ]
+        step = 1
+
+    reports = []
+    for chunks, results in zip(chunk_lists, scored):
+        label, confidence = _majority_vote(results)
+        reports.append({
+            "label":          label,
+            "confidence":     confidence,
+            "chunks_total":   len(chunks),
+            "chunks_scored":  len(results),
+            "chunks_skipped": len(chunks) - len(results),
+        })
+    return reports
+
+
+def get_ml_sentiment_batch(texts: list, batch_size: int = None) -> list:
+    """
+    Batched get_ml_sentiment.
+    Returns: [(label, avg_confidence 0-1), ...] in the order of `texts`.
+    """
+    return [
+        (report["label"], report["confidence"])
+        for report in get_ml_sentiment_reports(texts, batch_size)
+    ]
+
+
+def get_ml_sentiment_report(text: str) -> dict:
+    """get_ml_sentiment plus how many chunks were scored and skipped."""
+    return get_ml_sentiment_reports([text])[0]
+
+
+def get_ml_sentiment(text: str):
+    """
+    Analyse sentiment using RoBERTa large across multiple chunks.
+    siebert/sentiment-roberta-large-english returns POSITIVE/NEGATIVE only.
+    Neutral is inferred when confidence is below 0.65 (model is uncertain).
+    Returns: (label, avg_confidence 0-1)
+    """
+    return get_ml_sentiment_batch([text])[0]
+
+
 # ----------------------------------------
 # VADER (rule-based and negation-aware)
 # ----------------------------------------
@@ -103,7 +530,7 @@ def get_vader_sentiment(text: str):
     if not text:
         return "neutral", 0.0
 
-    scores   = vader.polarity_scores(text)
+    scores   = get_vader().polarity_scores(text)
     compound = round(scores["compound"], 3)
 
     if compound >= 0.05:
@@ -125,6 +552,8 @@ def get_textblob_sentiment(text: str):
     if not text:
         return "neutral", 0.0
 
+    from textblob import TextBlob
+
     blob        = TextBlob(text)
     raw_polarity = blob.sentiment.polarity
 
@@ -150,14 +579,68 @@ def normalize_to_percent(score_minus1_to_1):
 # ----------------------------------------
 #  Gemini with JSON prompt and political lean
 # ----------------------------------------
-def get_gemini_sentiment(text: str):
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "15"))   # seconds per call, retries included
+
+# Bump when the prompts below change; part of the Gemini cache key
+GEMINI_PROMPT_VERSION = 1
+
+
+def _gemini_timeout(end):
+    """GEMINI_TIMEOUT, cut short by the monotonic `end`; None once it has passed."""
+    if end is None:
+        return GEMINI_TIMEOUT
+    remaining = end - time.monotonic()
+    return min(GEMINI_TIMEOUT, remaining) if remaining > 0 else None
+
+
+def _load_gemini_cache():
+    from gemini_cache import GeminiCache, CACHE_PATH
+    return GeminiCache(CACHE_PATH) if CACHE_PATH else None
+
+
+def get_gemini_cache():
+    return _get_engine("gemini_cache", _load_gemini_cache)
+
+
+def gemini_cache_stats() -> dict:
+    cache = get_gemini_cache()
+    return cache.stats() if cache else {}
+
+
+def get_gemini_sentiment(text: str, end: float = None):
     """
-    LLM-based sentiment + political lean scoring.
-    Returns: (label, score -1 to +1, lean: left|center|right|none)
+    LLM-based sentiment + political lean scoring. Answers are memoized by
+    prompt version, model and text, so an unchanged article costs one call.
+    `end` is the pipeline's monotonic deadline; the call gives up there.
+    Returns: (label, score -1 to +1, lean: left|center|right|none), neutral
+    when Gemini is not configured, None when the call fails (the pipeline
+    then leaves Gemini out of engines_used, like a timeout).
     """
-    if not text or not _gemini_model:
+    if not text or not get_gemini_model():
         return "neutral", 0.0, "none"
 
+    excerpt = text[:1500]
+    cache   = get_gemini_cache()
+    key     = None
+    if cache is not None:
+        from gemini_cache import gemini_key
+        key    = gemini_key(GEMINI_PROMPT_VERSION, _gemini_model_id(), excerpt, "single")
+        cached = cache.get(key)
+        if cached is not None:
+            return cached
+
+    result = _ask_gemini(excerpt, end)
+    if result is not None and cache is not None:
+        cache.put(key, result)
+    return result
+
+
+def _ask_gemini(excerpt: str, end: float = None):
+    """One Gemini request; None when it fails, runs out of time or the reply is unusable."""
+    timeout = _gemini_timeout(end)
+    if timeout is None:
+        return None
+
     prompt = (
         "You are a media bias analyst. Analyse this news article's narrative framing.\n"
         "Return ONLY valid JSON with these exact keys:\n"
@@ -165,29 +648,35 @@ def get_gemini_sentiment(text: str):
         "score: -1.0 = strongly critical/negative framing, +1.0 = strongly supportive/positive framing\n"
         "lean: political lean of the article's framing (left / center / right / none)\n"
         "Return only the JSON object, no other text.\n\n"
-        f"{text[:1500]}"
+        f"{excerpt}"
     )
 
     try:
-        response = _gemini_model.generate_content(prompt)
+        response = get_gemini_model().generate_content(
+            prompt, request_options={"timeout": timeout},
+        )
         raw      = response.text.strip()
 
         # Extract JSON from response
         json_match = re.search(r'\{[^{}]*\}', raw, re.DOTALL)
         if not json_match:
-            return "neutral", 0.0, "none"
+            return None
 
-        data  = json.loads(json_match.group())
-        score = float(data.get("score", 0.0))
-        lean  = str(data.get("lean", "none")).lower().strip()
+        return _gemini_result(json.loads(json_match.group()))
 
-        if lean not in ("left", "center", "right", "none"):
-            lean = "none"
+    except Exception:
+        return None
 
-        score = round(max(min(score, 1.0), -1.0), 3)
 
-    except Exception:
-        return "neutral", 0.0, "none"
+def _gemini_result(data: dict):
+    """(label, score, lean) from one parsed {"score", "lean"} object."""
+    score = float(data.get("score", 0.0))
+    lean  = str(data.get("lean", "none")).lower().strip()
+
+    if lean not in ("left", "center", "right", "none"):
+        lean = "none"
+
+    score = round(max(min(score, 1.0), -1.0), 3)
 
     if score > 0.05:
         label = "positive"
@@ -199,19 +688,128 @@ def get_gemini_sentiment(text: str):
     return label, score, lean
 
 
+# ----------------------------------------
+# Batched Gemini — several articles per request, so a batch
+# run or /compare spends one request of quota per
+# GEMINI_BATCH_SIZE articles instead of one per article.
+# ----------------------------------------
+GEMINI_BATCH_SIZE = int(os.getenv("GEMINI_BATCH_SIZE", "8"))
+
+
+def _ask_gemini_batch(excerpts: list, end: float = None) -> list:
+    """
+    One request for several articles. Returns (label, score, lean) per
+    excerpt, None for any article the reply left out or garbled. Always
+    the batch prompt, even for one article, so answers cached under the
+    "batch" key all come from the same template.
+    """
+    results = [None] * len(excerpts)
+    timeout = _gemini_timeout(end)
+    if timeout is None:
+        return results
+
+    articles = "\n\n".join(
+        f"### ARTICLE {i}\n{excerpt}" for i, excerpt in enumerate(excerpts, 1)
+    )
+    prompt = (
+        "You are a media bias analyst. Analyse the narrative framing of each news article below.\n"
+        "Return ONLY a valid JSON array with one object per article, in this exact form:\n"
+        '[{"id": <article number>, "score": <number from -1.0 to +1.0>, "lean": "<left|center|right|none>"}]\n'
+        "score: -1.0 = strongly critical/negative framing, +1.0 = strongly supportive/positive framing\n"
+        "lean: political lean of the article's framing (left / center / right / none)\n"
+        "Return only the JSON array, no other text.\n\n"
+        f"{articles}"
+    )
+
+    try:
+        response = get_gemini_model().generate_content(
+            prompt, request_options={"timeout": timeout},
+        )
+        json_match = re.search(r'\[.*\]', response.text, re.DOTALL)
+        items      = json.loads(json_match.group()) if json_match else []
+    except Exception:
+        return results
+
+    for item in items:
+        try:
+            i = int(item["id"]) - 1
+            if 0 <= i < len(excerpts):
+                results[i] = _gemini_result(item)
+        except (KeyError, TypeError, ValueError):
+            continue
+    return results
+
+
+def _gemini_group(excerpts: list, keys: list, end: float = None) -> list:
+    """_ask_gemini_batch plus cache writes; failures come back as None."""
+    results = _ask_gemini_batch(excerpts, end)
+    cache   = get_gemini_cache()
+    for key, result in zip(keys, results):
+        if result is not None and cache is not None:
+            cache.put(key, result)
+    return results
+
+
+def _submit_gemini_batch(texts: list, end: float = None) -> list:
+    """
+    Per text, a cached (label, score, lean) or a future for one. Distinct
+    uncached excerpts go GEMINI_BATCH_SIZE per request on the Gemini pool.
+    """
+    out = [("neutral", 0.0, "none")] * len(texts)
+    if not get_gemini_model():
+        return out
+
+    from gemini_cache import gemini_key
+
+    cache   = get_gemini_cache()
+    pending = {}   # excerpt -> (key, [text indices])
+    for i, text in enumerate(texts):
+        if not text:
+            continue
+        excerpt = text[:1500]
+        key     = gemini_key(GEMINI_PROMPT_VERSION, _gemini_model_id(), excerpt, "batch")
+        cached  = cache.get(key) if cache is not None and excerpt not in pending else None
+        if cached is not None:
+            out[i] = cached
+        else:
+            pending.setdefault(excerpt, (key, []))[1].append(i)
+
+    excerpts = list(pending)
+    for start in range(0, len(excerpts), max(1, GEMINI_BATCH_SIZE)):
+        group   = excerpts[start:start + max(1, GEMINI_BATCH_SIZE)]
+        keys    = [pending[excerpt][0] for excerpt in group]
+        futures = _fan_out(_gemini_pool().submit(_gemini_group, group, keys, end), len(group))
+        for excerpt, future in zip(group, futures):
+            for i in pending[excerpt][1]:
+                out[i] = future
+    return out
+
+
+def get_gemini_sentiment_batch(texts: list) -> list:
+    """get_gemini_sentiment for many texts, GEMINI_BATCH_SIZE articles per request."""
+    return [_join(result, None) for result in _submit_gemini_batch(texts)]
+
+
 # ----------------------------------------
 # Hybrid Narrative Fusion (all 4 engines)
 # ----------------------------------------
+ENGINES        = ("roberta", "vader", "textblob", "gemini")
+HYBRID_WEIGHTS = {"roberta": 0.40, "vader": 0.25, "textblob": 0.15, "gemini": 0.20}
+
+
 def compute_hybrid_narrative(
     rob_label,
     rob_conf,
     vader_score,
     tb_score,
     gemini_score=0.0,
+    engines=ENGINES,
 ):
     """
     Weighted fusion: 40% RoBERTa + 25% VADER + 15% TextBlob + 20% Gemini.
     Gemini defaults to 0.0 (neutral) if API key not set.
+    `engines` names the engines that finished; the weights of the others
+    are dropped and the rest re-normalised to sum to 1.
     """
     if rob_label == "positive":
         rob_direction = 1
@@ -220,14 +818,19 @@ def compute_hybrid_narrative(
     else:
         rob_direction = 0
 
-    roberta_component = rob_direction * rob_conf
+    components = {
+        "roberta":  rob_direction * rob_conf,
+        "vader":    vader_score,
+        "textblob": tb_score,
+        "gemini":   gemini_score,
+    }
+    used = [name for name in ENGINES if name in engines]
+    if not used:
+        return 0, "Balanced"
 
-    combined = (
-        0.40 * roberta_component +
-        0.25 * vader_score +
-        0.15 * tb_score +
-        0.20 * gemini_score
-    )
+    combined = sum(HYBRID_WEIGHTS[name] * components[name] for name in used)
+    if len(used) < len(ENGINES):
+        combined /= sum(HYBRID_WEIGHTS[name] for name in used)
 
     combined    = max(min(combined, 1), -1)
     final_score = int(round(combined * 100))
@@ -246,49 +849,143 @@ def compute_hybrid_narrative(
     return final_score, label
 
 
+# Bump when the fusion weights, thresholds or prompt change
+PIPELINE_REVISION = 1
+
+
+def engine_fingerprint() -> str:
+    """
+    Short hash of everything that can change run_sentiment_pipeline's output
+    for the same text. Stored on each AnalysisResult so unchanged articles
+    can reuse their last analysis instead of re-running the models.
+    """
+    parts = [
+        PIPELINE_REVISION,
+        ROBERTA_MODEL, ROBERTA_BACKEND, CHUNK_POLICY, CHUNK_STRIDE, CHUNK_MARGIN, TOKEN_BUDGET, _MAX_CHUNKS,
+        (ROBERTA_ADAPTIVE and (ADAPTIVE_MIN_CHUNKS, ADAPTIVE_CONFIDENCE)),
+        TEXTBLOB_SCALE_FACTOR,
+        f"{_gemini_model_id()}:{GEMINI_PROMPT_VERSION}" if gemini_enabled() else "gemini-off",
+    ]
+    raw = "|".join(str(p) for p in parts)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()[:16]
+
+
+# ----------------------------------------
+# Engine pools — the engines of one article run side by side,
+# local models on a small CPU pool and Gemini on its own I/O
+# pool, so an article takes about as long as its slowest engine.
+# ----------------------------------------
+LOCAL_ENGINE_WORKERS = int(os.getenv("LOCAL_ENGINE_WORKERS", "3"))
+GEMINI_WORKERS       = int(os.getenv("GEMINI_WORKERS", "4"))
+
+
+def _local_pool():
+    return _get_engine("local_pool", lambda: ThreadPoolExecutor(
+        max_workers=LOCAL_ENGINE_WORKERS, thread_name_prefix="engine"))
+
+
+def _gemini_pool():
+    return _get_engine("gemini_pool", lambda: ThreadPoolExecutor(
+        max_workers=GEMINI_WORKERS, thread_name_prefix="gemini"))
+
+
+def _submit_gemini(text: str, end: float = None):
+    return _gemini_pool().submit(get_gemini_sentiment, text, end)
+
+
+def _fan_out(future, n: int) -> list:
+    """Split a future of an n-item list into n futures, one per item."""
+    parts = [Future() for _ in range(n)]
+
+    def _done(f):
+        exc = f.exception()
+        for i, part in enumerate(parts):
+            if exc is not None:
+                part.set_exception(exc)
+            else:
+                part.set_result(f.result()[i])
+
+    future.add_done_callback(_done)
+    return parts
+
+
+def _join(pending, end):
+    """
+    Wait for a precomputed result or future until the monotonic `end`
+    (None = no limit). Returns None if the engine missed the deadline.
+    """
+    if isinstance(pending, tuple):
+        return pending
+    timeout = None if end is None else max(0.0, end - time.monotonic())
+    try:
+        return pending.result(timeout=timeout)
+    except FutureTimeout:
+        return None
+
+
 # ----------------------------------------
 # Full Sentiment Pipeline
 # ----------------------------------------
-def run_sentiment_pipeline(text: str):
+def run_sentiment_pipeline(text: str, roberta: tuple = None, gemini=None, deadline: float = None):
     """
     Main entry point used by news_demo.py.
+    `roberta` takes a precomputed (label, confidence), e.g. from
+    get_ml_sentiment_batch, so the model is not run again. `gemini` takes
+    a precomputed (label, score, lean) or a future for one.
+    `deadline` is a latency budget in seconds: engines that have not
+    finished by then are left out of the result (see engines_used).
     Returns a dictionary consumed by the templates.
     """
-    # RoBERTa
-    rob_label, rob_conf = get_ml_sentiment(text)
-    roberta_percent = round(rob_conf * 100, 2)
-
-    # VADER
-    vader_label, vader_score = get_vader_sentiment(text)
-    vader_percent = normalize_to_percent(vader_score)
-
-    # TextBlob
-    tb_label, tb_score = get_textblob_sentiment(text)
-    textblob_percent = normalize_to_percent(tb_score)
+    end = None if deadline is None else time.monotonic() + deadline
+    return _run_pipeline(text, roberta, gemini, end)
+
+
+def _run_pipeline(text: str, roberta, gemini, end):
+    # Dispatch every engine that was not precomputed, then join
+    if gemini is None:
+        gemini = _submit_gemini(text, end)
+    pool = _local_pool()
+    if roberta is None:
+        roberta = pool.submit(get_ml_sentiment, text)
+    vader    = pool.submit(get_vader_sentiment, text)
+    textblob = pool.submit(get_textblob_sentiment, text)
+
+    finished = {
+        "roberta":  _join(roberta, end),
+        "vader":    _join(vader, end),
+        "textblob": _join(textblob, end),
+        "gemini":   _join(gemini, end),
+    }
+    engines_used = [name for name in ENGINES if finished[name] is not None]
 
-    # Gemini
-    gemini_label, gemini_score, gemini_lean = get_gemini_sentiment(text)
-    gemini_percent = normalize_to_percent(gemini_score)
+    # An engine that missed the deadline or failed reports None for its
+    # label and percent (stored as NULL); the fusion only reads engines_used.
+    rob_label, rob_conf = finished["roberta"] or (None, 0.5)
+    vader_label, vader_score = finished["vader"] or (None, 0.0)
+    tb_label, tb_score = finished["textblob"] or (None, 0.0)
+    gemini_label, gemini_score, gemini_lean = finished["gemini"] or (None, 0.0, None)
 
-    # Hybrid narrative
+    # Hybrid narrative over the engines that finished
     narrative_score, narrative_label = compute_hybrid_narrative(
-        rob_label, rob_conf, vader_score, tb_score, gemini_score,
+        rob_label, rob_conf, vader_score, tb_score, gemini_score, engines_used,
     )
 
-    # Agreement across all 4 engines
-    labels    = [rob_label, vader_label, tb_label, gemini_label]
-    agreement = len(set(labels)) == 1
+    # Agreement across the engines that finished
+    labels  = {"roberta": rob_label, "vader": vader_label,
+               "textblob": tb_label, "gemini": gemini_label}
+    percent = {"roberta":  round(rob_conf * 100, 2),
+               "vader":    normalize_to_percent(vader_score),
+               "textblob": normalize_to_percent(tb_score),
+               "gemini":   normalize_to_percent(gemini_score)}
+    percent = {name: percent[name] if name in engines_used else None for name in ENGINES}
+    agreement = len({labels[name] for name in engines_used}) == 1
 
     # Divergence — max percentage-point spread between any two engines
     differences = [
-        abs(roberta_percent  - vader_percent),
-        abs(roberta_percent  - textblob_percent),
-        abs(roberta_percent  - gemini_percent),
-        abs(vader_percent    - textblob_percent),
-        abs(vader_percent    - gemini_percent),
-        abs(textblob_percent - gemini_percent),
+        abs(percent[a] - percent[b])
+        for i, a in enumerate(engines_used) for b in engines_used[i + 1:]
     ]
-    model_difference = round(max(differences), 2)
+    model_difference = round(max(differences, default=0.0), 2)
 
     if model_difference < 10:
         divergence_level = "Low"
@@ -302,7 +999,8 @@ def run_sentiment_pipeline(text: str):
     if model_difference > 40:
         narrative_label = "Uncertain \u2014 Models Disagree"
 
-    framing_intensity = int(round(roberta_percent))
+    roberta_percent   = percent["roberta"]
+    framing_intensity = None if roberta_percent is None else int(round(roberta_percent))
 
     return {
         # Individual engines
@@ -310,13 +1008,13 @@ def run_sentiment_pipeline(text: str):
         "roberta_percent": roberta_percent,
 
         "vader_label":   vader_label,
-        "vader_percent": vader_percent,
+        "vader_percent": percent["vader"],
 
         "textblob_label":   tb_label,
-        "textblob_percent": textblob_percent,
+        "textblob_percent": percent["textblob"],
 
         "gemini_label":   gemini_label,
-        "gemini_percent": gemini_percent,
+        "gemini_percent": percent["gemini"],
         "gemini_lean":    gemini_lean,       # political lean from Gemini
 
         # Hybrid result
@@ -328,4 +1026,22 @@ def run_sentiment_pipeline(text: str):
         "agreement":        agreement,
         "model_difference": model_difference,
         "divergence_level": divergence_level,
+
+        # Engines that finished inside the deadline
+        "engines_used": engines_used,
     }
+
+
+def run_sentiment_pipeline_batch(texts: list, deadline: float = None) -> list:
+    """
+    run_sentiment_pipeline for many texts, with RoBERTa batched across all
+    of them. The batched Gemini requests are sent first so they overlap it.
+    `deadline` is one budget shared by the whole batch.
+    """
+    end     = None if deadline is None else time.monotonic() + deadline
+    gemini  = _submit_gemini_batch(texts, end)
+    roberta = _fan_out(_local_pool().submit(get_ml_sentiment_batch, texts), len(texts))
+    return [
+        _run_pipeline(text, rob, gem, end)
+        for text, rob, gem in zip(texts, roberta, gemini)
+    ]
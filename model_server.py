@@ -0,0 +1,185 @@
+"""
+Shared RoBERTa inference server.
+
+One process owns the roberta-large pipeline and every web worker on the
+node sends it chunks over a Unix socket, instead of each worker loading its
+own ~1.4 GB copy. Requests that arrive within BATCH_WINDOW_MS of each other
+are merged into one padded forward pass.
+
+Usage:
+python model_server.py                 # listens on MODEL_SERVER_SOCKET
+
+Web workers use it when MODEL_SERVER_SOCKET is set; if the server is down
+get_ml_sentiment falls back to in-process inference.
+
+Wire format: 4-byte big-endian length, then a UTF-8 JSON body.
+  request:  {"chunks": ["...", ...]}
+  response: {"results": [{"label": "POSITIVE", "score": 0.98} | null, ...]}
+            or {"error": "..."}
+"""
+import json
+import os
+import queue
+import socket
+import socketserver
+import struct
+import threading
+import time
+
+
+SOCKET_PATH     = os.getenv("MODEL_SERVER_SOCKET", "")
+DEFAULT_SOCKET  = os.path.join("instance", "model_server.sock")
+BATCH_WINDOW_MS = float(os.getenv("MODEL_SERVER_BATCH_WINDOW_MS", "10"))
+MAX_BATCH       = int(os.getenv("MODEL_SERVER_MAX_BATCH", "32"))
+CLIENT_TIMEOUT  = float(os.getenv("MODEL_SERVER_TIMEOUT", "60"))
+
+
+class ModelServerError(Exception):
+    pass
+
+
+# ----------------------------------------
+# Framing
+# ----------------------------------------
+def _recv_exact(sock, n: int) -> bytes:
+    data = b""
+    while len(data) < n:
+        part = sock.recv(n - len(data))
+        if not part:
+            raise ModelServerError("connection closed")
+        data += part
+    return data
+
+
+def send_message(sock, payload: dict):
+    body = json.dumps(payload).encode("utf-8")
+    sock.sendall(struct.pack(">I", len(body)) + body)
+
+
+def recv_message(sock) -> dict:
+    (length,) = struct.unpack(">I", _recv_exact(sock, 4))
+    return json.loads(_recv_exact(sock, length).decode("utf-8"))
+
+
+# ----------------------------------------
+# Client
+# ----------------------------------------
+def score_chunks_remote(chunks: list, socket_path: str,
+                        timeout: float = CLIENT_TIMEOUT) -> list:
+    """Score chunks on the shared server. Raises if it cannot be reached."""
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+        sock.settimeout(timeout)
+        sock.connect(socket_path)
+        send_message(sock, {"chunks": chunks})
+        reply = recv_message(sock)
+    if "error" in reply:
+        raise ModelServerError(reply["error"])
+    return reply["results"]
+
+
+# ----------------------------------------
+# Server
+# ----------------------------------------
+class MicroBatcher:
+    """
+    Collects concurrent requests for up to `window` seconds (or until
+    max_batch chunks are waiting) and scores them in a single call.
+    """
+
+    def __init__(self, score_fn, window: float, max_batch: int):
+        self.score_fn  = score_fn
+        self.window    = window
+        self.max_batch = max_batch
+        self.batches   = 0
+        self._queue    = queue.Queue()
+        threading.Thread(target=self._loop, daemon=True).start()
+
+    def submit(self, chunks: list) -> list:
+        slot = {"chunks": chunks, "done": threading.Event()}
+        self._queue.put(slot)
+        slot["done"].wait()
+        if "error" in slot:
+            raise ModelServerError(slot["error"])
+        return slot["results"]
+
+    def _loop(self):
+        while True:
+            batch    = [self._queue.get()]
+            waiting  = len(batch[0]["chunks"])
+            deadline = time.monotonic() + self.window
+            while waiting < self.max_batch:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    slot = self._queue.get(timeout=remaining)
+                except queue.Empty:
+                    break
+                batch.append(slot)
+                waiting += len(slot["chunks"])
+
+            all_chunks = [chunk for slot in batch for chunk in slot["chunks"]]
+            try:
+                outputs = self.score_fn(all_chunks)
+            except Exception as exc:
+                for slot in batch:
+                    slot["error"] = str(exc)
+                    slot["done"].set()
+                continue
+
+            self.batches += 1
+            pos = 0
+            for slot in batch:
+                n = len(slot["chunks"])
+                slot["results"] = [
+                    None if r is None else {"label": r["label"], "score": float(r["score"])}
+                    for r in outputs[pos:pos + n]
+                ]
+                pos += n
+                slot["done"].set()
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        try:
+            request = recv_message(self.request)
+            results = self.server.batcher.submit(request.get("chunks") or [])
+            send_message(self.request, {"results": results})
+        except Exception as exc:
+            try:
+                send_message(self.request, {"error": str(exc)})
+            except OSError:
+                pass
+
+
+class ModelServer(socketserver.ThreadingUnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, score_fn,
+                 window_ms: float = BATCH_WINDOW_MS, max_batch: int = MAX_BATCH):
+        if os.path.exists(socket_path):
+            os.remove(socket_path)   # stale socket from a previous run
+        self.batcher = MicroBatcher(score_fn, window_ms / 1000, max_batch)
+        super().__init__(socket_path, _Handler)
+
+
+def _local_score_fn():
+    from ml_sentiment import get_sentiment_pipeline, _score_chunks_local, ROBERTA_BATCH_SIZE
+    get_sentiment_pipeline()("Warm-up sentence.", truncation=True, max_length=512)
+    return lambda chunks: _score_chunks_local(chunks, ROBERTA_BATCH_SIZE)
+
+
+if __name__ == "__main__":
+    path = SOCKET_PATH or DEFAULT_SOCKET
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    print("Loading models...")
+    server = ModelServer(path, _local_score_fn())
+    print(f"Model server listening on {path} "
+          f"(window {BATCH_WINDOW_MS} ms, max batch {MAX_BATCH}). Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(path)
@@ -1,56 +1,60 @@
 import os
 import csv
 import io
-from datetime import datetime
+import json
+import hashlib
+import re
+import threading
+from datetime import datetime, timedelta
 from urllib.parse import urlparse
 
 from flask import Flask, render_template, request, redirect, url_for, Response, jsonify
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy import text
-from newspaper import Article as NewsArticle
-import trafilatura
-
-from ml_sentiment import run_sentiment_pipeline
+from sqlalchemy import DDL, Integer, case, column, event, func, or_, select, text, tuple_
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+from sqlalchemy.orm import joinedload
+
+from ml_sentiment import (
+    run_sentiment_pipeline_batch, engine_fingerprint, inference_cache_stats,
+    gemini_cache_stats, ENGINES,
+)
 from bias_analysis import analyse_bias_language
+from lexicon_store import current as current_lexicons
 from outlet_leans import get_outlet_info
+from ingest import run_concurrent
+from fetcher import fetch_article
+import storage
+from migrations import FTS_DDL
 
 app = Flask(__name__)
 
-app.config["SQLALCHEMY_DATABASE_URI"] = "sqlite:///news.db"
+app.config["SQLALCHEMY_DATABASE_URI"] = os.getenv("DATABASE_URL", "sqlite:///news.db")
 app.config["SQLALCHEMY_TRACK_MODIFICATIONS"] = False
+# WAL, busy timeout and pool sizing for file databases (see storage.py)
+app.config["SQLALCHEMY_ENGINE_OPTIONS"] = storage.engine_options(app.config["SQLALCHEMY_DATABASE_URI"])
+
+# Latency budget (seconds) for /analyze and /compare jobs; engines still
+# running after it are left out of the result. 0 disables the deadline.
+app.config["ANALYZE_DEADLINE"] = float(os.getenv("ANALYZE_DEADLINE", "20"))
+
+# Rows per /history page
+app.config["HISTORY_PAGE_SIZE"] = int(os.getenv("HISTORY_PAGE_SIZE", "50"))
 db = SQLAlchemy(app)
+with app.app_context():
+    storage.configure(db.engine)
 
 
 # -------------------------------------------------------
 # Category detection
 # -------------------------------------------------------
-CATEGORY_KEYWORDS = {
-    "Politics": [
-        "election", "vote", "government", "president", "congress", "parliament",
-        "minister", "policy", "politician", "democrat", "republican", "senate",
-        "legislation", "budget", "political", "campaign", "candidate",
-    ],
-    "Health": [
-        "covid", "vaccine", "hospital", "doctor", "medical", "health", "patient",
-        "disease", "treatment", "virus", "pandemic", "diagnosis", "therapy",
-        "mental health", "clinical", "pharmaceutical",
-    ],
-    "Environment": [
-        "climate", "environment", "carbon", "emissions", "renewable", "solar",
-        "wind", "pollution", "biodiversity", "conservation", "sustainability",
-        "wildfire", "flood", "drought", "green", "eco",
-    ],
-    "Sports": [
-        "game", "match", "team", "player", "championship", "league", "score",
-        "football", "soccer", "basketball", "tennis", "olympics", "tournament",
-        "coach", "season", "playoff",
-    ],
-}
-
-def detect_category(title: str, text: str) -> str:
+# Keywords live in lexicons/categories.json (see lexicon_store).
+# Matching is by substring, so "eco" also counts inside "economy".
+def detect_category(title: str, text: str, lexicons=None) -> str:
     combined = f"{(title or '')} {(text or '')}".lower()
-    scores = {cat: sum(1 for kw in kws if kw in combined)
-              for cat, kws in CATEGORY_KEYWORDS.items()}
+    lexicons = lexicons or current_lexicons()
+    found    = lexicons.category_matcher.find_all(combined)
+    scores   = {cat: sum(1 for kw in kws if kw in found)
+                for cat, kws in lexicons.categories.items()}
     best = max(scores, key=scores.get)
     return best if scores[best] >= 1 else "General"
 
@@ -67,20 +71,52 @@ def confidence_level(score: float) -> str:
 # Database models
 # -------------------------------------------------------
 class Article(db.Model):
+    __table_args__ = (
+        db.Index("ix_article_source", "source"),
+    )
+
     id         = db.Column(db.Integer, primary_key=True)
     url        = db.Column(db.String(500), unique=True, nullable=False)
     title      = db.Column(db.String(300))
     source     = db.Column(db.String(200))
     text       = db.Column(db.Text)
+    text_hash  = db.Column(db.String(64), nullable=True)   # sha256 of text
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 
+# article_fts (full-text search) is created with the article table on fresh
+# databases; existing ones get it from migration 6.
+for _statement in FTS_DDL:
+    event.listen(Article.__table__, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+event.listen(Article.__table__, "before_drop",
+             DDL("DROP TABLE IF EXISTS article_fts").execute_if(dialect="sqlite"))
+
+
 class AnalysisResult(db.Model):
     """Stores every engine result so we never need to re-analyse for CSV export."""
+    # Same names as migrations.INDEXES, so create_all and migrate agree
+    __table_args__ = (
+        db.Index("ix_analysis_result_article_created", "article_id", "created_at"),
+        db.Index("ix_analysis_result_created_id", "created_at", "id"),
+        db.Index("ix_analysis_result_category", "category"),
+    )
+
     id             = db.Column(db.Integer, primary_key=True)
     article_id     = db.Column(db.Integer, db.ForeignKey("article.id"), nullable=False)
     created_at     = db.Column(db.DateTime, default=datetime.utcnow)
 
+    # Fingerprint of the engine configuration that produced this row
+    engine_version = db.Column(db.String(64), nullable=True)
+
+    # Comma-separated engines that finished inside the deadline (NULL = all)
+    engines_used   = db.Column(db.String(64), nullable=True)
+
+    # Article.text_hash of the text this row was scored on (NULL = unknown)
+    text_hash      = db.Column(db.String(64), nullable=True)
+
+    # Lexicon files the bias / category columns were scored with
+    lexicon_version = db.Column(db.String(32), nullable=True)
+
     # RoBERTa (primary)
     sentiment_label = db.Column(db.String(20))
     sentiment_score = db.Column(db.Float)
@@ -119,6 +155,11 @@ class AnalysisResult(db.Model):
 
 class UserFeedback(db.Model):
     """Phase 3: stores user correction ratings for each analysis."""
+    __table_args__ = (
+        db.Index("ix_user_feedback_rating", "rating"),
+        db.Index("ix_user_feedback_user_lean", "user_lean"),
+    )
+
     id         = db.Column(db.Integer, primary_key=True)
     article_id = db.Column(db.Integer, db.ForeignKey("article.id"), nullable=False)
     rating     = db.Column(db.Integer)       
@@ -128,61 +169,174 @@ class UserFeedback(db.Model):
     article = db.relationship("Article", backref=db.backref("feedback", lazy=True))
 
 
+class AnalysisJob(db.Model):
+    """Queued /analyze or /compare request, processed by worker.py."""
+    __table_args__ = (
+        db.Index("ix_analysis_job_status", "status"),
+    )
+
+    id          = db.Column(db.Integer, primary_key=True)
+    kind        = db.Column(db.String(20), nullable=False)                # analyze | compare
+    status      = db.Column(db.String(20), nullable=False, default="queued")
+    created_at  = db.Column(db.DateTime, default=datetime.utcnow)
+    started_at  = db.Column(db.DateTime, nullable=True)
+    finished_at = db.Column(db.DateTime, nullable=True)
+
+    # Which worker holds a running job, and until when; worker.py renews the
+    # lease while it works and only requeues jobs whose lease ran out
+    worker_id     = db.Column(db.String(64), nullable=True)
+    lease_expires = db.Column(db.DateTime, nullable=True)
+
+    items = db.relationship("AnalysisJobItem", backref="job", lazy=True,
+                            order_by="AnalysisJobItem.position")
+
+
+class AnalysisJobItem(db.Model):
+    """One URL inside a job; holds its progress and the finished result."""
+    __table_args__ = (
+        db.Index("ix_analysis_job_item_job_id", "job_id"),
+    )
+
+    id          = db.Column(db.Integer, primary_key=True)
+    job_id      = db.Column(db.Integer, db.ForeignKey("analysis_job.id"), nullable=False)
+    position    = db.Column(db.Integer, nullable=False)
+    url         = db.Column(db.String(500), nullable=False)
+    label       = db.Column(db.String(200), nullable=True)
+    country     = db.Column(db.String(100), nullable=True)
+    status      = db.Column(db.String(20), nullable=False, default="queued")   # queued | fetching | analysing | done | failed
+    result_json = db.Column(db.Text, nullable=True)
+    error       = db.Column(db.String(300), nullable=True)
+
+
+class StatsRollup(db.Model):
+    """Running totals behind /stats, one row per (metric, key).
+
+    Updated in the same transaction as the AnalysisResult / UserFeedback
+    write that changes them; rebuild_stats.py recomputes them from scratch.
+    """
+    __tablename__  = "stats_rollup"
+    __table_args__ = (
+        db.Index("ix_stats_rollup_metric_count", "metric", "count"),
+    )
+
+    metric = db.Column(db.String(30), primary_key=True)    # analyses | source | category | divergence | feedback | rating | user_lean
+    key    = db.Column(db.String(200), primary_key=True)   # "" for whole-table totals
+    count  = db.Column(db.Integer, nullable=False, default=0)
+    total  = db.Column(db.Float, nullable=False, default=0.0)   # summed value, for averages
+
+
 # -------------------------------------------------------
-# DB migration adds new columns to existing
-# tables without destroying data already in news.db
+# Stats rollups: callers add their changes before committing,
+# so the totals move in the same transaction as the rows
 # -------------------------------------------------------
-def run_migrations():
-    new_columns = [
-        ("analysis_result", "narrative_score",  "INTEGER  DEFAULT 0"),
-        ("analysis_result", "narrative_label",  "VARCHAR(50) DEFAULT 'Balanced'"),
-        ("analysis_result", "vader_label",       "VARCHAR(20) DEFAULT 'neutral'"),
-        ("analysis_result", "vader_percent",     "FLOAT    DEFAULT 50.0"),
-        ("analysis_result", "textblob_label",    "VARCHAR(20) DEFAULT 'neutral'"),
-        ("analysis_result", "textblob_percent",  "FLOAT    DEFAULT 50.0"),
-        ("analysis_result", "gemini_label",      "VARCHAR(20) DEFAULT 'neutral'"),
-        ("analysis_result", "gemini_percent",    "FLOAT    DEFAULT 50.0"),
-        ("analysis_result", "gemini_lean",       "VARCHAR(20) DEFAULT 'none'"),
-        ("analysis_result", "bias_level",        "VARCHAR(20) DEFAULT 'low'"),
-        ("analysis_result", "bias_score",        "INTEGER  DEFAULT 0"),
-        ("analysis_result", "emotive_ratio",     "FLOAT    DEFAULT 0.0"),
-        ("analysis_result", "certainty_per_1000","FLOAT    DEFAULT 0.0"),
-        ("analysis_result", "total_words",       "INTEGER  DEFAULT 0"),
-        ("analysis_result", "model_agreement",   "BOOLEAN  DEFAULT 0"),
-        ("analysis_result", "divergence_level",  "VARCHAR(20) DEFAULT 'Low'"),
-        ("analysis_result", "divergence_pct",    "FLOAT    DEFAULT 0.0"),
-        ("analysis_result", "category",          "VARCHAR(50) DEFAULT 'General'"),
+def bump_rollups(changes):
+    """Add (metric, key, count, total) changes to stats_rollup; does not commit."""
+    merged = {}
+    for metric, key, count, total in changes:
+        old = merged.get((metric, key), (0, 0.0))
+        merged[(metric, key)] = (old[0] + count, old[1] + total)
+    rows = [
+        {"metric": metric, "key": key, "count": count, "total": total}
+        for (metric, key), (count, total) in merged.items() if count or total
     ]
-    with db.engine.connect() as conn:
-        for table, col, col_type in new_columns:
-            try:
-                conn.execute(text(f"ALTER TABLE {table} ADD COLUMN {col} {col_type}"))
-                conn.commit()
-            except Exception:
-                pass   
+    if not rows:
+        return
+
+    table = StatsRollup.__table__
+    stmt  = sqlite_insert(table)
+    stmt  = stmt.on_conflict_do_update(
+        index_elements=["metric", "key"],
+        set_={
+            "count": table.c["count"] + stmt.excluded["count"],
+            "total": table.c["total"] + stmt.excluded["total"],
+        },
+    )
+    db.session.execute(stmt, rows)
+
+
+def analysis_rollups(source, category, divergence, sign: int = 1) -> list:
+    """Rollup changes for adding (sign=1) or removing (sign=-1) one analysis."""
+    changes = [("analyses", "", sign, 0.0), ("source", source or "", sign, 0.0)]
+    if category is not None:
+        changes.append(("category", category, sign, 0.0))
+    if divergence is not None:
+        changes.append(("divergence", "", sign, sign * divergence))
+    return changes
+
+
+def category_rollups(old, new) -> list:
+    """Rollup changes for an analysis whose category was rewritten."""
+    if old == new:
+        return []
+    return ([("category", old, -1, 0.0)] if old is not None else []) + \
+           ([("category", new, 1, 0.0)] if new is not None else [])
+
+
+def rebuild_rollups():
+    """Recompute stats_rollup from the analysis and feedback tables."""
+    from migrations import ROLLUP_REBUILD
+    for statement in ROLLUP_REBUILD:
+        db.session.execute(text(statement))
+    db.session.commit()
+
+
+def read_stats(top_sources: int = 10) -> dict:
+    """The /stats figures, read from stats_rollup."""
+    rows = (
+        StatsRollup.query
+        .filter(StatsRollup.metric != "source", StatsRollup.count > 0)
+        .order_by(StatsRollup.count.desc(), StatsRollup.key)
+        .all()
+    )
+    counts     = {(row.metric, row.key): row.count for row in rows}
+    divergence = next((row for row in rows if row.metric == "divergence"), None)
+    sources    = (
+        StatsRollup.query
+        .filter(StatsRollup.metric == "source", StatsRollup.count > 0)
+        .order_by(StatsRollup.count.desc(), StatsRollup.key)
+        .limit(top_sources)
+        .all()
+    )
+
+    total_feedback = counts.get(("feedback", ""), 0)
+    positive_count = counts.get(("rating", "1"), 0)
+    return {
+        "total_analyses":  counts.get(("analyses", ""), 0),
+        "total_feedback":  total_feedback,
+        "positive_count":  positive_count,
+        "negative_count":  counts.get(("rating", "-1"), 0),
+        "accuracy_pct":    round(positive_count / total_feedback * 100, 1) if total_feedback else None,
+        "lean_counts":     {lean: counts.get(("user_lean", lean), 0)
+                            for lean in ("left", "center", "right", "none")},
+        "top_sources":     [(row.key, row.count) for row in sources],
+        "category_counts": [(row.key, row.count) for row in rows if row.metric == "category"],
+        "avg_divergence":  round(divergence.total / divergence.count, 1) if divergence else 0,
+    }
 
 
 # -------------------------------------------------------
-# Rescrape sources.txt only when the file changes on disk.
+# Schema migrations live in migrations.py; this only
+# applies the pending ones (no DDL when already current)
 # -------------------------------------------------------
-_analysis_cache: dict = {"results": None, "mtime": 0.0}
+def run_migrations():
+    from migrations import migrate
+    return migrate(db.engine)
 
-def run_sentiment_analysis(force: bool = False):
-    global _analysis_cache
 
-    sources_path = "sources.txt"
-    try:
-        mtime = os.path.getmtime(sources_path)
-    except FileNotFoundError:
-        return []
+# -------------------------------------------------------
+# Rescrape sources.txt only when the file changes on disk,
+# and then only the URLs that were added since last time.
+# -------------------------------------------------------
+SOURCES_PATH = "sources.txt"
 
-    if (not force
-            and _analysis_cache["results"] is not None
-            and mtime == _analysis_cache["mtime"]):
-        return _analysis_cache["results"]
+_analysis_cache: dict = {"results": {}, "urls": None, "mtime": 0.0}
+_analysis_lock  = threading.Lock()
 
+
+def read_sources(path: str) -> list:
+    """URLs from a sources file, in file order. Lines may be `label|url`."""
     urls = []
-    with open(sources_path) as f:
+    with open(path) as f:
         for line in f:
             line = line.strip()
             if not line:
@@ -190,148 +344,273 @@ def run_sentiment_analysis(force: bool = False):
             if "|" in line:
                 line = line.split("|", 1)[1].strip()
             urls.append(line)
+    return urls
 
-    results = []
-    for url in urls:
-        try:
-            results.append(analyze_single_url(url))
-        except Exception:
-            continue
 
-    _analysis_cache = {"results": results, "mtime": mtime}
-    return results
+def run_sentiment_analysis(force: bool = False):
+    global _analysis_cache
 
+    try:
+        mtime = os.path.getmtime(SOURCES_PATH)
+    except FileNotFoundError:
+        return []
 
-# -------------------------------------------------------
-# Core analysis function
-# -------------------------------------------------------
-def analyze_single_url(url: str) -> dict:
-    a = NewsArticle(url)
-    a.download()
-    a.parse()
+    with _analysis_lock:
+        cache = _analysis_cache
+        if (not force
+                and cache["urls"] is not None
+                and mtime == cache["mtime"]):
+            return [cache["results"][u] for u in cache["urls"] if u in cache["results"]]
 
-    title = a.title or ""
-    body  = a.text  or ""
+        urls = read_sources(SOURCES_PATH)
 
-    # Fallback: trafilatura handles JS-heavy / paywalled sites
-    if len(body.split()) < 50:
-        downloaded = trafilatura.fetch_url(url)
-        fallback   = trafilatura.extract(downloaded) or ""
-        if len(fallback.split()) > len(body.split()):
-            body = fallback
+        # Keep results for URLs still listed; labels are not part of the key,
+        # so renaming a `label|url` line costs nothing.
+        previous = {} if force else cache["results"]
+        results  = {u: previous[u] for u in urls if u in previous}
 
-    if not body:
-        body = title
+        missing = [u for u in dict.fromkeys(urls) if u not in results]
+        for result in run_concurrent(missing, fetch_article, analyse_batch=_analyse_in_app_context):
+            results[result["url"]] = result
 
-    # Run all 4 engines
-    sentiment_data = run_sentiment_pipeline(body)
+        _analysis_cache = {"results": results, "urls": urls, "mtime": mtime}
+        return [results[u] for u in urls if u in results]
 
-    sentiment_label  = sentiment_data["roberta_label"]
-    sentiment_score  = sentiment_data["roberta_percent"] / 100
-    roberta_percent  = sentiment_data["roberta_percent"]
 
-    vader_label      = sentiment_data["vader_label"]
-    vader_percent    = sentiment_data["vader_percent"]
+def cached_source_results() -> list:
+    """The sources.txt results already in memory; never fetches or analyses."""
+    cache = _analysis_cache
+    if cache["urls"] is None:
+        return []
+    return [cache["results"][u] for u in cache["urls"] if u in cache["results"]]
 
-    textblob_label   = sentiment_data["textblob_label"]
-    textblob_percent = sentiment_data["textblob_percent"]
 
-    gemini_label     = sentiment_data.get("gemini_label",   "neutral")
-    gemini_percent   = sentiment_data.get("gemini_percent", 50.0)
-    gemini_lean      = sentiment_data.get("gemini_lean",    "none")    
+def _analyse_in_app_context(items: list, deadline: float = None) -> list:
+    # Worker threads don't inherit the request's app context
+    with app.app_context():
+        return analyse_articles(items, deadline=deadline)
+
 
-    narrative_direction_label = sentiment_data["narrative_direction_label"]
-    narrative_direction_score = sentiment_data["narrative_direction_score"]
-    framing_intensity         = sentiment_data["framing_intensity"]
+# -------------------------------------------------------
+# Core analysis function
+# -------------------------------------------------------
+def analyze_single_url(url: str) -> dict:
+    return analyse_article(url, fetch_article(url))
 
-    agreement        = sentiment_data["agreement"]
-    model_difference = sentiment_data["model_difference"]
-    divergence_level = sentiment_data["divergence_level"]
 
-    conf_level = confidence_level(sentiment_score)
+def content_hash(text: str) -> str:
+    return hashlib.sha256((text or "").encode("utf-8")).hexdigest()
 
-    bias_info   = analyse_bias_language(body)
-    category    = detect_category(title, body)
-    source_domain = urlparse(url).netloc
-    outlet_info = get_outlet_info(source_domain)
 
+def _store_article(url: str, title: str, source: str, body: str, body_hash: str):
+    """Insert the article, or refresh its stored text when the page changed."""
     article_row = Article.query.filter_by(url=url).first()
     if not article_row:
-        article_row = Article(url=url, title=title, source=source_domain, text=body)
+        article_row = Article(url=url, title=title, source=source,
+                              text=body, text_hash=body_hash)
         db.session.add(article_row)
         db.session.commit()
+        return article_row, False
+
+    stored_hash = article_row.text_hash or content_hash(article_row.text)
+    unchanged   = stored_hash == body_hash
+    if not unchanged or article_row.text_hash is None:
+        article_row.title     = title
+        article_row.text      = body
+        article_row.text_hash = body_hash
+        db.session.commit()
+    return article_row, unchanged
+
+
+_ALL_ENGINES = ",".join(ENGINES)
+
+
+def _latest_analysis(article_id: int, engine_version: str, text_hash: str):
+    # Rows where an engine missed its deadline are never reused, nor rows
+    # scored on an earlier text of the article
+    return (
+        AnalysisResult.query
+        .filter_by(article_id=article_id, engine_version=engine_version, text_hash=text_hash)
+        .filter(db.or_(AnalysisResult.engines_used.is_(None),
+                       AnalysisResult.engines_used == _ALL_ENGINES))
+        .order_by(AnalysisResult.created_at.desc(), AnalysisResult.id.desc())
+        .first()
+    )
+
+
+def analyse_article(url: str, fetched: dict) -> dict:
+    """
+    Run the engines on an already-fetched article and store the result.
+    If the article text and the engine fingerprint both match a stored
+    analysis, that analysis is returned and no model runs.
+    """
+    result = analyse_articles([(url, fetched)])[0]
+    if isinstance(result, Exception):
+        raise result
+    return result
+
+
+def analyse_articles(items: list, deadline: float = None) -> list:
+    """
+    Batch form of analyse_article for [(url, fetched), ...]. RoBERTa runs
+    once over every article that needs a fresh analysis, within `deadline`
+    seconds if given.
+    Returns one result dict — or the Exception it raised — per item, in order.
+    """
+    version = engine_fingerprint()
+    outputs = [None] * len(items)
+    todo    = []   # (index, article_row, fetched, bias_info, lexicons)
+
+    for i, (url, fetched) in enumerate(items):
+        try:
+            body      = fetched["text"]
+            article_row, unchanged = _store_article(
+                url, fetched["title"], urlparse(url).netloc, body, content_hash(body),
+            )
+            # One lexicon bundle for everything this analysis records
+            lexicons  = current_lexicons()
+            bias_info = analyse_bias_language(body, lexicons)
+
+            stored = _latest_analysis(article_row.id, version, article_row.text_hash) if unchanged else None
+            if stored and stored.lexicon_version != bias_info["lexicon_version"]:
+                # Sentiment still valid; only the lexicon-based columns are stale
+                fields = _lexicon_fields(fetched, bias_info, lexicons)
+                bump_rollups(category_rollups(stored.category, fields["category"]))
+                for field, value in fields.items():
+                    setattr(stored, field, value)
+                db.session.commit()
+            if stored:
+                outputs[i] = _build_result(article_row, stored, bias_info, fetched, reused=True)
+            else:
+                todo.append((i, article_row, fetched, bias_info, lexicons))
+        except Exception as exc:
+            db.session.rollback()
+            outputs[i] = exc
+
+    if not todo:
+        return outputs
+
+    # Run all 4 engines, RoBERTa batched across articles
+    try:
+        sentiments = run_sentiment_pipeline_batch(
+            [fetched["text"] for _, _, fetched, _, _ in todo], deadline=deadline,
+        )
+    except Exception as exc:
+        for i, *_ in todo:
+            outputs[i] = exc
+        return outputs
+
+    for (i, article_row, fetched, bias_info, lexicons), sentiment_data in zip(todo, sentiments):
+        try:
+            analysis = _save_analysis(article_row, fetched, sentiment_data, bias_info, lexicons, version)
+            outputs[i] = _build_result(article_row, analysis, bias_info, fetched, reused=False)
+        except Exception as exc:
+            db.session.rollback()
+            outputs[i] = exc
+    return outputs
+
+
+def _lexicon_fields(fetched: dict, bias_info: dict, lexicons) -> dict:
+    """
+    AnalysisResult columns that depend on the lexicon files. `bias_info`
+    must have been scored with `lexicons`, the bundle whose version is recorded.
+    """
+    return {
+        "bias_level":         bias_info["bias_level"],
+        "bias_score":         bias_info["bias_intensity_score"],
+        "emotive_ratio":      bias_info["emotive_ratio"],
+        "certainty_per_1000": bias_info["certainty_per_1000"],
+        "total_words":        bias_info["total_words"],
+        "category":           detect_category(fetched["title"], fetched["text"], lexicons),
+        "lexicon_version":    lexicons.version,
+    }
 
+
+def _fraction(percent):
+    """0-100 percent as a 0-1 score; None (engine left out) stays NULL."""
+    return None if percent is None else percent / 100
+
+
+def _save_analysis(article_row, fetched: dict, sentiment_data: dict, bias_info: dict, lexicons, version: str):
     # Save full analysis so export_csv can read from DB
     analysis = AnalysisResult(
         article_id=article_row.id,
+        engine_version=version,
+        engines_used=",".join(sentiment_data["engines_used"]),
+        text_hash=article_row.text_hash,
 
-        sentiment_label=sentiment_label,
-        sentiment_score=sentiment_score,
+        sentiment_label=sentiment_data["roberta_label"],
+        sentiment_score=_fraction(sentiment_data["roberta_percent"]),
 
-        narrative_score=narrative_direction_score,
-        narrative_label=narrative_direction_label,
+        narrative_score=sentiment_data["narrative_direction_score"],
+        narrative_label=sentiment_data["narrative_direction_label"],
 
-        vader_label=vader_label,
-        vader_percent=vader_percent,
+        vader_label=sentiment_data["vader_label"],
+        vader_percent=sentiment_data["vader_percent"],
 
-        textblob_label=textblob_label,
-        textblob_percent=textblob_percent,
+        textblob_label=sentiment_data["textblob_label"],
+        textblob_percent=sentiment_data["textblob_percent"],
 
-        gemini_label=gemini_label,
-        gemini_percent=gemini_percent,
-        gemini_lean=gemini_lean,
+        gemini_label=sentiment_data["gemini_label"],
+        gemini_percent=sentiment_data["gemini_percent"],
+        gemini_lean=sentiment_data["gemini_lean"],
 
-        bias_level=bias_info["bias_level"],
-        bias_score=bias_info["bias_intensity_score"],
-        emotive_ratio=bias_info["emotive_ratio"],
-        certainty_per_1000=bias_info["certainty_per_1000"],
-        total_words=bias_info["total_words"],
+        **_lexicon_fields(fetched, bias_info, lexicons),
 
-        model_agreement=agreement,
-        divergence_level=divergence_level,
-        divergence_pct=model_difference,
-
-        category=category,
+        model_agreement=sentiment_data["agreement"],
+        divergence_level=sentiment_data["divergence_level"],
+        divergence_pct=sentiment_data["model_difference"],
     )
     db.session.add(analysis)
+    bump_rollups(analysis_rollups(article_row.source, analysis.category, analysis.divergence_pct))
     db.session.commit()
+    return analysis
+
+
+def _build_result(article_row, analysis, bias_info: dict, fetched: dict, reused: bool) -> dict:
+    """Template-facing dict for one stored analysis."""
+    # NULL sentiment_score: RoBERTa was left out of this analysis
+    sentiment_score = analysis.sentiment_score
+    roberta_percent = None if sentiment_score is None else round(sentiment_score * 100, 2)
+    outlet_info     = get_outlet_info(article_row.source)
 
     #  needed for feedback
     return {
-        "article_id": article_row.id,       
-        "title":    title,
-        "source":   source_domain,
-        "url":      url,
-        "category": category,
+        "article_id": article_row.id,
+        "title":    article_row.title,
+        "source":   article_row.source,
+        "url":      article_row.url,
+        "category": analysis.category,
 
         # Narrative framing
-        "narrative_direction_label": narrative_direction_label,
-        "narrative_direction_score": narrative_direction_score,
-        "framing_intensity":         framing_intensity,
+        "narrative_direction_label": analysis.narrative_label,
+        "narrative_direction_score": analysis.narrative_score,
+        "framing_intensity":         None if roberta_percent is None else int(round(roberta_percent)),
 
         # Individual engines
-        "roberta_label":   sentiment_label,
+        "roberta_label":   analysis.sentiment_label,
         "roberta_percent": roberta_percent,
-        "confidence_level": conf_level,
+        "confidence_level": None if sentiment_score is None else confidence_level(sentiment_score),
 
-        "vader_label":   vader_label,
-        "vader_percent": vader_percent,
+        "vader_label":   analysis.vader_label,
+        "vader_percent": analysis.vader_percent,
 
-        "textblob_label":   textblob_label,
-        "textblob_percent": textblob_percent,
+        "textblob_label":   analysis.textblob_label,
+        "textblob_percent": analysis.textblob_percent,
 
-        "gemini_label":   gemini_label,
-        "gemini_percent": gemini_percent,
-        "gemini_lean":    gemini_lean,          
+        "gemini_label":   analysis.gemini_label,
+        "gemini_percent": analysis.gemini_percent,
+        "gemini_lean":    analysis.gemini_lean,
 
         # Legacy fields used by history page
-        "sentiment":       sentiment_label,
+        "sentiment":       analysis.sentiment_label,
         "sentiment_score": sentiment_score,
 
         # Model agreement / divergence
-        "agreement":        agreement,
-        "model_difference": model_difference,
-        "divergence_level": divergence_level,
+        "agreement":        analysis.model_agreement,
+        "model_difference": analysis.divergence_pct,
+        "divergence_level": analysis.divergence_level,
+        "engines_used":     (analysis.engines_used or _ALL_ENGINES).split(","),
 
         "bias": bias_info,
 
@@ -342,9 +621,129 @@ def analyze_single_url(url: str) -> dict:
         "outlet_factuality":    outlet_info["factuality"],
         "outlet_factuality_label": outlet_info["factuality_label"],
         "outlet_known":         outlet_info["known"],
+
+        # Fetch diagnostics
+        "extractor":     fetched.get("extractor", "unknown"),
+        "fetch_timings": fetched.get("timings", {}),
+        "reused":        reused,
     }
 
 
+# -------------------------------------------------------
+# Background jobs for /analyze and /compare
+# -------------------------------------------------------
+def enqueue_job(kind: str, sources: list) -> int:
+    """sources: list of (url, label, country). Returns the new job id."""
+    job = AnalysisJob(kind=kind, status="queued")
+    db.session.add(job)
+    db.session.flush()
+    for position, (url, label, country) in enumerate(sources):
+        db.session.add(AnalysisJobItem(
+            job_id=job.id, position=position,
+            url=url, label=label, country=country,
+        ))
+    db.session.commit()
+    return job.id
+
+
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+
+def claim_job(job_id: int, worker_id: str = None) -> bool:
+    """Atomically move a queued job to running; False if someone else has it."""
+    now     = datetime.utcnow()
+    claimed = (
+        AnalysisJob.query
+        .filter_by(id=job_id, status="queued")
+        .update({
+            "status":        "running",
+            "started_at":    now,
+            "worker_id":     worker_id,
+            "lease_expires": now + timedelta(seconds=JOB_LEASE_SECONDS),
+        })
+    )
+    db.session.commit()
+    return claimed == 1
+
+
+def renew_lease(job_id: int, worker_id: str = None) -> bool:
+    """Push a running job's lease forward; False if this worker no longer holds it."""
+    renewed = (
+        AnalysisJob.query
+        .filter_by(id=job_id, status="running", worker_id=worker_id)
+        .update({"lease_expires": datetime.utcnow() + timedelta(seconds=JOB_LEASE_SECONDS)})
+    )
+    db.session.commit()
+    return renewed == 1
+
+
+def _set_items(item_ids: list, **fields):
+    with app.app_context():
+        AnalysisJobItem.query.filter(AnalysisJobItem.id.in_(item_ids)).update(fields)
+        db.session.commit()
+
+
+def process_job(job_id: int):
+    """Run every pending URL of a claimed job, recording per-URL progress."""
+    job      = db.session.get(AnalysisJob, job_id)
+    deadline = app.config.get("ANALYZE_DEADLINE") or None
+    items    = {}
+    for item in job.items:
+        if item.status != "done":
+            items.setdefault(item.url, []).append(item.id)
+
+    def fetch(url):
+        _set_items(items[url], status="fetching")
+        try:
+            return fetch_article(url)
+        except Exception as exc:
+            _set_items(items[url], status="failed", error=str(exc)[:300])
+            raise
+
+    def analyse_batch(batch):
+        for url, _ in batch:
+            _set_items(items[url], status="analysing")
+        outputs = _analyse_in_app_context(batch, deadline=deadline)
+        for (url, _), output in zip(batch, outputs):
+            if isinstance(output, Exception):
+                _set_items(items[url], status="failed", error=str(output)[:300])
+            else:
+                _set_items(items[url], status="done", result_json=json.dumps(output))
+        return outputs
+
+    run_concurrent(list(items), fetch, analyse_batch=analyse_batch)
+
+    AnalysisJob.query.filter_by(id=job_id).update(
+        {"status": "done", "finished_at": datetime.utcnow()}
+    )
+    db.session.commit()
+
+
+def job_results(job) -> tuple:
+    """(results, errors) for a finished job, in submission order."""
+    results = []
+    errors  = []
+    for item in job.items:
+        if item.status == "done" and item.result_json:
+            result = json.loads(item.result_json)
+            if job.kind == "compare":
+                result["outlet_label"]   = item.label or item.url
+                result["outlet_country"] = item.country or "Unknown"
+            results.append(result)
+        else:
+            errors.append(f"Could not analyse: {item.url}")
+    return results, errors
+
+
+def _submit_job(kind: str, sources: list):
+    job_id = enqueue_job(kind, sources)
+    if app.config.get("JOBS_INLINE"):
+        # Tests and single-process setups: run the job in the request thread
+        if claim_job(job_id):
+            process_job(job_id)
+    return redirect(url_for("job_page", job_id=job_id))
+
+
 # -------------------------------------------------------
 # Routes
 # -------------------------------------------------------
@@ -360,17 +759,188 @@ def analyze():
     if not url:
         return redirect(url_for("index"))
 
-    new_result   = analyze_single_url(url)
-    batch_results = run_sentiment_analysis()
-    analysis_results = [new_result] + batch_results
+    return _submit_job("analyze", [(url, None, None)])
+
+
+# Pages are keyed on (created_at, id) of the last row shown, so each page
+# is one index range scan however deep into the history it is.
+SUPPORTIVE_LABELS = ("Leans Supportive", "Strongly Supportive")
+CRITICAL_LABELS   = ("Leans Critical", "Strongly Critical")
+
+HISTORY_FILTERS     = ("q", "source", "category", "bias", "direction", "from", "to")
+DIRECTION_THRESHOLD = 10      # |narrative_score| above this is supportive / critical
+HISTORY_API_MAX     = 200
+
+
+def _encode_cursor(result) -> str:
+    return f"{result.created_at.isoformat()}_{result.id}"
+
+
+def _decode_cursor(value: str):
+    """(created_at, id) from a cursor string, or None if it is malformed."""
+    try:
+        stamp, row_id = value.rsplit("_", 1)
+        return datetime.fromisoformat(stamp), int(row_id)
+    except (AttributeError, ValueError):
+        return None
+
+
+def _parse_day(value: str):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d")
+    except (TypeError, ValueError):
+        return None
+
+
+def history_filters(args) -> dict:
+    """The non-empty /history filters in a request's query string."""
+    return {name: args[name].strip() for name in HISTORY_FILTERS if args.get(name, "").strip()}
+
+
+def fts_query(search: str) -> str:
+    """User text as an FTS5 query: every word must appear, the last one as a prefix."""
+    words = re.findall(r"\w+", search.lower())
+    if not words:
+        return ""
+    return " ".join(f'"{word}"' for word in words) + "*"
+
+
+def _filter_history(query, filters: dict):
+    if not filters:
+        return query
+
+    search = fts_query(filters.get("q", ""))
+    if search:
+        matches = text("SELECT rowid FROM article_fts WHERE article_fts MATCH :search")
+        query   = query.filter(AnalysisResult.article_id.in_(
+            matches.bindparams(search=search).columns(column("rowid", Integer))
+        ))
+    if "source" in filters:
+        query = query.filter(AnalysisResult.article_id.in_(
+            select(Article.id).where(Article.source == filters["source"])
+        ))
+
+    # NULL columns are shown as General / low on the page, so match them that way
+    if "category" in filters:
+        condition = AnalysisResult.category == filters["category"]
+        if filters["category"] == "General":
+            condition = or_(condition, AnalysisResult.category.is_(None))
+        query = query.filter(condition)
+    if "bias" in filters:
+        condition = AnalysisResult.bias_level == filters["bias"]
+        if filters["bias"] == "low":
+            condition = or_(condition, AnalysisResult.bias_level.is_(None))
+        query = query.filter(condition)
+
+    score     = func.coalesce(AnalysisResult.narrative_score, 0)
+    direction = filters.get("direction")
+    if direction == "positive":
+        query = query.filter(score > DIRECTION_THRESHOLD)
+    elif direction == "negative":
+        query = query.filter(score < -DIRECTION_THRESHOLD)
+    elif direction == "neutral":
+        query = query.filter(score.between(-DIRECTION_THRESHOLD, DIRECTION_THRESHOLD))
+
+    start, end = _parse_day(filters.get("from")), _parse_day(filters.get("to"))
+    if start:
+        query = query.filter(AnalysisResult.created_at >= start)
+    if end:
+        query = query.filter(AnalysisResult.created_at < end + timedelta(days=1))
+    return query
+
+
+def history_page(cursor: str = None, page_size: int = None, filters: dict = None):
+    """One page of analyses, newest first. Returns (results, next_cursor)."""
+    page_size = page_size or app.config["HISTORY_PAGE_SIZE"]
+    query = _filter_history(
+        AnalysisResult.query.options(joinedload(AnalysisResult.article)), filters,
+    ).order_by(AnalysisResult.created_at.desc(), AnalysisResult.id.desc())
+    position = _decode_cursor(cursor) if cursor else None
+    if position:
+        query = query.filter(
+            tuple_(AnalysisResult.created_at, AnalysisResult.id) < tuple_(*position)
+        )
+
+    rows = query.limit(page_size + 1).all()
+    if len(rows) > page_size:
+        rows = rows[:page_size]
+        return rows, _encode_cursor(rows[-1])
+    return rows, None
+
+
+def history_summary(filters: dict = None) -> dict:
+    """Counts for the strip at the top of /history, in one aggregate query."""
+    count_if = lambda condition: func.coalesce(func.sum(case((condition, 1), else_=0)), 0)
+    query = db.session.query(
+        func.count(AnalysisResult.id),
+        count_if(AnalysisResult.narrative_label.in_(SUPPORTIVE_LABELS)),
+        count_if(AnalysisResult.narrative_label.in_(CRITICAL_LABELS)),
+        count_if(AnalysisResult.bias_level == "high"),
+    ).select_from(AnalysisResult)
+    total, supportive, critical, high_bias = _filter_history(query, filters).one()
+    return {"total": total, "supportive": supportive, "critical": critical, "high_bias": high_bias}
+
+
+def _history_row(result) -> dict:
+    return {
+        "id":              result.id,
+        "article_id":      result.article_id,
+        "url":             result.article.url,
+        "title":           result.article.title,
+        "source":          result.article.source,
+        "category":        result.category or "General",
+        "narrative_score": result.narrative_score or 0,
+        "narrative_label": result.narrative_label,
+        "bias_level":      result.bias_level or "low",
+        "bias_score":      result.bias_score,
+        "created_at":      result.created_at.isoformat(),
+    }
 
-    return render_template("results.html", analysis_results=analysis_results, has_new=True)
+
+@app.template_global()
+def history_url(filters: dict, **changes) -> str:
+    """/history link with `filters` plus `changes`; a None change drops that filter."""
+    args = {**filters, **changes}
+    return url_for("history", **{name: value for name, value in args.items() if value})
 
 
 @app.route("/history")
 def history():
-    results = AnalysisResult.query.order_by(AnalysisResult.created_at.desc()).all()
-    return render_template("history.html", results=results)
+    cursor  = request.args.get("cursor")
+    filters = history_filters(request.args)
+    results, next_cursor = history_page(cursor, filters=filters)
+    categories = [
+        row[0] for row in
+        db.session.query(AnalysisResult.category).filter(AnalysisResult.category.isnot(None))
+        .distinct().order_by(AnalysisResult.category)
+    ]
+    return render_template(
+        "history.html",
+        results=results,
+        summary=history_summary(filters),
+        filters=filters,
+        categories=categories,
+        next_cursor=next_cursor,
+        is_first_page=not cursor,
+    )
+
+
+@app.route("/api/history")
+def history_api():
+    """Filtered history as JSON; pass next_cursor back as ?cursor= for the next page."""
+    try:
+        limit = min(max(int(request.args.get("limit", app.config["HISTORY_PAGE_SIZE"])), 1),
+                    HISTORY_API_MAX)
+    except ValueError:
+        return jsonify({"error": "limit must be an integer"}), 400
+
+    filters = history_filters(request.args)
+    results, next_cursor = history_page(request.args.get("cursor"), limit, filters)
+    return jsonify({
+        "results":     [_history_row(result) for result in results],
+        "next_cursor": next_cursor,
+        "filters":     filters,
+    })
 
 
 # -------------------------------------------------------
@@ -420,32 +990,56 @@ def compare():
                 error="Please enter at least 2 URLs to compare."
             )
 
-        results = []
-        errors  = []
-        for url, label, country in sources:
-            try:
-                result = analyze_single_url(url)
-                result["outlet_label"]   = label or url
-                result["outlet_country"] = country or "Unknown"
-                results.append(result)
-            except Exception:
-                errors.append(f"Could not analyse: {url}")
-
-        if len(results) < 2:
-            return render_template(
-                "compare_form.html",
-                error="Could not scrape enough articles. Try different URLs."
-            )
+        return _submit_job("compare", sources)
+
+    return render_template("compare_form.html", error=None)
+
 
-        comparison = calculate_comparison(results)
+@app.route("/jobs/<int:job_id>")
+def job_page(job_id: int):
+    job = db.get_or_404(AnalysisJob, job_id)
+    if job.status != "done":
+        return render_template("job_status.html", job=job)
+
+    results, errors = job_results(job)
+
+    if job.kind == "analyze":
+        if not results:
+            return render_template("job_status.html", job=job)
+        # Only what is already stored: never scrape sources.txt inside the request
+        analysis_results = results + cached_source_results()
+        return render_template("results.html", analysis_results=analysis_results, has_new=True)
+
+    if len(results) < 2:
         return render_template(
-            "compare_results.html",
-            results=results,
-            comparison=comparison,
-            errors=errors,
+            "compare_form.html",
+            error="Could not scrape enough articles. Try different URLs."
         )
 
-    return render_template("compare_form.html", error=None)
+    comparison = calculate_comparison(results)
+    return render_template(
+        "compare_results.html",
+        results=results,
+        comparison=comparison,
+        errors=errors,
+    )
+
+
+@app.route("/jobs/<int:job_id>/status")
+def job_status(job_id: int):
+    job   = db.get_or_404(AnalysisJob, job_id)
+    items = [
+        {"url": item.url, "status": item.status, "error": item.error}
+        for item in job.items
+    ]
+    return jsonify({
+        "id":       job.id,
+        "kind":     job.kind,
+        "status":   job.status,
+        "finished": sum(1 for i in items if i["status"] in ("done", "failed")),
+        "total":    len(items),
+        "items":    items,
+    })
 
 
 # -------------------------------------------------------
@@ -495,10 +1089,10 @@ def export_csv():
             url,
             result.narrative_score,
             result.narrative_label,
-            result.sentiment_label,       # RoBERTa
-            result.vader_label,
-            result.textblob_label,
-            result.gemini_label,
+            result.sentiment_label or "n/a",   # RoBERTa; NULL = left out
+            result.vader_label     or "n/a",
+            result.textblob_label  or "n/a",
+            result.gemini_label    or "n/a",
             result.gemini_lean or "none",
             "Yes" if result.model_agreement else "No",
             result.divergence_level,
@@ -539,69 +1133,37 @@ def submit_feedback():
         user_lean=user_lean,
     )
     db.session.add(feedback)
+    bump_rollups([
+        ("feedback",  "",          1, 0.0),
+        ("rating",    str(rating), 1, 0.0),
+        ("user_lean", user_lean,   1, 0.0),
+    ])
     db.session.commit()
     return jsonify({"ok": True}), 200
 
 
 @app.route("/stats")
 def stats():
-    total_analyses = AnalysisResult.query.count()
-    total_feedback = UserFeedback.query.count()
-    positive_count = UserFeedback.query.filter_by(rating=1).count()
-    negative_count = UserFeedback.query.filter_by(rating=-1).count()
-
-    accuracy_pct = (
-        round(positive_count / total_feedback * 100, 1)
-        if total_feedback else None
-    )
+    return render_template("stats.html", **read_stats())
 
-    # Lean breakdown from user corrections
-    lean_counts = {
-        lean: UserFeedback.query.filter_by(user_lean=lean).count()
-        for lean in ("left", "center", "right", "none")
-    }
-
-    # Top sources by analysis count
-    from sqlalchemy import func
-    top_sources = (
-        db.session.query(Article.source, func.count(AnalysisResult.id).label("cnt"))
-        .join(AnalysisResult, Article.id == AnalysisResult.article_id)
-        .group_by(Article.source)
-        .order_by(func.count(AnalysisResult.id).desc())
-        .limit(10)
-        .all()
-    )
 
-    # Category breakdown
-    category_counts = (
-        db.session.query(AnalysisResult.category, func.count(AnalysisResult.id).label("cnt"))
-        .filter(AnalysisResult.category.isnot(None))
-        .group_by(AnalysisResult.category)
-        .order_by(func.count(AnalysisResult.id).desc())
-        .all()
-    )
-
-    # Engine divergence stats
-    avg_divergence = db.session.query(
-        func.avg(AnalysisResult.divergence_pct)
-    ).scalar() or 0
-
-    return render_template(
-        "stats.html",
-        total_analyses=total_analyses,
-        total_feedback=total_feedback,
-        positive_count=positive_count,
-        negative_count=negative_count,
-        accuracy_pct=accuracy_pct,
-        lean_counts=lean_counts,
-        top_sources=top_sources,
-        category_counts=category_counts,
-        avg_divergence=round(avg_divergence, 1),
-    )
+@app.route("/stats/cache")
+def cache_stats():
+    """Hit / miss counters for this process's model caches."""
+    return jsonify({
+        "roberta_chunks": inference_cache_stats(),
+        "gemini":         gemini_cache_stats(),
+    })
 
 
 if __name__ == "__main__":
     with app.app_context():
         db.create_all()
         run_migrations()
+
+    # Dev convenience: process jobs in this process unless a separate
+    # `python worker.py` is running. Only in the reloader child that serves.
+    if os.getenv("EMBEDDED_WORKER", "1") == "1" and os.getenv("WERKZEUG_RUN_MAIN") == "true":
+        from worker import start_background_worker
+        start_background_worker()
     app.run(debug=True)
@@ -0,0 +1,23 @@
+"""
+Recompute the /stats rollup table from analysis_result and user_feedback.
+
+The rollups are kept current on every write, so this is only needed after
+loading or editing rows outside the app (imports, manual SQL, restores).
+
+Usage:
+python rebuild_stats.py
+"""
+import time
+
+from news_demo import app, db, read_stats, rebuild_rollups, run_migrations
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+        start = time.perf_counter()
+        rebuild_rollups()
+        stats = read_stats()
+    print(f"Rebuilt stats rollups in {time.perf_counter() - start:.2f}s: "
+          f"{stats['total_analyses']} analyses, {stats['total_feedback']} feedback")
@@ -0,0 +1,101 @@
+"""
+Rewrite the bias and category columns of stored AnalysisResults.
+
+Run after editing the files in lexicons/. By default only rows whose
+lexicon_version differs from the current lexicons are touched. Articles
+are scored in batches with analyse_bias_batch and written back with one
+bulk UPDATE per batch; the sentiment engines are not touched. Category
+moves are applied to the /stats rollups in the same transaction.
+
+Only analyses of the article's current text are rescored: a row whose
+text_hash differs from Article.text_hash was scored on an older version
+of the page (analyse_article overwrites Article.text), and rescoring it
+from the new text would put bias columns next to sentiment from the old
+one. Rows with an unknown text_hash are skipped for the same reason.
+
+Usage:
+python rescore_bias.py               # stale rows only
+python rescore_bias.py --all         # whole table
+python rescore_bias.py --all 1000    # batch size
+"""
+import sys
+import time
+
+from sqlalchemy import update
+
+from bias_analysis import analyse_bias_batch
+from lexicon_store import current as current_lexicons
+from news_demo import (
+    app, db, Article, AnalysisResult, _lexicon_fields, bump_rollups, category_rollups,
+    run_migrations,
+)
+
+
+BATCH_SIZE = 500
+
+
+def rescore_all(batch_size: int = BATCH_SIZE, stale_only: bool = True, lexicons=None) -> dict:
+    """Returns {"articles": n, "analyses": n} rewritten."""
+    # One bundle for the whole run: scores, categories and the recorded
+    # version all come from it, even if the files are reloaded meanwhile
+    lexicons = lexicons or current_lexicons()
+    version  = lexicons.version
+    articles = set()
+    analyses = 0
+    last_id  = 0
+    while True:
+        query = db.session.query(
+            AnalysisResult.id, AnalysisResult.article_id, AnalysisResult.category,
+        ).join(
+            Article, Article.id == AnalysisResult.article_id,
+        ).filter(
+            AnalysisResult.id > last_id,
+            AnalysisResult.text_hash == Article.text_hash,
+        )
+        if stale_only:
+            query = query.filter(db.or_(
+                AnalysisResult.lexicon_version.is_(None),
+                AnalysisResult.lexicon_version != version,
+            ))
+        rows = query.order_by(AnalysisResult.id).limit(batch_size).all()
+        if not rows:
+            break
+        last_id = rows[-1].id
+
+        batch = (
+            db.session.query(Article.id, Article.title, Article.text)
+            .filter(Article.id.in_({row.article_id for row in rows}))
+            .all()
+        )
+        scores = analyse_bias_batch([article.text for article in batch], lexicons)
+        fields = {
+            article.id: _lexicon_fields({"title": article.title, "text": article.text}, bias, lexicons)
+            for article, bias in zip(batch, scores)
+        }
+
+        matched = [row for row in rows if row.article_id in fields]
+        db.session.execute(update(AnalysisResult), [
+            dict(fields[row.article_id], id=row.id) for row in matched
+        ])
+        bump_rollups(
+            change for row in matched
+            for change in category_rollups(row.category, fields[row.article_id]["category"])
+        )
+        db.session.commit()
+
+        articles.update(fields)
+        analyses += len(rows)
+    return {"articles": len(articles), "analyses": analyses}
+
+
+if __name__ == "__main__":
+    args  = sys.argv[1:]
+    whole = "--all" in args
+    sizes = [int(a) for a in args if a.isdigit()]
+    with app.app_context():
+        run_migrations()
+        lexicons = current_lexicons()
+        start    = time.perf_counter()
+        counts   = rescore_all(sizes[0] if sizes else BATCH_SIZE, stale_only=not whole, lexicons=lexicons)
+    print(f"Rescored {counts['analyses']} analyses of {counts['articles']} articles "
+          f"in {time.perf_counter() - start:.2f}s (lexicons {lexicons.version})")
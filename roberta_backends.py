@@ -0,0 +1,143 @@
+"""
+Inference backends for the RoBERTa engine.
+
+ROBERTA_BACKEND selects how get_ml_sentiment runs roberta-large on CPU:
+  torch — the original fp32 PyTorch pipeline (default)
+  int8  — the same model with dynamic int8 quantization of its Linear layers
+  onnx  — an exported ONNX Runtime session
+          (needs: pip install optimum[onnxruntime])
+
+All three are wrapped in a transformers pipeline, so the (label, confidence)
+contract of get_ml_sentiment does not change with the backend.
+
+Usage:
+python roberta_backends.py export           # write the ONNX model to ROBERTA_ONNX_DIR
+python roberta_backends.py verify int8      # label drift vs fp32 on eval_dataset.csv
+python roberta_backends.py verify onnx
+"""
+import os
+import sys
+import time
+
+
+BACKENDS = ("torch", "int8", "onnx")
+ONNX_DIR = os.getenv("ROBERTA_ONNX_DIR", os.path.join("instance", "roberta-onnx"))
+
+
+def _ort_model_class():
+    try:
+        from optimum.onnxruntime import ORTModelForSequenceClassification
+    except ImportError as exc:
+        raise RuntimeError(
+            "The onnx backend needs optimum: pip install optimum[onnxruntime]"
+        ) from exc
+    return ORTModelForSequenceClassification
+
+
+def export_onnx(model_id: str, out_dir: str = ONNX_DIR) -> str:
+    """Export the Hugging Face model to ONNX once; later loads reuse out_dir."""
+    from transformers import AutoTokenizer
+
+    model = _ort_model_class().from_pretrained(model_id, export=True)
+    model.save_pretrained(out_dir)
+    AutoTokenizer.from_pretrained(model_id).save_pretrained(out_dir)
+    return out_dir
+
+
+def build_pipeline(model_id: str, backend: str = "torch"):
+    """sentiment-analysis pipeline for model_id on the chosen backend."""
+    from transformers import pipeline, AutoTokenizer
+
+    if backend == "torch":
+        return pipeline("sentiment-analysis", model=model_id)
+
+    if backend == "int8":
+        import torch
+        from transformers import AutoModelForSequenceClassification
+
+        model = AutoModelForSequenceClassification.from_pretrained(model_id)
+        model = torch.quantization.quantize_dynamic(
+            model, {torch.nn.Linear}, dtype=torch.qint8,
+        )
+        tokenizer = AutoTokenizer.from_pretrained(model_id)
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+    if backend == "onnx":
+        if not os.path.exists(os.path.join(ONNX_DIR, "model.onnx")):
+            export_onnx(model_id, ONNX_DIR)
+        model     = _ort_model_class().from_pretrained(ONNX_DIR)
+        tokenizer = AutoTokenizer.from_pretrained(ONNX_DIR)
+        return pipeline("sentiment-analysis", model=model, tokenizer=tokenizer)
+
+    raise ValueError(f"Unknown ROBERTA_BACKEND {backend!r}; expected one of {BACKENDS}")
+
+
+# ----------------------------------------
+# Drift check against the fp32 baseline
+# ----------------------------------------
+def _timed_labels(pipe, texts: list):
+    from ml_sentiment import get_ml_sentiment_batch, override_engine
+
+    with override_engine("roberta", pipe):
+        start   = time.perf_counter()
+        results = get_ml_sentiment_batch(texts)
+    return results, time.perf_counter() - start
+
+
+def verify(backend: str, model_id: str = None) -> dict:
+    """
+    Score eval_dataset.csv with fp32 torch and with `backend`.
+    Returns label agreement, confidence drift and timings.
+    """
+    from ml_sentiment import ROBERTA_MODEL
+    from evaluate import load_dataset, DATASET_PATH
+
+    model_id = model_id or ROBERTA_MODEL
+    texts    = [row["text"] for row in load_dataset(DATASET_PATH)]
+
+    baseline, base_secs = _timed_labels(build_pipeline(model_id, "torch"), texts)
+    candidate, cand_secs = _timed_labels(build_pipeline(model_id, backend), texts)
+
+    flipped = [
+        (i, base[0], cand[0])
+        for i, (base, cand) in enumerate(zip(baseline, candidate))
+        if base[0] != cand[0]
+    ]
+    conf_drift = [abs(base[1] - cand[1]) for base, cand in zip(baseline, candidate)]
+
+    return {
+        "backend":         backend,
+        "samples":         len(texts),
+        "label_agreement": round(1 - len(flipped) / len(texts), 4) if texts else 1.0,
+        "flipped":         flipped,
+        "mean_conf_drift": round(sum(conf_drift) / len(conf_drift), 4) if conf_drift else 0.0,
+        "max_conf_drift":  round(max(conf_drift), 4) if conf_drift else 0.0,
+        "fp32_seconds":    round(base_secs, 2),
+        "backend_seconds": round(cand_secs, 2),
+    }
+
+
+def _print_report(report: dict):
+    print("=" * 60)
+    print(f"RoBERTa backend drift — {report['backend']} vs fp32 torch")
+    print("=" * 60)
+    print(f"{'Samples':<24} {report['samples']:>10}")
+    print(f"{'Label agreement':<24} {report['label_agreement'] * 100:>9.1f}%")
+    print(f"{'Mean confidence drift':<24} {report['mean_conf_drift']:>10.4f}")
+    print(f"{'Max confidence drift':<24} {report['max_conf_drift']:>10.4f}")
+    print(f"{'fp32 time (s)':<24} {report['fp32_seconds']:>10.2f}")
+    print(f"{'Backend time (s)':<24} {report['backend_seconds']:>10.2f}")
+    for i, base, cand in report["flipped"]:
+        print(f"  row {i + 1}: {base} -> {cand}")
+
+
+if __name__ == "__main__":
+    command = sys.argv[1] if len(sys.argv) > 1 else ""
+    if command == "export":
+        from ml_sentiment import ROBERTA_MODEL
+        print("Exported to", export_onnx(ROBERTA_MODEL))
+    elif command == "verify" and len(sys.argv) > 2 and sys.argv[2] in BACKENDS:
+        _print_report(verify(sys.argv[2]))
+    else:
+        print(__doc__)
+        sys.exit(1)
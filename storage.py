@@ -0,0 +1,96 @@
+"""
+SQLite connection settings for news.db.
+
+Every new connection gets these pragmas:
+
+  journal_mode=WAL      readers see the last committed snapshot and never
+                        wait for a writer (or block one)
+  synchronous=NORMAL    fsync at checkpoints rather than every commit; safe
+                        with WAL, a power cut can only lose the last commits
+  busy_timeout          a writer waits for the write lock instead of failing
+                        at once with "database is locked"
+  cache_size, mmap_size per-connection page cache and memory-mapped reads
+
+The pool is sized for the threaded dev server plus the embedded worker.
+SQLite still allows one writer at a time across all processes, so under
+gunicorn each worker process keeps its own pool and the busy timeout is
+what serialises their writes. Connections are never carried over a fork.
+
+In-memory databases (the tests) are left alone: WAL does not apply to them
+and Flask-SQLAlchemy pins them to a single shared connection.
+"""
+import os
+
+from sqlalchemy import event
+from sqlalchemy.engine import make_url
+
+
+BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "10000"))
+SYNCHRONOUS     = os.getenv("SQLITE_SYNCHRONOUS", "NORMAL")
+CACHE_SIZE_KB   = int(os.getenv("SQLITE_CACHE_SIZE_KB", "32768"))
+MMAP_SIZE       = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+
+POOL_SIZE    = int(os.getenv("DB_POOL_SIZE", "10"))
+MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+
+_SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+def is_file_sqlite(uri) -> bool:
+    url = make_url(uri)
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def engine_options(uri: str) -> dict:
+    """SQLALCHEMY_ENGINE_OPTIONS for `uri`."""
+    if not is_file_sqlite(uri):
+        return {}
+    return {
+        "pool_size":    POOL_SIZE,
+        "max_overflow": MAX_OVERFLOW,
+        "pool_timeout": POOL_TIMEOUT,
+        "connect_args": {
+            # sqlite3's own wait, in seconds; the pragma below covers the rest
+            "timeout":           BUSY_TIMEOUT_MS / 1000,
+            "check_same_thread": False,
+        },
+    }
+
+
+def _apply_pragmas(dbapi_conn, connection_record):
+    synchronous = SYNCHRONOUS.upper()
+    if synchronous not in _SYNCHRONOUS_MODES:
+        synchronous = "NORMAL"
+    cursor = dbapi_conn.cursor()
+    try:
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute(f"PRAGMA synchronous={synchronous}")
+        cursor.execute(f"PRAGMA busy_timeout={BUSY_TIMEOUT_MS:d}")
+        cursor.execute(f"PRAGMA cache_size={-CACHE_SIZE_KB:d}")
+        cursor.execute(f"PRAGMA mmap_size={MMAP_SIZE:d}")
+    finally:
+        cursor.close()
+
+
+def configure(engine):
+    """Install the pragmas on `engine`; a no-op for non-file databases."""
+    if not is_file_sqlite(engine.url):
+        return engine
+    if not event.contains(engine, "connect", _apply_pragmas):
+        event.listen(engine, "connect", _apply_pragmas)
+        # A forked child (gunicorn --preload) must open its own connections
+        os.register_at_fork(after_in_child=lambda: engine.dispose(close=False))
+    return engine
+
+
+def pragmas(conn) -> dict:
+    """Current settings of a SQLAlchemy connection."""
+    read = lambda name: conn.exec_driver_sql(f"PRAGMA {name}").scalar()
+    return {
+        "journal_mode": read("journal_mode"),
+        "synchronous":  read("synchronous"),
+        "busy_timeout": read("busy_timeout"),
+        "cache_size":   read("cache_size"),
+        "mmap_size":    read("mmap_size"),
+    }
@@ -0,0 +1,107 @@
+"""
+Tests for fetch_cache.py — on-disk download cache with revalidation.
+Uses a fake http_get, never the network.
+"""
+import time
+
+import pytest
+
+from fetch_cache import FetchCache, CacheMiss, normalize_url
+
+
+class FakeResponse:
+    def __init__(self, status_code=200, text="", headers=None):
+        self.status_code = status_code
+        self.content     = text.encode("utf-8")
+        self.headers     = headers or {}
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise IOError(self.status_code)
+
+
+class FakeHTTP:
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.calls     = []
+
+    def __call__(self, url, headers):
+        self.calls.append(headers)
+        return self.responses.pop(0)
+
+
+def test_normalize_url_drops_noise():
+    a = normalize_url("HTTPS://www.BBC.com:443/news?b=2&utm_source=x&a=1#top")
+    b = normalize_url("https://www.bbc.com/news?a=1&b=2")
+    assert a == b
+
+
+def test_fresh_hit_skips_network(tmp_path):
+    cache = FetchCache(str(tmp_path), ttl=3600)
+    http  = FakeHTTP(FakeResponse(text="<html>one</html>", headers={"ETag": '"v1"'}))
+    assert cache.fetch("https://example.com/a", http) == (b"<html>one</html>", "")
+    assert cache.fetch("https://example.com/a?utm_medium=feed", http)[0] == b"<html>one</html>"
+    assert len(http.calls) == 1
+
+
+def test_stale_entry_revalidates_with_304(tmp_path):
+    cache = FetchCache(str(tmp_path), ttl=0)
+    http  = FakeHTTP(
+        FakeResponse(text="<html>one</html>",
+                     headers={"ETag": '"v1"', "Last-Modified": "Mon, 01 Jan 2024 00:00:00 GMT"}),
+        FakeResponse(status_code=304),
+    )
+    cache.fetch("https://example.com/a", http)
+    assert cache.fetch("https://example.com/a", http)[0] == b"<html>one</html>"
+    assert http.calls[1]["If-None-Match"] == '"v1"'
+    assert http.calls[1]["If-Modified-Since"] == "Mon, 01 Jan 2024 00:00:00 GMT"
+
+
+def test_stale_entry_replaced_on_200(tmp_path):
+    cache = FetchCache(str(tmp_path), ttl=0)
+    http  = FakeHTTP(FakeResponse(text="old"), FakeResponse(text="new"))
+    cache.fetch("https://example.com/a", http)
+    assert cache.fetch("https://example.com/a", http)[0] == b"new"
+    assert cache.get("https://example.com/a")["body"] == b"new"
+
+
+def test_size_eviction_drops_least_recent(tmp_path):
+    cache = FetchCache(str(tmp_path), ttl=3600, max_bytes=700)
+    cache.put("https://example.com/old", b"x" * 300)
+    time.sleep(0.02)
+    cache.put("https://example.com/new", b"y" * 300)
+    assert cache.get("https://example.com/old") is None
+    assert cache.get("https://example.com/new") is not None
+
+
+def test_offline_mode_uses_prepopulated_dir(tmp_path):
+    FetchCache(str(tmp_path)).put("https://example.com/a", b"<html>cached</html>", "text/html")
+
+    offline = FetchCache(str(tmp_path), ttl=0, offline=True)
+    assert offline.fetch("https://example.com/a", FakeHTTP()) == (b"<html>cached</html>", "text/html")
+    with pytest.raises(CacheMiss):
+        offline.fetch("https://example.com/missing", FakeHTTP())
+
+
+def test_raw_bytes_and_content_type_are_kept(tmp_path):
+    cache = FetchCache(str(tmp_path), ttl=3600)
+    body  = "<p>Caf\u00e9</p>".encode("cp1252")
+    http  = FakeHTTP(FakeResponse(headers={"Content-Type": "text/html; charset=windows-1252"}))
+    http.responses[0].content = body
+    assert cache.fetch("https://example.com/a", http) == (body, "text/html; charset=windows-1252")
+    assert cache.get("https://example.com/a")["body"] == body
+
+
+def test_put_walks_directory_only_when_over_budget(tmp_path, monkeypatch):
+    cache = FetchCache(str(tmp_path), ttl=3600, max_bytes=10_000)
+    scans = []
+    real  = cache._scan
+    monkeypatch.setattr(cache, "_scan", lambda: scans.append(1) or real())
+
+    for i in range(20):
+        cache.put(f"https://example.com/{i}", b"x" * 100)
+    assert len(scans) == 1                      # initial size only
+
+    cache.put("https://example.com/big", b"y" * 10_000)
+    assert len(scans) == 2                      # crossed the cap: evict
+    assert cache.get("https://example.com/0") is None
@@ -0,0 +1,71 @@
+"""
+Tests for fetcher.py — single-download article extraction.
+Does NOT touch the network: download_html is replaced with a stub.
+"""
+import fetcher
+
+
+LONG_HTML = """
+<html><head><title>Council approves new budget</title></head>
+<body><article>
+<h1>Council approves new budget</h1>
+<p>{}</p>
+</article></body></html>
+""".format(" ".join(["The council met on Tuesday to approve the annual budget."] * 20))
+
+SHORT_HTML = "<html><head><title>Teaser</title></head><body><p>Subscribe now.</p></body></html>"
+
+
+def _stub_download(monkeypatch, html):
+    calls = []
+
+    def fake(url):
+        calls.append(url)
+        return html
+
+    monkeypatch.setattr(fetcher, "download_html", fake)
+    return calls
+
+
+def test_page_downloaded_once_on_fallback(monkeypatch):
+    calls = _stub_download(monkeypatch, SHORT_HTML)
+    result = fetcher.fetch_article("https://example.com/teaser")
+    assert calls == ["https://example.com/teaser"]
+    assert "trafilatura_ms" in result["timings"]
+
+
+def test_records_extractor_and_timings(monkeypatch):
+    _stub_download(monkeypatch, LONG_HTML)
+    result = fetcher.fetch_article("https://example.com/budget")
+    assert result["extractor"] in ("newspaper", "trafilatura")
+    assert len(result["text"].split()) >= fetcher.MIN_WORDS
+    assert result["timings"]["download_ms"] >= 0
+    assert result["timings"]["newspaper_ms"] >= 0
+
+
+def test_empty_body_falls_back_to_title(monkeypatch):
+    _stub_download(monkeypatch, "<html><head><title>Only a title</title></head><body></body></html>")
+    result = fetcher.fetch_article("https://example.com/empty")
+    assert result["text"] == result["title"]
+    assert result["extractor"] == "title"
+
+
+# -------------------------------------------------------
+# Charset handling
+# -------------------------------------------------------
+UTF8_PAGE = "<html><body><p>Caf\u00e9 owners say the \u201cnew\u201d rules hurt.</p></body></html>"
+
+
+def test_bare_text_html_is_not_read_as_latin1():
+    # requests would decode this as ISO-8859-1 and produce mojibake
+    assert fetcher.decode_html(UTF8_PAGE.encode("utf-8"), "text/html") == UTF8_PAGE
+
+
+def test_meta_charset_used_when_header_has_none():
+    page = '<html><head><meta charset="windows-1252"></head><body>Caf\u00e9</body></html>'
+    assert "Caf\u00e9" in fetcher.decode_html(page.encode("cp1252"), "text/html")
+
+
+def test_header_charset_wins():
+    page = "<p>Caf\u00e9</p>"
+    assert fetcher.decode_html(page.encode("latin-1"), "text/html; charset=ISO-8859-1") == page
@@ -0,0 +1,45 @@
+"""
+Tests for gemini_cache.py — SQLite memo of Gemini results.
+"""
+from gemini_cache import GeminiCache, gemini_key
+
+
+class _Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_key_depends_on_prompt_version_model_and_text():
+    assert gemini_key(1, "m", "text") == gemini_key(1, "m", "text")
+    assert gemini_key(1, "m", "text") != gemini_key(2, "m", "text")
+    assert gemini_key(1, "m", "text") != gemini_key(1, "other", "text")
+    assert gemini_key(1, "m", "text") != gemini_key(1, "m", "other")
+    assert gemini_key(1, "m", "text") != gemini_key(1, "m", "text", "batch")
+
+
+def test_round_trip_and_stats(tmp_path):
+    cache = GeminiCache(str(tmp_path / "g.db"))
+    assert cache.get("k") is None
+    cache.put("k", ("negative", -0.4, "left"))
+    assert cache.get("k") == ("negative", -0.4, "left")
+
+    stats = cache.stats()
+    assert stats["hits"] == 1
+    assert stats["misses"] == 1
+    assert stats["entries"] == 1
+
+
+def test_entries_expire_after_ttl(tmp_path):
+    clock = _Clock()
+    cache = GeminiCache(str(tmp_path / "g.db"), ttl=60, clock=clock)
+    cache.put("old", ("positive", 0.5, "none"))
+
+    clock.now += 61
+    assert cache.get("old") is None
+    assert cache.stats()["expired"] == 1
+
+    cache.put("new", ("neutral", 0.0, "none"))   # prunes expired rows
+    assert cache.stats()["entries"] == 1
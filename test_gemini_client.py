@@ -0,0 +1,142 @@
+"""
+Tests for gemini_client.py and batched Gemini scoring, against the local
+stub server in gemini_stub.py — no network or API key.
+"""
+import threading
+import time
+
+import pytest
+
+import ml_sentiment
+from gemini_cache import GeminiCache
+from gemini_client import GeminiRestClient, GeminiTimeout, RateLimiter
+from gemini_stub import StubGeminiModel, StubGeminiServer
+
+
+@pytest.fixture
+def stub_server():
+    servers = []
+
+    def start(**kwargs):
+        srv = StubGeminiServer(**kwargs)
+        threading.Thread(target=srv.serve_forever, daemon=True).start()
+        servers.append(srv)
+        return srv
+
+    yield start
+    for srv in servers:
+        srv.shutdown()
+        srv.server_close()
+
+
+def test_client_round_trip(stub_server):
+    srv    = stub_server(score=-0.5, lean="left")
+    client = GeminiRestClient("key", "gemini-test", base_url=srv.url, rpm=0)
+    reply  = client.generate_content("Analyse this.", request_options={"timeout": 5})
+    assert '"score": -0.5' in reply.text
+    assert srv.served == 1
+
+
+def test_429_is_retried_after_retry_after(stub_server):
+    srv   = stub_server(rpm=1, window=0.3)
+    slept = []
+
+    def sleep(seconds):
+        slept.append(seconds)
+        time.sleep(0.3)   # the stub's window, not the rounded-up header
+
+    client = GeminiRestClient("key", "gemini-test", base_url=srv.url, rpm=0, sleep=sleep)
+    client.generate_content("first")
+    client.generate_content("second")
+
+    assert srv.rejected >= 1
+    assert client.retries >= 1
+    assert slept[0] == 1.0   # Retry-After honoured
+    assert srv.served == 2
+
+
+def test_rate_limiter_spaces_requests():
+    limiter = RateLimiter(rpm=600)   # one every 0.1 s
+    start   = time.perf_counter()
+    for _ in range(3):
+        limiter.acquire()
+    assert time.perf_counter() - start >= 0.18
+
+
+def test_retry_after_past_the_timeout_gives_up(stub_server):
+    srv   = stub_server(rpm=1, window=30)
+    slept = []
+
+    client = GeminiRestClient("key", "gemini-test", base_url=srv.url, rpm=0, sleep=slept.append)
+    client.generate_content("first", request_options={"timeout": 5})
+    with pytest.raises(GeminiTimeout):
+        client.generate_content("second", request_options={"timeout": 5})
+    assert slept == []   # Retry-After is 30 s; nothing was slept
+
+
+def test_rate_limiter_does_not_wait_past_the_deadline():
+    now     = [100.0]
+    slept   = []
+    limiter = RateLimiter(rpm=6, clock=lambda: now[0], sleep=slept.append)   # one every 10 s
+    limiter.acquire(end=105.0)
+    with pytest.raises(GeminiTimeout):
+        limiter.acquire(end=105.0)
+    limiter.acquire(end=111.0)   # the refused call did not take a slot
+    assert slept == [10.0]
+
+
+def test_pipeline_deadline_caps_the_gemini_timeout(monkeypatch):
+    stub = StubGeminiModel()
+    seen = []
+    monkeypatch.setattr(stub, "generate_content",
+                        lambda prompt, request_options: seen.append(request_options["timeout"]))
+    monkeypatch.setitem(ml_sentiment._engines, "gemini", stub)
+    monkeypatch.setitem(ml_sentiment._engines, "gemini_cache", None)
+
+    ml_sentiment.get_gemini_sentiment("Article.", end=time.monotonic() + 2)
+    assert 0 < seen[0] <= 2 < ml_sentiment.GEMINI_TIMEOUT
+    # Past the deadline nothing is sent
+    assert ml_sentiment.get_gemini_sentiment("Article.", end=time.monotonic() - 1) is None
+    assert len(seen) == 1
+
+
+def test_batch_packs_articles_into_few_requests(stub_server, monkeypatch):
+    srv = stub_server(score=0.7, lean="center")
+    monkeypatch.setitem(ml_sentiment._engines, "gemini",
+                        GeminiRestClient("key", "gemini-test", base_url=srv.url, rpm=0))
+    monkeypatch.setitem(ml_sentiment._engines, "gemini_cache", None)
+    monkeypatch.setattr(ml_sentiment, "GEMINI_BATCH_SIZE", 4)
+
+    texts   = [f"Article number {i} about the budget." for i in range(10)]
+    results = ml_sentiment.get_gemini_sentiment_batch(texts + texts[:2])
+
+    assert results == [("positive", 0.7, "center")] * 12
+    assert srv.served == 3   # 10 distinct articles, 4 per request
+
+
+def test_articles_missing_from_reply_come_back_as_none(monkeypatch):
+    class PartialModel:
+        def generate_content(self, prompt, **kwargs):
+            return type("R", (), {"text": '[{"id": 2, "score": -0.9, "lean": "right"}]'})()
+
+    monkeypatch.setitem(ml_sentiment._engines, "gemini", PartialModel())
+    monkeypatch.setitem(ml_sentiment._engines, "gemini_cache", None)
+
+    assert ml_sentiment.get_gemini_sentiment_batch(["one", "two"]) == [
+        None,
+        ("negative", -0.9, "right"),
+    ]
+
+
+def test_batched_answers_are_cached_apart_from_single_ones(monkeypatch, tmp_path):
+    stub = StubGeminiModel('[{"id": 1, "score": 0.4, "lean": "none"}, {"id": 2, "score": 0.4, "lean": "none"}]')
+    monkeypatch.setitem(ml_sentiment._engines, "gemini", stub)
+    monkeypatch.setitem(ml_sentiment._engines, "gemini_cache", GeminiCache(str(tmp_path / "g.db")))
+
+    ml_sentiment.get_gemini_sentiment_batch(["one", "two"])
+    ml_sentiment.get_gemini_sentiment_batch(["one", "two"])
+    assert stub.calls == 1
+
+    stub.reply = '{"score": -0.4, "lean": "none"}'
+    assert ml_sentiment.get_gemini_sentiment("one") == ("negative", -0.4, "none")
+    assert stub.calls == 2
@@ -0,0 +1,47 @@
+"""
+Tests for inference_cache.py — two-tier RoBERTa chunk-score cache.
+"""
+from inference_cache import InferenceCache, chunk_key
+
+
+def test_key_depends_on_model_and_text():
+    assert chunk_key("m1", "text") == chunk_key("m1", "text")
+    assert chunk_key("m1", "text") != chunk_key("m2", "text")
+    assert chunk_key("m1", "text") != chunk_key("m1", "other")
+
+
+def test_memory_hit_after_put(tmp_path):
+    cache = InferenceCache(str(tmp_path / "c.db"))
+    cache.put_many({"k1": {"label": "POSITIVE", "score": 0.9}})
+    assert cache.get_many(["k1", "k2"]) == {"k1": {"label": "POSITIVE", "score": 0.9}}
+
+    stats = cache.stats()
+    assert stats["memory_hits"] == 1
+    assert stats["misses"] == 1
+
+
+def test_disk_tier_shared_between_instances(tmp_path):
+    path = str(tmp_path / "c.db")
+    InferenceCache(path).put_many({"k1": {"label": "NEGATIVE", "score": 0.8}})
+
+    other = InferenceCache(path)
+    assert other.get_many(["k1"])["k1"]["label"] == "NEGATIVE"
+    assert other.stats()["disk_hits"] == 1
+
+
+def test_lru_is_bounded(tmp_path):
+    cache = InferenceCache(str(tmp_path / "c.db"), lru_size=2)
+    cache.put_many({f"k{i}": {"label": "POSITIVE", "score": 0.9} for i in range(5)})
+    assert cache.stats()["memory_entries"] == 2
+
+
+def test_disk_tier_evicts_over_budget(tmp_path):
+    cache = InferenceCache(str(tmp_path / "c.db"), max_bytes=64 * 1024)
+    for batch in range(20):
+        cache.put_many({
+            chunk_key("m", f"{batch}-{i}"): {"label": "POSITIVE", "score": 0.9}
+            for i in range(200)
+        })
+    stats = cache.stats()
+    assert stats["evictions"] > 0
+    assert stats["disk_entries"] < 4000
@@ -0,0 +1,99 @@
+"""
+Tests for ingest.py — concurrent fetch / analyse batch runner.
+Uses fake fetch and analyse functions, no network or models.
+"""
+import threading
+import time
+
+from ingest import run_concurrent
+
+
+def test_results_keep_source_order():
+    urls = [f"https://site{i}.com/a" for i in range(6)]
+
+    def fetch(url):
+        # Later URLs finish first
+        time.sleep(0.01 * (6 - int(url[12])))
+        return url.upper()
+
+    results = run_concurrent(urls, fetch, lambda url, fetched: fetched)
+    assert results == [u.upper() for u in urls]
+
+
+def test_failed_fetch_does_not_block_others():
+    urls = ["https://a.com/1", "https://b.com/2", "https://c.com/3"]
+
+    def fetch(url):
+        if "b.com" in url:
+            raise IOError("boom")
+        return url
+
+    results = run_concurrent(urls, fetch, lambda url, fetched: fetched)
+    assert results == ["https://a.com/1", "https://c.com/3"]
+
+
+def test_failed_analysis_is_skipped():
+    urls = ["https://a.com/1", "https://a.com/2"]
+
+    def analyse(url, fetched):
+        if url.endswith("1"):
+            raise ValueError("bad article")
+        return url
+
+    assert run_concurrent(urls, lambda u: u, analyse) == ["https://a.com/2"]
+
+
+def test_per_host_limit_is_respected():
+    urls = [f"https://same.com/{i}" for i in range(8)]
+    active = {"now": 0, "peak": 0}
+    lock = threading.Lock()
+
+    def fetch(url):
+        with lock:
+            active["now"] += 1
+            active["peak"] = max(active["peak"], active["now"])
+        time.sleep(0.02)
+        with lock:
+            active["now"] -= 1
+        return url
+
+    run_concurrent(urls, fetch, lambda url, fetched: fetched,
+                   fetch_workers=8, per_host=2)
+    assert active["peak"] <= 2
+
+
+def test_empty_url_list():
+    assert run_concurrent([], lambda u: u, lambda u, f: f) == []
+
+
+def test_batch_stage_receives_groups():
+    urls = [f"https://site{i}.com/a" for i in range(5)]
+    batches = []
+
+    def analyse_batch(items):
+        batches.append(len(items))
+        return [url if not url.startswith("https://site3") else ValueError("bad")
+                for url, _ in items]
+
+    results = run_concurrent(urls, lambda u: u, analyse_batch=analyse_batch, batch_size=4)
+    assert results == [u for u in urls if "site3" not in u]
+    assert sum(batches) == 5
+    assert max(batches) <= 4
+
+
+def test_busy_host_does_not_hold_up_other_hosts():
+    urls    = [f"https://slow.com/{i}" for i in range(6)] + ["https://fast.com/1"]
+    started = {}
+    start   = time.perf_counter()
+
+    def fetch(url):
+        started[url] = time.perf_counter() - start
+        if "slow.com" in url:
+            time.sleep(0.1)
+        return url
+
+    results = run_concurrent(urls, fetch, lambda url, fetched: fetched,
+                             fetch_workers=4, per_host=1)
+    assert results == urls
+    # fast.com starts at once instead of queueing behind slow.com's workers
+    assert started["https://fast.com/1"] < 0.05
@@ -0,0 +1,80 @@
+"""
+Tests for lexicon_store.py — lexicon files, compiled cache and hot reload.
+"""
+import json
+import random
+
+import pytest
+
+import lexicon_store
+from bias_analysis import AhoCorasick
+
+
+@pytest.fixture
+def lexicon_dir(tmp_path, monkeypatch):
+    (tmp_path / "emotive.txt").write_text("# comment\nshocking\njaw-dropping\n")
+    (tmp_path / "certainty.txt").write_text("never\nno one\n")
+    (tmp_path / "categories.json").write_text(json.dumps({"Sports": ["match"], "Health": ["virus"]}))
+    monkeypatch.setattr(lexicon_store, "LEXICON_DIR", str(tmp_path))
+    monkeypatch.setattr(lexicon_store, "CACHE_PATH", str(tmp_path / "compiled.pkl"))
+    monkeypatch.setattr(lexicon_store, "CHECK_INTERVAL", 0)
+    lexicon_store.reset()
+    yield tmp_path
+    lexicon_store.reset()
+
+
+def test_files_are_compiled(lexicon_dir):
+    lexicons = lexicon_store.current()
+    assert lexicons.emotive == {"shocking", "jaw-dropping"}
+    matches, _ = lexicons.matcher.find("No one saw the jaw-dropping match")
+    assert [m.term for m in matches] == ["no one", "jaw-dropping"]
+
+
+def test_compiled_artifact_is_reused(lexicon_dir, monkeypatch):
+    first = lexicon_store.load()
+
+    def boom(*args):
+        raise AssertionError("should load from the cache")
+
+    monkeypatch.setattr(lexicon_store, "_compile", boom)
+    assert lexicon_store.load().version == first.version
+
+
+def test_changed_files_are_swapped_in(lexicon_dir):
+    before = lexicon_store.current()
+    (lexicon_dir / "emotive.txt").write_text("shocking\nbombshell\n")
+
+    after = lexicon_store.current()
+    assert after is not before
+    assert after.version != before.version
+    assert "bombshell" in after.emotive
+    assert "bombshell" not in before.emotive   # old bundle left intact for in-flight readers
+
+
+def test_broken_file_keeps_previous_version(lexicon_dir, monkeypatch, caplog):
+    from bias_analysis import analyse_bias_language
+
+    before = lexicon_store.current()
+    (lexicon_dir / "categories.json").write_text('{"Sports": ["match"],')
+
+    result = analyse_bias_language("A shocking result that no one expected.")
+    assert result["lexicon_version"] == before.version
+    assert result["emotive_words"] == {"shocking": 1}
+    assert "Lexicon reload" in caplog.text
+
+    # Not retried on every call while the files stay broken
+    calls = []
+    monkeypatch.setattr(lexicon_store, "load", lambda: calls.append(1))
+    assert lexicon_store.current() is before
+    assert calls == []
+
+
+def test_aho_corasick_has_substring_semantics():
+    keywords = ["eco", "economy", "vote", "mental health", "he", "she", "hers"]
+    matcher  = AhoCorasick(keywords)
+    random.seed(3)
+    alphabet = "ecovtshrmnaly "
+    for _ in range(300):
+        text = "".join(random.choice(alphabet) for _ in range(random.randint(0, 40)))
+        assert matcher.find_all(text) == {kw for kw in keywords if kw in text}
+    assert matcher.find_all("the economy and mental health") == {"eco", "economy", "he", "mental health"}
@@ -0,0 +1,126 @@
+"""
+Tests for migrations.py — versioned, idempotent schema upgrades.
+"""
+import pytest
+from sqlalchemy import create_engine, event, inspect, text
+
+import migrations
+
+
+@pytest.fixture
+def legacy_engine(tmp_path):
+    """A news.db as it looked before any of the added columns."""
+    engine = create_engine(f"sqlite:///{tmp_path / 'legacy.db'}")
+    with engine.begin() as conn:
+        conn.execute(text(
+            "CREATE TABLE article (id INTEGER PRIMARY KEY, url VARCHAR(500) UNIQUE NOT NULL,"
+            " title VARCHAR(300), source VARCHAR(200), text TEXT, created_at DATETIME)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE analysis_result (id INTEGER PRIMARY KEY, article_id INTEGER NOT NULL,"
+            " created_at DATETIME, sentiment_label VARCHAR(20), sentiment_score FLOAT)"
+        ))
+        conn.execute(text(
+            "CREATE TABLE user_feedback (id INTEGER PRIMARY KEY, article_id INTEGER NOT NULL,"
+            " rating INTEGER, user_lean VARCHAR(20), created_at DATETIME)"
+        ))
+        conn.execute(text("INSERT INTO article (id, url, title, source) VALUES (1, 'https://a', 'Harbour strike', 'A')"))
+        conn.execute(text("INSERT INTO analysis_result (id, article_id) VALUES (1, 1)"))
+    yield engine
+    engine.dispose()
+
+
+def _ddl_statements(engine, fn):
+    seen = []
+
+    def record(conn, cursor, statement, *args):
+        if statement.lstrip().upper().startswith(("CREATE", "ALTER", "DROP")):
+            seen.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        fn()
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    return seen
+
+
+def test_upgrade_adds_columns_and_indexes(legacy_engine):
+    assert migrations.migrate(legacy_engine) == [v for v, _, _ in migrations.MIGRATIONS]
+
+    inspector = inspect(legacy_engine)
+    columns   = {c["name"] for c in inspector.get_columns("analysis_result")}
+    assert {"narrative_score", "category", "engines_used", "lexicon_version"} <= columns
+    assert "text_hash" in {c["name"] for c in inspector.get_columns("article")}
+    indexes = {i["name"] for i in inspector.get_indexes("analysis_result")}
+    assert "ix_analysis_result_created_id" in indexes
+
+    with legacy_engine.connect() as conn:
+        assert migrations.current_version(conn) == migrations.LATEST
+        # existing rows keep their data and get the column defaults
+        assert conn.execute(text("SELECT category FROM analysis_result")).scalar() == "General"
+        # and are backfilled into the search index
+        found = conn.execute(text("SELECT rowid FROM article_fts WHERE article_fts MATCH 'harbour'"))
+        assert found.scalars().all() == [1]
+        # and the latest analysis of each article records the text it scored
+        hashes = conn.execute(text(
+            "SELECT analysis_result.text_hash = article.text_hash FROM analysis_result"
+            " JOIN article ON article.id = analysis_result.article_id"
+        )).scalars().all()
+        assert hashes == [1]
+        # and counted in the /stats rollups
+        rollups = conn.execute(text("SELECT metric, key, count FROM stats_rollup ORDER BY metric"))
+        assert ("analyses", "", 1) in rollups.all()
+
+
+def test_current_schema_does_no_ddl(legacy_engine):
+    migrations.migrate(legacy_engine)
+    applied = []
+    ddl = _ddl_statements(legacy_engine, lambda: applied.extend(migrations.migrate(legacy_engine)))
+    assert applied == []
+    assert ddl == []
+
+
+def test_partial_schema_only_runs_pending(legacy_engine):
+    with legacy_engine.begin() as conn:
+        conn.execute(text("ALTER TABLE analysis_result ADD COLUMN engines_used VARCHAR(64)"))
+    migrations.migrate(legacy_engine)
+    with legacy_engine.connect() as conn:
+        versions = conn.execute(text("SELECT version FROM schema_version ORDER BY version")).scalars()
+        assert list(versions) == [v for v, _, _ in migrations.MIGRATIONS]
+
+
+def test_check_reports_pending_then_current(legacy_engine):
+    before = migrations.check(legacy_engine)
+    assert before["version"] == 0
+    assert len(before["pending"]) == len(migrations.MIGRATIONS)
+    assert "ix_article_source" in before["missing_indexes"]
+
+    migrations.migrate(legacy_engine)
+    after = migrations.check(legacy_engine)
+    assert after["version"] == after["latest"]
+    assert after["pending"] == [] and after["missing_indexes"] == []
+
+
+@pytest.mark.parametrize("query, index", [
+    ("SELECT * FROM analysis_result ORDER BY created_at DESC",
+     "ix_analysis_result_created_id"),
+    ("SELECT category, COUNT(id) FROM analysis_result WHERE category IS NOT NULL GROUP BY category",
+     "ix_analysis_result_category"),
+    ("SELECT * FROM analysis_result WHERE article_id = 1 ORDER BY created_at DESC LIMIT 1",
+     "ix_analysis_result_article_created"),
+    ("SELECT COUNT(*) FROM user_feedback WHERE rating = 1",
+     "ix_user_feedback_rating"),
+])
+def test_history_and_stats_queries_use_indexes(legacy_engine, query, index):
+    migrations.migrate(legacy_engine)
+    with legacy_engine.connect() as conn:
+        plan = " ".join(row[-1] for row in conn.execute(text(f"EXPLAIN QUERY PLAN {query}")))
+    assert index in plan
+
+
+def test_models_declare_the_migration_indexes():
+    from news_demo import db
+
+    declared = {index.name for table in db.metadata.tables.values() for index in table.indexes}
+    assert set(migrations.INDEXES) <= declared
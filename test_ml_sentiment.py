@@ -1,3 +1,14 @@
+import re
+import types
+import time
+
+import pytest
+
+import ml_sentiment
+from gemini_cache import GeminiCache
+from gemini_stub import StubGeminiModel
+from inference_cache import InferenceCache
+from roberta_backends import build_pipeline
 from ml_sentiment import get_ml_sentiment
 
 
@@ -26,3 +37,295 @@ def test_short_text():
     label, conf = get_ml_sentiment("OK")
     assert label == "neutral"
     assert conf == 0.0
+
+
+# -------------------------------------------------------
+# Token-window chunking (fake whitespace tokenizer, no model)
+# -------------------------------------------------------
+class _WordTokenizer:
+    """One token per word; 10-token model limit including 2 specials."""
+    is_fast = True
+    model_max_length = 10
+
+    def __call__(self, text, **kwargs):
+        return {"offset_mapping": [m.span() for m in re.finditer(r"\S+", text)]}
+
+    def num_special_tokens_to_add(self, pair=False):
+        return 2
+
+
+class _ContextTokenizer(_WordTokenizer):
+    """Like _WordTokenizer, but the word a text starts with costs 3 tokens,
+    the way a BPE fragment cut from mid-word re-tokenizes into more pieces."""
+
+    def __call__(self, text, **kwargs):
+        spans = super().__call__(text)["offset_mapping"]
+        return {"offset_mapping": spans[:1] * 3 + spans[1:]}
+
+
+def _use_tokenizer(monkeypatch, policy, stride=0, margin=0, tokenizer=None):
+    fake = types.SimpleNamespace(tokenizer=tokenizer or _WordTokenizer())
+    monkeypatch.setitem(ml_sentiment._engines, "roberta", fake)
+    monkeypatch.setattr(ml_sentiment, "CHUNK_POLICY", policy)
+    monkeypatch.setattr(ml_sentiment, "CHUNK_STRIDE", stride)
+    monkeypatch.setattr(ml_sentiment, "CHUNK_MARGIN", margin)
+
+
+def test_windows_cover_whole_article(monkeypatch):
+    _use_tokenizer(monkeypatch, "all")
+    text = " ".join(f"w{i}" for i in range(50))
+    chunks = ml_sentiment._split_chunks(text)
+    assert all(len(c.split()) <= 8 for c in chunks)
+    assert " ".join(chunks).split() == text.split()
+
+
+@pytest.mark.parametrize("margin", [0, 2])
+def test_no_window_retokenizes_over_the_limit(monkeypatch, margin):
+    tokenizer = _ContextTokenizer()
+    _use_tokenizer(monkeypatch, "all", stride=2, margin=margin, tokenizer=tokenizer)
+    chunks = ml_sentiment._split_chunks(" ".join(f"w{i}" for i in range(60)))
+    limit  = ml_sentiment._window_tokens()
+    assert all(ml_sentiment._token_count(tokenizer, c) <= limit for c in chunks)
+    # every word still lands in some window
+    assert {w for c in chunks for w in c.split()} == {f"w{i}" for i in range(60)}
+
+
+def test_stride_overlaps_windows(monkeypatch):
+    _use_tokenizer(monkeypatch, "all", stride=2)
+    chunks = ml_sentiment._split_chunks(" ".join(f"w{i}" for i in range(20)))
+    assert chunks[0].split()[-2:] == chunks[1].split()[:2]
+
+
+def test_oversized_stride_is_clamped(monkeypatch):
+    _use_tokenizer(monkeypatch, "all", stride=50)
+    text   = " ".join(f"w{i}" for i in range(40))
+    chunks = ml_sentiment._split_chunks(text)
+    # 8-token windows advancing by 4, not one window per word
+    assert len(chunks) <= 10
+    assert {w for c in chunks for w in c.split()} == set(text.split())
+    assert ml_sentiment._clamp_stride(600, ml_sentiment._ROBERTA_WINDOW) == 255
+
+
+def test_sample_policy_spreads_windows(monkeypatch):
+    _use_tokenizer(monkeypatch, "sample")
+    text = " ".join(f"w{i}" for i in range(80))
+    chunks = ml_sentiment._split_chunks(text)
+    assert len(chunks) == ml_sentiment._MAX_CHUNKS
+    assert chunks[0].startswith("w0 ")
+    assert chunks[-1].endswith("w79")
+
+
+def test_budget_policy_caps_tokens(monkeypatch):
+    _use_tokenizer(monkeypatch, "budget")
+    monkeypatch.setattr(ml_sentiment, "TOKEN_BUDGET", 24)
+    chunks = ml_sentiment._split_chunks(" ".join(f"w{i}" for i in range(200)))
+    assert sum(len(c.split()) for c in chunks) <= 24
+
+
+# -------------------------------------------------------
+# Backend selection
+# -------------------------------------------------------
+
+def test_unknown_backend_is_rejected():
+    with pytest.raises(ValueError):
+        build_pipeline(ml_sentiment.ROBERTA_MODEL, "tpu")
+
+
+def test_backend_is_part_of_engine_fingerprint(monkeypatch):
+    before = ml_sentiment.engine_fingerprint()
+    monkeypatch.setattr(ml_sentiment, "ROBERTA_BACKEND", "int8")
+    assert ml_sentiment.engine_fingerprint() != before
+
+
+# -------------------------------------------------------
+# Chunk-score cache in front of the model
+# -------------------------------------------------------
+
+class _CountingPipeline:
+    tokenizer = _WordTokenizer()
+
+    def __init__(self):
+        self.scored = []
+
+    def __call__(self, chunks, **kwargs):
+        self.scored.extend(chunks)
+        return [{"label": "NEGATIVE", "score": 0.9} for _ in chunks]
+
+
+def test_repeated_chunks_hit_cache(monkeypatch, tmp_path):
+    pipe = _CountingPipeline()
+    monkeypatch.setitem(ml_sentiment._engines, "roberta", pipe)
+    monkeypatch.setitem(ml_sentiment._engines, "inference_cache",
+                        InferenceCache(str(tmp_path / "c.db")))
+
+    wire_copy = "Officials said the storm caused damage across the region."
+    first  = ml_sentiment.get_ml_sentiment_batch([wire_copy, wire_copy])
+    scored = list(pipe.scored)
+    second = ml_sentiment.get_ml_sentiment(wire_copy)
+
+    assert len(scored) == len(set(scored))   # each distinct chunk once
+    assert pipe.scored == scored             # nothing new on the repeat
+    assert first == [second, second]
+    assert ml_sentiment.inference_cache_stats()["memory_hits"] >= 1
+
+
+# -------------------------------------------------------
+# Adaptive early exit
+# -------------------------------------------------------
+def _scripted_pipeline(labels):
+    """Fake pipeline whose n-th scored window gets labels[n]."""
+    class Pipe(_CountingPipeline):
+        def __call__(self, chunks, **kwargs):
+            start = len(self.scored)
+            self.scored.extend(chunks)
+            return [{"label": labels[start + i], "score": 0.9} for i in range(len(chunks))]
+    return Pipe()
+
+
+def _seven_windows():
+    return " ".join(f"w{i}" for i in range(56))   # 7 windows of 8 words
+
+
+def test_adaptive_stops_once_majority_is_locked(monkeypatch):
+    _use_tokenizer(monkeypatch, "all")
+    monkeypatch.setattr(ml_sentiment, "ADAPTIVE_CONFIDENCE", 1.01)
+    pipe = _scripted_pipeline(["NEGATIVE"] * 7)
+    monkeypatch.setitem(ml_sentiment._engines, "roberta", pipe)
+    monkeypatch.setitem(ml_sentiment._engines, "inference_cache", None)
+
+    report = ml_sentiment.get_ml_sentiment_reports([_seven_windows()], adaptive=True)[0]
+    assert report["label"] == "negative"
+    assert report["chunks_scored"] == 4
+    assert report["chunks_skipped"] == 3
+
+
+def test_adaptive_label_matches_full_scoring(monkeypatch):
+    _use_tokenizer(monkeypatch, "all")
+    labels = ["POSITIVE", "NEGATIVE", "POSITIVE", "NEGATIVE", "NEGATIVE", "POSITIVE", "NEGATIVE"]
+    monkeypatch.setitem(ml_sentiment._engines, "inference_cache", None)
+
+    results = []
+    for adaptive in (False, True):
+        monkeypatch.setitem(ml_sentiment._engines, "roberta", _scripted_pipeline(labels))
+        results.append(ml_sentiment.get_ml_sentiment_reports([_seven_windows()], adaptive=adaptive)[0])
+
+    assert results[0]["label"] == results[1]["label"] == "negative"
+    assert results[0]["chunks_skipped"] == 0
+
+
+def test_vote_decided_respects_tie_break():
+    pos = {"label": "POSITIVE", "score": 0.9}
+    neg = {"label": "NEGATIVE", "score": 0.9}
+    # 2-1 for positive with one left: a negative would tie and positive wins ties
+    assert ml_sentiment._vote_decided([pos, pos, neg], remaining=1)
+    # 2-1 for negative with one left: a positive would tie and take it
+    assert not ml_sentiment._vote_decided([neg, neg, pos], remaining=1)
+
+
+# -------------------------------------------------------
+# Concurrent engine dispatch
+# -------------------------------------------------------
+def _slow(result, seconds=0.2):
+    def engine(text, end=None):
+        time.sleep(seconds)
+        return result
+    return engine
+
+
+def test_engines_run_concurrently(monkeypatch):
+    monkeypatch.setattr(ml_sentiment, "get_ml_sentiment",       _slow(("negative", 0.9)))
+    monkeypatch.setattr(ml_sentiment, "get_vader_sentiment",    _slow(("negative", -0.6)))
+    monkeypatch.setattr(ml_sentiment, "get_textblob_sentiment", _slow(("negative", -0.3)))
+    monkeypatch.setattr(ml_sentiment, "get_gemini_sentiment",   _slow(("negative", -0.5, "center")))
+
+    start  = time.perf_counter()
+    result = ml_sentiment.run_sentiment_pipeline("Some article text.")
+    assert time.perf_counter() - start < 0.6   # sequential would be 0.8 s
+
+    assert result["roberta_label"] == result["gemini_label"] == "negative"
+    assert result["vader_percent"] == 20.0
+    assert result["gemini_lean"] == "center"
+    assert result["agreement"] is True
+
+
+def test_precomputed_engines_are_not_rerun(monkeypatch):
+    def boom(text, end=None):
+        raise AssertionError("should not run")
+
+    monkeypatch.setattr(ml_sentiment, "get_ml_sentiment", boom)
+    monkeypatch.setattr(ml_sentiment, "get_gemini_sentiment", boom)
+    result = ml_sentiment.run_sentiment_pipeline(
+        "The council approved the budget.",
+        roberta=("positive", 0.8), gemini=("neutral", 0.0, "none"),
+    )
+    assert result["roberta_percent"] == 80.0
+    assert result["gemini_percent"] == 50.0
+
+
+# -------------------------------------------------------
+# Deadline and degradation
+# -------------------------------------------------------
+def test_slow_engine_is_dropped_at_deadline(monkeypatch):
+    monkeypatch.setattr(ml_sentiment, "get_ml_sentiment",       _slow(("negative", 0.9), 0))
+    monkeypatch.setattr(ml_sentiment, "get_vader_sentiment",    _slow(("negative", -0.6), 0))
+    monkeypatch.setattr(ml_sentiment, "get_textblob_sentiment", _slow(("negative", -0.3), 0))
+    monkeypatch.setattr(ml_sentiment, "get_gemini_sentiment",   _slow(("positive", 0.9, "left"), 1.0))
+
+    start  = time.perf_counter()
+    result = ml_sentiment.run_sentiment_pipeline("Some article text.", deadline=0.2)
+    assert time.perf_counter() - start < 0.8
+
+    assert result["engines_used"] == ["roberta", "vader", "textblob"]
+    assert result["gemini_label"] is None and result["gemini_percent"] is None
+    assert result["agreement"] is True
+    expected, _ = ml_sentiment.compute_hybrid_narrative(
+        "negative", 0.9, -0.6, -0.3, engines=("roberta", "vader", "textblob"),
+    )
+    assert result["narrative_direction_score"] == expected
+
+
+def test_hybrid_weights_renormalise_over_finished_engines():
+    full, _ = ml_sentiment.compute_hybrid_narrative("negative", 0.8, -0.8, -0.8, -0.8)
+    assert full == -80
+    # Same direction from fewer engines still gives the same score
+    partial, _ = ml_sentiment.compute_hybrid_narrative(
+        "negative", 0.8, -0.8, 0.0, 0.0, engines=("roberta", "vader"),
+    )
+    assert partial == -80
+
+
+# -------------------------------------------------------
+# Gemini memo (stub backend, no network)
+# -------------------------------------------------------
+def test_unchanged_text_makes_one_gemini_call(monkeypatch, tmp_path):
+    stub = StubGeminiModel('{"score": -0.6, "lean": "right"}')
+    monkeypatch.setitem(ml_sentiment._engines, "gemini", stub)
+    monkeypatch.setitem(ml_sentiment._engines, "gemini_cache", GeminiCache(str(tmp_path / "g.db")))
+
+    text  = "The minister's plan was attacked from all sides."
+    first = ml_sentiment.get_gemini_sentiment(text)
+    again = ml_sentiment.get_gemini_sentiment(text)
+
+    assert first == again == ("negative", -0.6, "right")
+    assert stub.calls == 1
+
+
+def test_prompt_version_bump_misses_cache(monkeypatch, tmp_path):
+    stub = StubGeminiModel()
+    monkeypatch.setitem(ml_sentiment._engines, "gemini", stub)
+    monkeypatch.setitem(ml_sentiment._engines, "gemini_cache", GeminiCache(str(tmp_path / "g.db")))
+
+    ml_sentiment.get_gemini_sentiment("Same article.")
+    monkeypatch.setattr(ml_sentiment, "GEMINI_PROMPT_VERSION", 2)
+    ml_sentiment.get_gemini_sentiment("Same article.")
+    assert stub.calls == 2
+
+
+def test_unusable_reply_is_not_cached(monkeypatch, tmp_path):
+    stub = StubGeminiModel("sorry, no JSON today")
+    monkeypatch.setitem(ml_sentiment._engines, "gemini", stub)
+    monkeypatch.setitem(ml_sentiment._engines, "gemini_cache", GeminiCache(str(tmp_path / "g.db")))
+
+    assert ml_sentiment.get_gemini_sentiment("Article.") is None
+    ml_sentiment.get_gemini_sentiment("Article.")
+    assert stub.calls == 2
@@ -0,0 +1,55 @@
+"""
+Tests for model_server.py — shared inference server and micro-batching.
+Uses a fake scoring function instead of roberta-large.
+"""
+import os
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import ml_sentiment
+from model_server import ModelServer, score_chunks_remote
+
+
+def _fake_score(chunks):
+    return [{"label": "NEGATIVE" if "bad" in c else "POSITIVE", "score": 0.9} for c in chunks]
+
+
+@pytest.fixture
+def server():
+    # Unix socket paths must stay short, so avoid pytest's deep tmp_path
+    path = os.path.join(tempfile.mkdtemp(), "m.sock")
+    srv  = ModelServer(path, _fake_score, window_ms=50, max_batch=64)
+    threading.Thread(target=srv.serve_forever, daemon=True).start()
+    yield srv, path
+    srv.shutdown()
+    srv.server_close()
+
+
+def test_remote_scores_round_trip(server):
+    _, path = server
+    results = score_chunks_remote(["good news", "bad news"], path)
+    assert [r["label"] for r in results] == ["POSITIVE", "NEGATIVE"]
+
+
+def test_concurrent_requests_are_micro_batched(server):
+    srv, path = server
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        results = list(pool.map(lambda i: score_chunks_remote([f"chunk {i}"], path), range(8)))
+    assert all(r[0]["label"] == "POSITIVE" for r in results)
+    assert srv.batcher.batches < 8
+
+
+def test_ml_sentiment_uses_server_when_configured(server, monkeypatch):
+    _, path = server
+    monkeypatch.setenv("MODEL_SERVER_SOCKET", path)
+    monkeypatch.setitem(ml_sentiment._engines, "roberta", None)   # would crash if used
+    assert ml_sentiment._score_chunks(["bad chunk"], 8)[0]["label"] == "NEGATIVE"
+
+
+def test_falls_back_to_local_when_server_down(monkeypatch):
+    monkeypatch.setenv("MODEL_SERVER_SOCKET", "/nonexistent/model.sock")
+    monkeypatch.setitem(ml_sentiment._engines, "roberta", lambda chunks, **kw: _fake_score(chunks))
+    assert ml_sentiment._score_chunks(["good chunk"], 8)[0]["label"] == "POSITIVE"
@@ -90,3 +90,30 @@ def test_export_csv_loads(client):
 def test_unknown_route_returns_404(client):
     response = client.get("/this-page-does-not-exist")
     assert response.status_code == 404
+
+
+# Background jobs
+def test_analyze_returns_job_redirect(client):
+    response = client.post("/analyze", data={"url": "https://example.com/story"})
+    assert response.status_code == 302
+    assert "/jobs/" in response.headers["Location"]
+
+def test_job_status_reports_progress(client):
+    response = client.post("/compare", data={
+        "urls": ["https://a.com/1", "https://b.com/2"],
+        "labels": ["A", "B"],
+        "countries": ["UK", "US"],
+    })
+    status = client.get(response.headers["Location"] + "/status").get_json()
+    assert status["kind"] == "compare"
+    assert status["total"] == 2
+    assert all(item["status"] == "queued" for item in status["items"])
+
+def test_pending_job_page_loads(client):
+    response = client.post("/analyze", data={"url": "https://example.com/story"})
+    page = client.get(response.headers["Location"])
+    assert page.status_code == 200
+
+def test_unknown_job_returns_404(client):
+    response = client.get("/jobs/999999/status")
+    assert response.status_code == 404
@@ -3,7 +3,7 @@ Tests for sentiment engines and bias analysis.
 Does NOT call Gemini or RoBERTa no API key / GPU needed.
 """
 from ml_sentiment import get_vader_sentiment, get_textblob_sentiment
-from bias_analysis import analyse_bias_language
+from bias_analysis import analyse_bias_language, analyse_bias_batch, find_bias_terms, LexiconMatcher
 
 
 # -------------------------------------------------------
@@ -109,3 +109,62 @@ def test_long_text_does_not_crash():
     text = "The government announced a new policy. " * 200
     result = analyse_bias_language(text)
     assert "bias_level" in result
+
+def test_bias_matches_multi_word_phrases():
+    text = "No one doubted it. The result was jaw-dropping, beyond doubt."
+    terms = [(m.lexicon, m.term) for m in find_bias_terms(text)]
+    assert ("certainty", "no one") in terms
+    assert ("emotive", "jaw-dropping") in terms
+    assert ("certainty", "beyond doubt") in terms
+
+def test_bias_match_offsets_point_into_text():
+    text = "It was, without exception, a Shocking result."
+    assert [text[m.start:m.end] for m in find_bias_terms(text)] == ["without exception", "Shocking"]
+
+def test_bias_counts_phrase_once():
+    result = analyse_bias_language("Everyone agreed without exception on the jaw-dropping plan.")
+    assert result["emotive_words"] == {"jaw-dropping": 1}
+    assert result["total_words"] == 9
+
+def test_matcher_scales_to_large_lexicons():
+    lexicon = {f"term{i}" for i in range(5000)} | {"alpha beta gamma"}
+    matcher = LexiconMatcher({"big": lexicon})
+    matches, total = matcher.find("x term42 alpha beta gamma term4999 y")
+    assert [m.term for m in matches] == ["term42", "alpha beta gamma", "term4999"]
+    assert total == 7
+
+def test_batch_bias_matches_scalar():
+    texts = [
+        "",
+        "The council met on Tuesday.",
+        "No one expected this shocking, jaw-dropping crisis. It was absolutely a disaster.",
+        "Always, always, always the same massive outrage. Beyond doubt a betrayal.",
+        "!!!",
+    ]
+    assert analyse_bias_batch(texts) == [analyse_bias_language(t) for t in texts]
+
+def test_batch_bias_matches_scalar_on_random_text():
+    import random
+    import lexicon_store
+
+    lexicons = lexicon_store.current()
+    words    = sorted(lexicons.emotive | lexicons.certainty) + ["the", "Council", "vote", "!", "\u0130stanbul"]
+    random.seed(7)
+    texts = [
+        " ".join(random.choice(words) for _ in range(random.randint(0, 60)))
+        for _ in range(200)
+    ]
+    assert analyse_bias_batch(texts) == [analyse_bias_language(t) for t in texts]
+
+def test_count_matrix_resolves_overlaps_like_find():
+    matcher = LexiconMatcher({"x": {"a b", "b c", "a", "c"}, "y": {"b", "b c d"}})
+    texts   = ["a b c d", "c a b", "", "b c d b c"]
+    counts, totals = matcher.count_matrix(texts)
+    for row, text in enumerate(texts):
+        matches, total = matcher.find(text)
+        expected = {}
+        for m in matches:
+            col = matcher.vocabulary[(m.lexicon, m.term)]
+            expected[col] = expected.get(col, 0) + 1
+        assert dict(counts.getrow(row).todok().items()) == {(0, c): n for c, n in expected.items()}
+        assert totals[row] == total
@@ -0,0 +1,101 @@
+"""
+Tests for storage.py — SQLite pragmas, pool options and a concurrency stress test.
+"""
+import threading
+import time
+
+import pytest
+from sqlalchemy import create_engine
+
+import storage
+
+
+@pytest.fixture
+def file_engine(tmp_path):
+    uri    = f"sqlite:///{tmp_path / 'stress.db'}"
+    engine = storage.configure(create_engine(uri, **storage.engine_options(uri)))
+    with engine.begin() as conn:
+        conn.exec_driver_sql("CREATE TABLE item (id INTEGER PRIMARY KEY, value TEXT)")
+        conn.exec_driver_sql("INSERT INTO item (value) VALUES ('seed')")
+    yield engine
+    engine.dispose()
+
+
+def test_memory_database_is_left_alone():
+    assert storage.engine_options("sqlite:///:memory:") == {}
+    assert storage.engine_options("sqlite://") == {}
+    assert storage.engine_options("sqlite:///news.db")["pool_size"] == storage.POOL_SIZE
+
+
+def test_pragmas_applied_to_every_connection(file_engine):
+    with file_engine.connect() as a, file_engine.connect() as b:
+        for conn in (a, b):
+            settings = storage.pragmas(conn)
+            assert settings["journal_mode"] == "wal"
+            assert settings["synchronous"] == 1          # NORMAL
+            assert settings["busy_timeout"] == storage.BUSY_TIMEOUT_MS
+            assert settings["cache_size"] == -storage.CACHE_SIZE_KB
+
+
+def test_configure_twice_installs_one_listener(file_engine):
+    storage.configure(file_engine)
+    with file_engine.connect() as conn:
+        assert storage.pragmas(conn)["journal_mode"] == "wal"
+
+
+def test_readers_never_wait_for_a_writer(file_engine):
+    """A writer holds its transaction open; readers keep reading the old snapshot."""
+    hold         = 0.5
+    write_locked = threading.Event()
+    reads        = []
+    errors       = []
+
+    def writer():
+        with file_engine.begin() as conn:
+            conn.exec_driver_sql("INSERT INTO item (value) VALUES ('pending')")
+            write_locked.set()
+            time.sleep(hold)
+
+    def reader():
+        write_locked.wait()
+        try:
+            for _ in range(20):
+                start = time.perf_counter()
+                with file_engine.connect() as conn:
+                    count = conn.exec_driver_sql("SELECT COUNT(*) FROM item").scalar()
+                reads.append((time.perf_counter() - start, count))
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=writer)] + [threading.Thread(target=reader) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    assert len(reads) == 80
+    assert max(elapsed for elapsed, _ in reads) < hold / 2
+    assert all(count in (1, 2) for _, count in reads)
+
+
+def test_concurrent_writers_wait_instead_of_failing(file_engine):
+    errors = []
+
+    def writer(n):
+        try:
+            for i in range(25):
+                with file_engine.begin() as conn:
+                    conn.exec_driver_sql("INSERT INTO item (value) VALUES (?)", (f"{n}-{i}",))
+        except Exception as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=writer, args=(n,)) for n in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+
+    assert errors == []
+    with file_engine.connect() as conn:
+        assert conn.exec_driver_sql("SELECT COUNT(*) FROM item").scalar() == 1 + 8 * 25
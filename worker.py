@@ -0,0 +1,146 @@
+"""
+Background worker for /analyze and /compare jobs.
+
+Usage:
+python worker.py
+
+Polls the analysis_job table and runs up to JOB_CONCURRENCY jobs at once.
+A claimed job carries this worker's id and a lease that is renewed every
+JOB_LEASE_SECONDS / 3 while it runs. Jobs whose lease ran out (their worker
+crashed or was killed) are put back in the queue; URLs inside them that
+already finished are not redone. Several workers can share one database.
+
+The worker also keeps the sources.txt results warm, re-analysing only when
+the file changes, so the /jobs page never has to scrape inside a request.
+That cache is per process: it feeds the web pages when the worker is the
+embedded one `python news_demo.py` starts (EMBEDDED_WORKER=0 turns it off).
+"""
+import os
+import socket
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from ml_sentiment import warmup
+from news_demo import (
+    app, db, AnalysisJob, AnalysisJobItem, JOB_LEASE_SECONDS,
+    claim_job, process_job, renew_lease, run_migrations, run_sentiment_analysis,
+)
+
+
+JOB_CONCURRENCY = int(os.getenv("JOB_CONCURRENCY", "2"))
+POLL_INTERVAL   = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))
+WORKER_ID       = f"{socket.gethostname()}:{os.getpid()}"
+
+
+def recover_interrupted():
+    """Requeue running jobs whose worker stopped renewing the lease."""
+    with app.app_context():
+        expired = [
+            job.id for job in
+            AnalysisJob.query
+            .filter_by(status="running")
+            .filter(db.or_(
+                AnalysisJob.lease_expires.is_(None),
+                AnalysisJob.lease_expires < datetime.utcnow(),
+            ))
+        ]
+        if not expired:
+            return []
+        (
+            AnalysisJob.query
+            .filter(AnalysisJob.id.in_(expired), AnalysisJob.status == "running")
+            .update({"status": "queued", "started_at": None,
+                     "worker_id": None, "lease_expires": None},
+                    synchronize_session=False)
+        )
+        (
+            AnalysisJobItem.query
+            .filter(AnalysisJobItem.job_id.in_(expired),
+                    AnalysisJobItem.status.in_(("fetching", "analysing")))
+            .update({"status": "queued"}, synchronize_session=False)
+        )
+        db.session.commit()
+        return expired
+
+
+def _keep_lease(job_id: int, done: threading.Event):
+    while not done.wait(JOB_LEASE_SECONDS / 3):
+        with app.app_context():
+            if not renew_lease(job_id, WORKER_ID):
+                return
+
+
+def _run_one(job_id: int):
+    with app.app_context():
+        if not claim_job(job_id, WORKER_ID):
+            return
+        done = threading.Event()
+        threading.Thread(target=_keep_lease, args=(job_id, done), daemon=True).start()
+        try:
+            process_job(job_id)
+        except Exception:
+            db.session.rollback()
+            AnalysisJob.query.filter_by(id=job_id).update(
+                {"status": "failed", "finished_at": datetime.utcnow()}
+            )
+            db.session.commit()
+        finally:
+            done.set()
+
+
+def _refresh_sources():
+    with app.app_context():
+        run_sentiment_analysis()   # cheap unless sources.txt changed
+
+
+def run_worker(stop_event: threading.Event = None):
+    stop_event = stop_event or threading.Event()
+
+    with ThreadPoolExecutor(max_workers=JOB_CONCURRENCY) as pool, \
+         ThreadPoolExecutor(max_workers=1) as sources_pool:
+        in_flight = set()
+        sources   = None
+        while not stop_event.is_set():
+            recover_interrupted()
+            if sources is None or sources.done():
+                sources = sources_pool.submit(_refresh_sources)
+
+            in_flight = {f for f in in_flight if not f.done()}
+            free      = JOB_CONCURRENCY - len(in_flight)
+
+            job_ids = []
+            if free > 0:
+                with app.app_context():
+                    job_ids = [
+                        job.id for job in
+                        AnalysisJob.query
+                        .filter_by(status="queued")
+                        .order_by(AnalysisJob.id)
+                        .limit(free)
+                    ]
+                for job_id in job_ids:
+                    in_flight.add(pool.submit(_run_one, job_id))
+
+            if not job_ids:
+                stop_event.wait(POLL_INTERVAL)
+
+
+def start_background_worker() -> threading.Event:
+    """Run the worker loop on a daemon thread. Set the returned event to stop it."""
+    stop_event = threading.Event()
+    threading.Thread(target=run_worker, args=(stop_event,), daemon=True).start()
+    return stop_event
+
+
+if __name__ == "__main__":
+    with app.app_context():
+        db.create_all()
+        run_migrations()
+    print("Loading models...")
+    warmup()
+    print(f"Worker started ({JOB_CONCURRENCY} concurrent jobs). Ctrl+C to stop.")
+    try:
+        run_worker()
+    except KeyboardInterrupt:
+        pass